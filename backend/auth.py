@@ -4,16 +4,43 @@ from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from services.cache import TTLCache
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import hashlib
+import logging
 import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# Optional faster JWT backend
+try:
+    import jwt as pyjwt
+    PYJWT_ENABLED = True
+except ImportError:
+    PYJWT_ENABLED = False
 
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt takes 100-300 ms per call; it runs on a small dedicated pool so the
+# event loop keeps serving other requests during a login burst. bcrypt
+# releases the GIL, so threads hash in parallel.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+password_hash_pool = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+
 # JWT settings
 SECRET_KEY = os.getenv("JWT_SECRET", "your-secret-key-change-in-production-2025")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_HOURS = int(os.getenv("JWT_EXPIRE_HOURS", "24"))
 
+# Decoded-token cache: the frontend polls several endpoints with the same
+# token, so each payload is kept (keyed by the token's hash) until its exp.
+JWT_CACHE_ENABLED = os.getenv("JWT_CACHE_ENABLED", "true").lower() == "true"
+JWT_CACHE_MAX_ENTRIES = int(os.getenv("JWT_CACHE_MAX_ENTRIES", "4096"))
+token_cache = TTLCache("jwt_tokens", JWT_CACHE_MAX_ENTRIES, ACCESS_TOKEN_EXPIRE_HOURS * 3600)
+
 security = HTTPBearer()
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -24,6 +51,16 @@ def get_password_hash(password: str) -> str:
     """Hash a password"""
     return pwd_context.hash(password)
 
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password on the password hashing pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_hash_pool, verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password on the password hashing pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_hash_pool, get_password_hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create JWT access token"""
     to_encode = data.copy()
@@ -36,21 +73,59 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def decode_token(token: str) -> dict:
-    """Decode and verify JWT token"""
+def _decode_jose(token: str) -> dict:
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except JWTError:
+        return None
+
+def _decode_pyjwt(token: str) -> dict:
+    try:
+        return pyjwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except pyjwt.PyJWTError:
+        return None
+
+JWT_BACKENDS = {"jose": _decode_jose}
+if PYJWT_ENABLED:
+    JWT_BACKENDS["pyjwt"] = _decode_pyjwt
+
+JWT_BACKEND = os.getenv("JWT_BACKEND", "jose").lower()
+if JWT_BACKEND not in JWT_BACKENDS:
+    logger.warning(f"JWT backend '{JWT_BACKEND}' is not available, falling back to python-jose")
+    JWT_BACKEND = "jose"
+_decode = JWT_BACKENDS[JWT_BACKEND]
+
+def _token_key(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+def decode_token(token: str) -> dict:
+    """Decode and verify JWT token (cached until the token expires)"""
+    key = _token_key(token) if JWT_CACHE_ENABLED else None
+    if key:
+        hit, payload = token_cache.get(key)
+        if hit:
+            return payload
+    
+    payload = _decode(token)
+    if payload is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    
+    if key and "exp" in payload:
+        remaining = payload["exp"] - time.time()
+        if remaining > 0:
+            token_cache.set(key, payload, ttl=remaining)
+    return payload
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
     """Get current user from JWT token"""
-    token = credentials.credentials
+    return get_user_from_token(credentials.credentials)
+
+def get_user_from_token(token: str) -> dict:
+    """Current user of a JWT token (for callers without a bearer header, e.g. WebSockets)"""
     payload = decode_token(token)
     
     email: str = payload.get("sub")
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Booking conflict detection benchmark
+
+Generates APPOINTMENT_COUNT appointments for one provider (spread over a
+year, mixed durations) and compares:
+  conflict check - linear scan over every appointment vs IntervalTree
+  availability   - four weeks of free slots from the interval index
+
+The linear scan is what an overlap check without an index would cost once
+all of a provider's appointments are loaded.
+
+Usage:
+    python benchmarks/bench_booking_conflicts.py
+
+No database is needed. BENCH_APPOINTMENTS overrides the appointment count.
+"""
+
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+
+from models import WorkingHours  # noqa: E402
+from services.appointment_index import appointment_interval  # noqa: E402
+from services.interval_tree import IntervalTree  # noqa: E402
+from services.slot_engine import compute_free_slots, date_range  # noqa: E402
+
+APPOINTMENT_COUNT = int(os.environ.get("BENCH_APPOINTMENTS", "5000"))
+CHECK_COUNT = 2000
+FIRST_DAY = date(2030, 1, 1)
+
+
+def make_appointments(rng: random.Random) -> list:
+    appointments = []
+    for i in range(APPOINTMENT_COUNT):
+        day = FIRST_DAY + timedelta(days=rng.randint(0, 364))
+        hour, minute = rng.randint(8, 17), rng.choice([0, 15, 30, 45])
+        appointments.append({
+            "_id": f"apt_{i}",
+            "date": day.isoformat(),
+            "time": f"{hour:02d}:{minute:02d}",
+            "duration": rng.choice([30, 45, 50, 60, 90])
+        })
+    return appointments
+
+
+def timed(fn, repeat: int) -> float:
+    """Microseconds per call"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    rng = random.Random(7)
+    appointments = make_appointments(rng)
+    intervals = [(*appointment_interval(apt), apt["_id"]) for apt in appointments]
+    candidates = [appointment_interval(apt) for apt in make_appointments(rng)[:CHECK_COUNT]]
+
+    start = time.perf_counter()
+    tree = IntervalTree(intervals)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    def linear_check():
+        for start, end in candidates:
+            any(s < end and e > start for s, e, _ in intervals)
+
+    def tree_check():
+        for start, end in candidates:
+            tree.overlaps(start, end)
+
+    # Both must agree before timing
+    for start, end in candidates[:200]:
+        assert tree.overlaps(start, end) == any(s < end and e > start for s, e, _ in intervals)
+
+    linear_us = timed(linear_check, 1) / CHECK_COUNT
+    tree_us = timed(tree_check, 5) / CHECK_COUNT
+
+    schedule = WorkingHours().model_dump()
+    schedule["slotDuration"] = 30
+    days = date_range(FIRST_DAY + timedelta(days=90), FIRST_DAY + timedelta(days=117))
+    slots_ms = timed(lambda: compute_free_slots(schedule, days, tree), 20) / 1000
+
+    print(f"{APPOINTMENT_COUNT} appointments for one provider")
+    print(f"  index build:             {build_ms:8.2f} ms")
+    print(f"  conflict check (linear): {linear_us:8.1f} us")
+    print(f"  conflict check (tree):   {tree_us:8.1f} us  ({linear_us / tree_us:.0f}x)")
+    print(f"  4 weeks of free slots:   {slots_ms:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
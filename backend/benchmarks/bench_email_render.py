@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Email template rendering benchmark
+
+Renders every email template in every locale RENDER_COUNT times in two
+modes:
+  full    - body and layout.html rendered on every send
+  cached  - render_email: body rendered, layout head/tail reused per
+            (locale, footer)
+
+and reports the mean time per email and throughput. Template compilation
+happens at import and is timed separately.
+
+Usage:
+    python benchmarks/bench_email_render.py
+
+No database is needed.
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+
+start = time.perf_counter()
+from services import email_templates  # noqa: E402
+from services.email_templates import render_email, EMAILS, STRINGS, LAYOUT, TEMPLATES  # noqa: E402
+from markupsafe import Markup  # noqa: E402
+COMPILE_MS = (time.perf_counter() - start) * 1000
+
+RENDER_COUNT = int(os.environ.get("BENCH_EMAIL_COUNT", "200"))
+
+CONTEXT = {
+    "client_name": "Ana Novak", "provider_name": "Dr. Bench", "appointment_type": "Therapy session",
+    "appointment_date": "2025-01-15", "appointment_time": "10:00", "video_link": "https://meet.example.com/abc",
+    "amount": 80.0, "reason": "I had to cancel because of illness.", "provider_response": "Get well soon.",
+    "message_preview": "Could we move next week's session to Thursday afternoon?"
+}
+
+
+def render_full(name: str, locale: str) -> str:
+    strings = STRINGS[locale]
+    greeting = Markup(strings["greeting"]).format(name="Jane")
+    body = TEMPLATES[name].render(t=strings, greeting=greeting, **CONTEXT)
+    return LAYOUT.render(locale=locale, t=strings, footer=EMAILS[name]["footer"], content=Markup(body))
+
+
+def render_cached(name: str, locale: str) -> str:
+    return render_email(name, locale, recipient_name="Jane Doe", **CONTEXT)[1]
+
+
+def run(render) -> float:
+    pairs = [(name, locale) for name in EMAILS for locale in STRINGS]
+    start = time.perf_counter()
+    for _ in range(RENDER_COUNT):
+        for name, locale in pairs:
+            render(name, locale)
+    return (time.perf_counter() - start) / (RENDER_COUNT * len(pairs))
+
+
+def main():
+    print(f"Import (Jinja2 + compiling {len(TEMPLATES) + 1} templates): {COMPILE_MS:.1f} ms")
+    print(f"{len(EMAILS)} templates x {len(STRINGS)} locales x {RENDER_COUNT} renders")
+    print(f"{'mode':>8} | {'us/email':>9} | {'emails/s':>9}")
+    print("-" * 32)
+
+    # Same output either way
+    assert render_full("new_message", "de").split() == render_cached("new_message", "de").split()
+
+    email_templates._layout.cache_clear()
+    for name, render in (("full", render_full), ("cached", render_cached)):
+        per_email = run(render)
+        print(f"{name:>8} | {per_email * 1e6:>9.1f} | {1 / per_email:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+JWT verification benchmark
+
+Measures the per-request cost of auth.get_current_user for a client that
+keeps polling with the same token: a full signature check on every call
+(no cache) against the decoded-token cache, for every available JWT backend.
+
+Usage:
+    python benchmarks/bench_jwt_decode.py
+
+No database is needed.
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+
+from fastapi.security import HTTPAuthorizationCredentials  # noqa: E402
+import auth  # noqa: E402
+
+REQUESTS = int(os.environ.get("BENCH_REQUESTS", "20000"))
+RUNS = int(os.environ.get("BENCH_RUNS", "5"))
+
+TOKEN = auth.create_access_token({
+    "sub": "bench@example.com",
+    "userId": "user_bench",
+    "userType": "provider"
+})
+CREDENTIALS = HTTPAuthorizationCredentials(scheme="Bearer", credentials=TOKEN)
+
+
+async def measure(credentials) -> float:
+    """Average microseconds per get_current_user call over REQUESTS calls"""
+    await auth.get_current_user(credentials)  # warm-up
+    start = time.perf_counter()
+    for _ in range(REQUESTS):
+        await auth.get_current_user(credentials)
+    return (time.perf_counter() - start) * 1_000_000 / REQUESTS
+
+
+async def run(backend: str, cached: bool) -> float:
+    auth._decode = auth.JWT_BACKENDS[backend]
+    auth.JWT_CACHE_ENABLED = cached
+    auth.token_cache.clear()
+    return statistics.median([await measure(CREDENTIALS) for _ in range(RUNS)])
+
+
+async def main():
+    print(f"{'backend':>8} | {'uncached (us/req)':>18} | {'cached (us/req)':>16} | {'speedup':>8}")
+    print("-" * 60)
+    for backend in auth.JWT_BACKENDS:
+        uncached = await run(backend, cached=False)
+        cached = await run(backend, cached=True)
+        print(f"{backend:>8} | {uncached:>18.1f} | {cached:>16.1f} | {uncached / cached:>7.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
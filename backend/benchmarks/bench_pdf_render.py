@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Invoice PDF rendering benchmark
+
+Renders PDF_COUNT invoices concurrently in three modes:
+  inline  - render_invoice_pdf called directly in the coroutine (old behaviour)
+  thread  - PdfRenderer with PDF_RENDER_WORKERS=0 (one thread per render)
+  process - PdfRenderer process pool
+
+For each mode it reports PDF throughput and the latency of a simulated API
+request running alongside: a coroutine that wakes every 5 ms and records
+how late it was woken. That lateness is what every other endpoint waits
+for while PDFs render.
+
+Usage:
+    python benchmarks/bench_pdf_render.py
+
+No database is needed.
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+
+from services.invoice_pdf import render_invoice_pdf  # noqa: E402
+from services.pdf_renderer import PdfRenderer, PDF_RENDER_WORKERS  # noqa: E402
+
+PDF_COUNT = int(os.environ.get("BENCH_PDF_COUNT", "40"))
+PROBE_INTERVAL = 0.005
+
+PROVIDER = {"name": "Dr. Bench", "email": "bench@example.com", "phone": "+386 1 234 5678"}
+CLIENT = {"name": "Bench Client", "email": "client@example.com", "address": "Slovenska cesta 1, Ljubljana"}
+SETTINGS = {
+    "businessName": "Bench Practice d.o.o.", "businessAddress": "Trubarjeva 5", "postalCode": "1000",
+    "city": "Ljubljana", "country": "Slovenia", "taxNumber": "12345678", "vatNumber": "SI12345678",
+    "iban": "SI56 1910 0000 0123 438", "bankName": "Bench Bank", "bic": "BENCSI2X", "vatRate": 22.0
+}
+
+
+def make_invoice(i: int) -> dict:
+    return {
+        "_id": str(uuid.uuid4()), "invoiceNumber": f"2025-{i:05d}", "providerId": "user_bench",
+        "clientId": "user_benchclient", "amount": 80.0 + i, "status": "pending" if i % 2 else "paid",
+        "invoiceDate": "2025-01-15", "dueDate": "2025-01-30", "description": "Therapy session"
+    }
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def probe(stop: asyncio.Event, delays: list):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(PROBE_INTERVAL)
+        delays.append((loop.time() - start - PROBE_INTERVAL) * 1000)
+
+
+async def render_inline(invoice: dict) -> bytes:
+    return render_invoice_pdf(invoice, PROVIDER, CLIENT, SETTINGS)
+
+
+async def run(render) -> tuple:
+    invoices = [make_invoice(i) for i in range(PDF_COUNT)]
+    stop = asyncio.Event()
+    delays = []
+    probe_task = asyncio.create_task(probe(stop, delays))
+    await asyncio.sleep(PROBE_INTERVAL * 2)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(render(invoice) for invoice in invoices))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await probe_task
+    return PDF_COUNT / elapsed, statistics.median(delays), percentile(delays, 99)
+
+
+async def main():
+    thread_renderer = PdfRenderer(workers=0)
+    process_renderer = PdfRenderer(workers=PDF_RENDER_WORKERS)
+    # Start the worker processes before timing
+    await asyncio.gather(*(
+        process_renderer.render(make_invoice(i), PROVIDER, CLIENT, SETTINGS) for i in range(PDF_RENDER_WORKERS)
+    ))
+
+    modes = [
+        ("inline", render_inline),
+        ("thread", lambda inv: thread_renderer.render(inv, PROVIDER, CLIENT, SETTINGS)),
+        (f"process x{PDF_RENDER_WORKERS}", lambda inv: process_renderer.render(inv, PROVIDER, CLIENT, SETTINGS)),
+    ]
+
+    print(f"{PDF_COUNT} concurrent invoice PDFs")
+    print(f"{'mode':>12} | {'PDFs/s':>8} | {'API lag p50 (ms)':>16} | {'API lag p99 (ms)':>16}")
+    print("-" * 62)
+    for name, render in modes:
+        throughput, lag_p50, lag_p99 = await run(render)
+        print(f"{name:>12} | {throughput:>8.1f} | {lag_p50:>16.1f} | {lag_p99:>16.1f}")
+
+    process_renderer.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Provider dashboard benchmark
+
+Seeds a throwaway database with a provider that has N appointments and
+compares the latency of the old multi-query dashboard against the single
+aggregation in services.dashboard_stats.
+
+Usage:
+    MONGO_URL=mongodb://localhost:27017 python benchmarks/bench_provider_dashboard.py
+
+The benchmark drops and recreates BENCH_DB_NAME (default: docportal_bench).
+"""
+
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ["DB_NAME"] = os.environ.get("BENCH_DB_NAME", "docportal_bench")
+
+from database import (  # noqa: E402
+    client, db, init_db, users_collection, appointments_collection,
+    messages_collection, invoices_collection, clinical_notes_collection
+)
+from services.dashboard_stats import compute_provider_dashboard  # noqa: E402
+
+APPOINTMENT_COUNTS = [100, 1000, 5000, 10000]
+RUNS = int(os.environ.get("BENCH_RUNS", "10"))
+PROVIDER_ID = "user_benchprovider"
+
+
+async def legacy_dashboard(provider_id: str) -> dict:
+    """The pre-aggregation implementation: one query per statistic"""
+    today = date.today()
+    active_clients = await users_collection.count_documents({"userType": "client", "providerId": provider_id})
+    today_appointments = await appointments_collection.count_documents({
+        "providerId": provider_id, "date": today.isoformat(), "status": {"$ne": "cancelled"}
+    })
+    week_appointments = await appointments_collection.count_documents({
+        "providerId": provider_id, "status": {"$ne": "cancelled"}
+    })
+    unread_messages = await messages_collection.count_documents({"receiverId": provider_id, "read": False})
+    completed = await appointments_collection.find({"providerId": provider_id, "status": "completed"}).to_list(None)
+    pending_notes = 0
+    for apt in completed:
+        if not await clinical_notes_collection.find_one({"appointmentId": apt["_id"]}):
+            pending_notes += 1
+    paid = await invoices_collection.find({"providerId": provider_id, "status": "paid"}).to_list(None)
+    total_income = sum(inv["amount"] for inv in paid)
+    upcoming = await appointments_collection.count_documents({
+        "providerId": provider_id, "status": {"$in": ["confirmed", "pending"]}
+    })
+    return {
+        "totalIncome": total_income,
+        "appointmentsToday": today_appointments,
+        "appointmentsWeek": week_appointments,
+        "pendingNotes": pending_notes,
+        "activeClients": active_clients,
+        "messagesUnread": unread_messages,
+        "upcomingAppointments": upcoming
+    }
+
+
+async def seed(appointment_count: int):
+    """Reset the benchmark database and seed one provider"""
+    await client.drop_database(db.name)
+    await init_db()
+
+    clients = [f"user_benchclient{i}" for i in range(50)]
+    await users_collection.insert_many([
+        {"user_id": c, "email": f"{c}@bench.local", "userType": "client", "providerId": PROVIDER_ID}
+        for c in clients
+    ])
+
+    statuses = ["pending", "confirmed", "completed", "completed", "cancelled"]
+    appointments, notes, invoices = [], [], []
+    for _ in range(appointment_count):
+        apt_id = str(uuid.uuid4())
+        status = random.choice(statuses)
+        apt_date = date.today() + timedelta(days=random.randint(-365, 30))
+        appointments.append({
+            "_id": apt_id, "providerId": PROVIDER_ID, "clientId": random.choice(clients),
+            "date": apt_date.isoformat(), "time": "09:00 AM", "duration": 60,
+            "status": status, "amount": 80.0
+        })
+        if status == "completed":
+            if random.random() < 0.5:
+                notes.append({"_id": str(uuid.uuid4()), "appointmentId": apt_id, "clientId": appointments[-1]["clientId"]})
+            invoices.append({
+                "_id": str(uuid.uuid4()), "providerId": PROVIDER_ID, "clientId": appointments[-1]["clientId"],
+                "appointmentId": apt_id, "amount": 80.0, "status": "paid",
+                "invoiceDate": apt_date.isoformat(), "createdAt": datetime.now(timezone.utc)
+            })
+
+    await appointments_collection.insert_many(appointments)
+    if notes:
+        await clinical_notes_collection.insert_many(notes)
+    if invoices:
+        await invoices_collection.insert_many(invoices)
+
+
+async def measure(func) -> list:
+    """Run func RUNS times and return latencies in milliseconds"""
+    await func(PROVIDER_ID)  # warm-up
+    latencies = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        await func(PROVIDER_ID)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+async def main():
+    print(f"{'appointments':>12} | {'legacy p50 (ms)':>16} | {'aggregation p50 (ms)':>21} | {'speedup':>8}")
+    print("-" * 66)
+    for count in APPOINTMENT_COUNTS:
+        await seed(count)
+        legacy = statistics.median(await measure(legacy_dashboard))
+        aggregated = statistics.median(await measure(compute_provider_dashboard))
+        print(f"{count:>12} | {legacy:>16.1f} | {aggregated:>21.1f} | {legacy / aggregated:>7.1f}x")
+    await client.drop_database(db.name)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
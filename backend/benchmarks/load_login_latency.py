@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Login burst load test
+
+Polls an unrelated endpoint (GET /api/health) against a running server,
+first on its own and then while LOGIN_CONCURRENCY clients log in back to
+back, and prints the p50/p99 latency of the health checks for both
+phases. Before password hashing moved off the event loop, every bcrypt
+call stalled all in-flight requests, which shows up as a p99 in the
+hundreds of milliseconds.
+
+Usage:
+    BASE_URL=http://localhost:8001 \\
+    LOAD_EMAIL=testprovider@example.com LOAD_PASSWORD=TestPass123! \\
+    python benchmarks/load_login_latency.py
+"""
+
+import asyncio
+import os
+import statistics
+import time
+
+import aiohttp
+
+BASE_URL = os.environ.get("BASE_URL", "http://localhost:8001").rstrip("/")
+EMAIL = os.environ.get("LOAD_EMAIL", "testprovider@example.com")
+PASSWORD = os.environ.get("LOAD_PASSWORD", "TestPass123!")
+DURATION = float(os.environ.get("LOAD_DURATION", "10"))
+LOGIN_CONCURRENCY = int(os.environ.get("LOGIN_CONCURRENCY", "20"))
+PROBE_CONCURRENCY = int(os.environ.get("PROBE_CONCURRENCY", "5"))
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def probe(session, deadline: float, latencies: list):
+    """Hit the health endpoint until the deadline, recording latencies in ms"""
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        async with session.get(f"{BASE_URL}/api/health") as response:
+            await response.read()
+        latencies.append((time.perf_counter() - start) * 1000)
+
+
+async def login_loop(session, deadline: float, counter: list):
+    while time.perf_counter() < deadline:
+        async with session.post(
+            f"{BASE_URL}/api/auth/login",
+            json={"email": EMAIL, "password": PASSWORD}
+        ) as response:
+            await response.read()
+            if response.status != 200:
+                raise RuntimeError(f"Login failed ({response.status}); set LOAD_EMAIL/LOAD_PASSWORD")
+        counter.append(1)
+
+
+async def phase(session, with_logins: bool) -> tuple:
+    deadline = time.perf_counter() + DURATION
+    latencies, logins = [], []
+    tasks = [probe(session, deadline, latencies) for _ in range(PROBE_CONCURRENCY)]
+    if with_logins:
+        tasks += [login_loop(session, deadline, logins) for _ in range(LOGIN_CONCURRENCY)]
+    await asyncio.gather(*tasks)
+    return latencies, len(logins)
+
+
+async def main():
+    connector = aiohttp.TCPConnector(limit=PROBE_CONCURRENCY + LOGIN_CONCURRENCY)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        print(f"{'phase':>14} | {'health p50 (ms)':>15} | {'health p99 (ms)':>15} | {'logins/s':>8}")
+        print("-" * 62)
+        for name, with_logins in (("idle", False), ("login burst", True)):
+            latencies, logins = await phase(session, with_logins)
+            print(
+                f"{name:>14} | {statistics.median(latencies):>15.1f} | "
+                f"{percentile(latencies, 99):>15.1f} | {logins / DURATION:>8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Idle WebSocket load test for real-time messaging
+
+Against a running server, opens IDLE_CONNECTIONS message sockets for the
+provider account and leaves them idle, then:
+  - reports how long opening them took,
+  - compares GET /api/health latency with and without the idle sockets,
+  - has the client send MESSAGE_COUNT messages to the provider and times
+    how long each takes to reach the first and the last of the sockets
+    (every socket of the provider receives every message).
+
+Raise the open-file limit first for large counts (ulimit -n 65536).
+
+Usage:
+    BASE_URL=http://localhost:8001 \\
+    LOAD_EMAIL=testprovider@example.com LOAD_PASSWORD=TestPass123! \\
+    LOAD_CLIENT_EMAIL=testclient@example.com LOAD_CLIENT_PASSWORD=TestPass123! \\
+    IDLE_CONNECTIONS=5000 python benchmarks/load_message_ws.py
+"""
+
+import asyncio
+import json
+import os
+import statistics
+import time
+
+import aiohttp
+
+BASE_URL = os.environ.get("BASE_URL", "http://localhost:8001").rstrip("/")
+WS_URL = BASE_URL.replace("http", "ws", 1)
+EMAIL = os.environ.get("LOAD_EMAIL", "testprovider@example.com")
+PASSWORD = os.environ.get("LOAD_PASSWORD", "TestPass123!")
+CLIENT_EMAIL = os.environ.get("LOAD_CLIENT_EMAIL", "testclient@example.com")
+CLIENT_PASSWORD = os.environ.get("LOAD_CLIENT_PASSWORD", "TestPass123!")
+IDLE_CONNECTIONS = int(os.environ.get("IDLE_CONNECTIONS", "2000"))
+CONNECT_CONCURRENCY = int(os.environ.get("CONNECT_CONCURRENCY", "200"))
+MESSAGE_COUNT = int(os.environ.get("MESSAGE_COUNT", "10"))
+PROBE_COUNT = int(os.environ.get("PROBE_COUNT", "200"))
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def login(session, email: str, password: str) -> dict:
+    async with session.post(f"{BASE_URL}/api/auth/login", json={"email": email, "password": password}) as response:
+        if response.status != 200:
+            raise RuntimeError(f"Login failed for {email} ({response.status}); set LOAD_* credentials")
+        return await response.json()
+
+
+async def probe_health(session) -> list:
+    latencies = []
+    for _ in range(PROBE_COUNT):
+        start = time.perf_counter()
+        async with session.get(f"{BASE_URL}/api/health") as response:
+            await response.read()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+async def open_sockets(session, token: str) -> list:
+    semaphore = asyncio.Semaphore(CONNECT_CONCURRENCY)
+
+    async def connect():
+        async with semaphore:
+            socket = await session.ws_connect(f"{WS_URL}/api/messages/ws?token={token}", heartbeat=None)
+            ready = await socket.receive_json()
+            assert ready["type"] == "ready"
+            return socket
+
+    return await asyncio.gather(*(connect() for _ in range(IDLE_CONNECTIONS)))
+
+
+async def wait_for_message(socket, message_id: str) -> float:
+    while True:
+        event = json.loads((await socket.receive()).data)
+        if event.get("type") == "message" and event["message"]["_id"] == message_id:
+            return time.perf_counter()
+
+
+async def send_and_time(session, sockets: list, client: dict, provider_id: str) -> tuple:
+    """Milliseconds until the first and the last socket got the message"""
+    headers = {"Authorization": f"Bearer {client['token']}"}
+    start = time.perf_counter()
+    async with session.post(f"{BASE_URL}/api/messages", headers=headers, json={
+        "senderId": client["user"]["user_id"], "receiverId": provider_id,
+        "senderType": "client", "message": "load test"
+    }) as response:
+        message_id = (await response.json())["id"]
+    arrivals = await asyncio.gather(*(wait_for_message(socket, message_id) for socket in sockets))
+    return (min(arrivals) - start) * 1000, (max(arrivals) - start) * 1000
+
+
+async def main():
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        provider = await login(session, EMAIL, PASSWORD)
+        client = await login(session, CLIENT_EMAIL, CLIENT_PASSWORD)
+
+        baseline = await probe_health(session)
+
+        start = time.perf_counter()
+        sockets = await open_sockets(session, provider["token"])
+        connect_seconds = time.perf_counter() - start
+        print(f"Opened {len(sockets)} sockets in {connect_seconds:.1f} s "
+              f"({len(sockets) / connect_seconds:.0f}/s)")
+
+        await asyncio.sleep(2)
+        loaded = await probe_health(session)
+
+        print(f"{'health':>20} | {'p50 (ms)':>9} | {'p99 (ms)':>9}")
+        print("-" * 44)
+        for name, latencies in (("no sockets", baseline), (f"{len(sockets)} idle sockets", loaded)):
+            print(f"{name:>20} | {statistics.median(latencies):>9.1f} | {percentile(latencies, 99):>9.1f}")
+
+        firsts, lasts = [], []
+        for _ in range(MESSAGE_COUNT):
+            first, last = await send_and_time(session, sockets, client, provider["user"]["user_id"])
+            firsts.append(first)
+            lasts.append(last)
+        print(f"\nPush of {MESSAGE_COUNT} messages to {len(sockets)} sockets")
+        print(f"  first socket: p50 {statistics.median(firsts):.1f} ms, max {max(firsts):.1f} ms")
+        print(f"  last socket:  p50 {statistics.median(lasts):.1f} ms, max {max(lasts):.1f} ms")
+
+        await asyncio.gather(*(socket.close() for socket in sockets))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
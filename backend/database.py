@@ -1,4 +1,8 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+import asyncio
 import os
 from dotenv import load_dotenv
 from pathlib import Path
@@ -26,26 +30,45 @@ payments_collection = db['payments']
 pending_items_collection = db['pending_items']
 provider_settings_collection = db['provider_settings']
 refund_requests_collection = db['refund_requests']
+provider_stats_collection = db['provider_stats']
+client_stats_collection = db['client_stats']
+booking_locks_collection = db['booking_locks']
+scheduled_jobs_collection = db['scheduled_jobs']
+email_outbox_collection = db['email_outbox']
+message_digests_collection = db['message_digests']
 
 async def init_db():
     """Initialize database indexes for performance and uniqueness"""
     # Users
     await users_collection.create_index("email", unique=True)
+    await users_collection.create_index("user_id")
     await users_collection.create_index("userType")
     await users_collection.create_index("providerId")
     
     # Appointments
-    await appointments_collection.create_index([("providerId", 1), ("date", -1)])
-    await appointments_collection.create_index([("clientId", 1), ("date", -1)])
+    await appointments_collection.create_index([("providerId", 1), ("date", -1), ("_id", -1)])
+    await appointments_collection.create_index([("clientId", 1), ("date", -1), ("_id", -1)])
     await appointments_collection.create_index("status")
+    await appointments_collection.create_index([("providerId", 1), ("startsAt", -1), ("_id", -1)])
+    await appointments_collection.create_index([("clientId", 1), ("startsAt", -1), ("_id", -1)])
+    await appointments_collection.create_index("startsAt")
     
     # Messages
     await messages_collection.create_index([("senderId", 1), ("receiverId", 1), ("timestamp", -1)])
+    # Message sync over all conversations: each side of the participant $or
+    # walks one of these in (timestamp, _id) order
+    await messages_collection.create_index([("receiverId", 1), ("timestamp", 1), ("_id", 1)])
+    await messages_collection.create_index([("senderId", 1), ("timestamp", 1), ("_id", 1)])
+    # Read receipts missed while a client's socket was down
+    await messages_collection.create_index([("receiverId", 1), ("readAt", 1)])
+    await messages_collection.create_index([("senderId", 1), ("readAt", 1)])
     await messages_collection.create_index("read")
     
     # Invoices
     await invoices_collection.create_index([("clientId", 1), ("status", 1)])
     await invoices_collection.create_index([("providerId", 1), ("status", 1)])
+    await invoices_collection.create_index([("clientId", 1), ("invoiceDate", -1), ("_id", -1)])
+    await invoices_collection.create_index([("providerId", 1), ("invoiceDate", -1), ("_id", -1)])
     
     # Clinical Notes
     await clinical_notes_collection.create_index("appointmentId", unique=True)
@@ -54,6 +77,7 @@ async def init_db():
     # Audit Logs
     await audit_logs_collection.create_index([("userId", 1), ("timestamp", -1)])
     await audit_logs_collection.create_index("action")
+    await audit_logs_collection.create_index("timestamp")
     
     # Invite Codes
     await invite_codes_collection.create_index("code", unique=True)
@@ -80,11 +104,41 @@ async def init_db():
     await refund_requests_collection.create_index([("clientId", 1), ("status", 1)])
     await refund_requests_collection.create_index([("providerId", 1), ("status", 1)])
     
+    # Materialized dashboard counters
+    await provider_stats_collection.create_index("providerId", unique=True)
+    await client_stats_collection.create_index("clientId", unique=True)
+    
+    # Scheduled jobs (appointment reminders)
+    await scheduled_jobs_collection.create_index([("type", 1), ("status", 1), ("dueAt", 1)])
+    await scheduled_jobs_collection.create_index([("type", 1), ("status", 1), ("lockedUntil", 1)])
+    
+    # Email outbox (sent messages are removed after EMAIL_OUTBOX_RETENTION_DAYS)
+    await email_outbox_collection.create_index([("status", 1), ("nextAttemptAt", 1)])
+    await email_outbox_collection.create_index([("status", 1), ("lockedUntil", 1)])
+    await email_outbox_collection.create_index("claim", sparse=True)
+    await email_outbox_collection.create_index(
+        "sentAt", expireAfterSeconds=int(float(os.environ.get("EMAIL_OUTBOX_RETENTION_DAYS", "30")) * 86400)
+    )
+    
+    # Pending new-message digests (one per provider/client pair)
+    await message_digests_collection.create_index("dueAt")
+    await message_digests_collection.create_index("lockedUntil", sparse=True)
+    
+    # Booking locks (expired leases are removed by MongoDB)
+    await booking_locks_collection.create_index("expiresAt", expireAfterSeconds=0)
+    
     print("✓ Database indexes created")
 
 async def log_audit(user_id: str, action: str, resource_type: str, resource_id: str, details: dict = None):
-    """Log audit trail for security and compliance"""
+    """
+    Log audit trail for security and compliance.
+    
+    The entry is queued for the background batch writer; before the writer
+    is started (scripts, tests) it is inserted directly.
+    """
     from datetime import datetime
+    from services.audit_store import audit_store
+    from services.audit_writer import audit_writer
     
     audit_entry = {
         "userId": user_id,
@@ -96,4 +150,114 @@ async def log_audit(user_id: str, action: str, resource_type: str, resource_id:
         "ipAddress": None  # Can be added from request
     }
     
-    await audit_logs_collection.insert_one(audit_entry)
+    if audit_writer.running:
+        await audit_writer.enqueue(audit_entry)
+    else:
+        await audit_store.insert_one(audit_entry)
+
+
+class UserLoader:
+    """
+    Batched, cached users_collection lookups by user_id (DataLoader style).
+    
+    Every load() issued during the same event-loop tick is merged into one
+    {"user_id": {"$in": [...]}} query, and each user is fetched at most once
+    for the lifetime of the loader. Create one per request (see
+    user_loader_scope) or per background job cycle.
+    """
+    
+    def __init__(self):
+        self._cache = {}  # user_id -> Future resolving to the user doc (or None)
+        self._queue = []
+        self._dispatch_scheduled = False
+    
+    async def load(self, user_id: str, with_password: bool = False) -> Optional[dict]:
+        """Get a user by user_id; the password hash is stripped unless requested"""
+        future = self._cache.get(user_id)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._cache[user_id] = future
+            self._queue.append(user_id)
+            if not self._dispatch_scheduled:
+                self._dispatch_scheduled = True
+                loop.call_soon(self._dispatch)
+        
+        # Shield so a cancelled caller doesn't cancel the shared result
+        user = await asyncio.shield(future)
+        if user is None:
+            return None
+        if with_password:
+            return dict(user)
+        return {k: v for k, v in user.items() if k != "password"}
+    
+    async def load_many(self, user_ids, with_password: bool = False) -> list:
+        """Get several users in one query; missing users come back as None"""
+        return await asyncio.gather(*(self.load(uid, with_password) for uid in user_ids))
+    
+    def prime(self, user: dict):
+        """Seed the cache with a user document that was already fetched"""
+        if user.get("user_id") and user["user_id"] not in self._cache:
+            future = asyncio.get_running_loop().create_future()
+            future.set_result({k: v for k, v in user.items() if k != "_id"})
+            self._cache[user["user_id"]] = future
+    
+    def clear(self, user_id: str):
+        """Drop a cached user, e.g. after it was updated"""
+        self._cache.pop(user_id, None)
+    
+    def _dispatch(self):
+        self._dispatch_scheduled = False
+        user_ids, self._queue = self._queue, []
+        if user_ids:
+            asyncio.ensure_future(self._fetch(user_ids))
+    
+    async def _fetch(self, user_ids: list):
+        futures = {uid: self._cache[uid] for uid in user_ids if uid in self._cache}
+        try:
+            users = await users_collection.find(
+                {"user_id": {"$in": user_ids}},
+                {"_id": 0}
+            ).to_list(len(user_ids))
+        except Exception as e:
+            for future in futures.values():
+                if not future.done():
+                    future.set_exception(e)
+            # Don't cache failures
+            for uid in user_ids:
+                if self._cache.get(uid) is futures.get(uid):
+                    self._cache.pop(uid, None)
+            return
+        
+        found = {user["user_id"]: user for user in users}
+        for uid, future in futures.items():
+            if not future.done():
+                future.set_result(found.get(uid))
+
+
+_current_user_loader: ContextVar[Optional[UserLoader]] = ContextVar("user_loader", default=None)
+
+
+@contextmanager
+def user_loader_scope():
+    """Install a fresh UserLoader for the current request or job"""
+    token = _current_user_loader.set(UserLoader())
+    try:
+        yield _current_user_loader.get()
+    finally:
+        _current_user_loader.reset(token)
+
+
+def get_user_loader() -> UserLoader:
+    """Return the loader of the current scope (an uncached one outside any scope)"""
+    return _current_user_loader.get() or UserLoader()
+
+
+async def load_user(user_id: str, with_password: bool = False) -> Optional[dict]:
+    """Get a user by user_id through the current request's batched loader"""
+    return await get_user_loader().load(user_id, with_password)
+
+
+async def load_users(user_ids, with_password: bool = False) -> list:
+    """Get several users by user_id with a single $in query"""
+    return await get_user_loader().load_many(user_ids, with_password)
@@ -102,6 +102,8 @@ class AppointmentInDB(AppointmentBase):
     id: str = Field(alias="_id")
     status: Literal['pending', 'confirmed', 'completed', 'cancelled'] = 'pending'
     videoLink: Optional[str] = None
+    startsAt: Optional[datetime] = None  # UTC, derived from date/time/duration
+    endsAt: Optional[datetime] = None
     createdAt: datetime = Field(default_factory=datetime.utcnow)
     updatedAt: datetime = Field(default_factory=datetime.utcnow)
 
@@ -309,6 +311,9 @@ class PendingItemResponse(PendingItemBase):
 
 
 
+# Languages of the invoice PDF templates (see services.invoice_validation.LANGUAGE_TO_COUNTRY)
+InvoiceLanguage = Literal['en', 'sl', 'de', 'fr', 'es', 'it', 'pt', 'nl']
+
 # Provider Business Settings (for EU/Slovenian invoices)
 class ProviderBusinessSettings(BaseModel):
     # Business details
@@ -335,7 +340,10 @@ class ProviderBusinessSettings(BaseModel):
     vatRate: float = 22.0  # Slovenia standard VAT rate
     
     # Branding
-    logoUrl: Optional[str] = None
+    logoUrl: Optional[str] = None  # /api/logo/{logoHash}
+    logoHash: Optional[str] = None
+    invoiceLanguage: InvoiceLanguage = "sl"  # Local labels next to English
+    invoiceColor: str = "#1e40af"  # Accent colour of the invoice PDF
     
     # Contact
     businessEmail: Optional[str] = None
@@ -358,6 +366,8 @@ class ProviderSettingsUpdate(BaseModel):
     defaultPaymentTermDays: Optional[int] = None
     vatRate: Optional[float] = None
     logoUrl: Optional[str] = None
+    invoiceLanguage: Optional[InvoiceLanguage] = None
+    invoiceColor: Optional[str] = Field(None, pattern=r"^#[0-9a-fA-F]{6}$")
     businessEmail: Optional[str] = None
     businessPhone: Optional[str] = None
     website: Optional[str] = None
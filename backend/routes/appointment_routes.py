@@ -3,11 +3,30 @@ from auth import get_current_user
 from database import appointments_collection, users_collection, log_audit
 from models import AppointmentCreate, AppointmentUpdate
 from datetime import datetime, timezone, date
+from pymongo import ReturnDocument
+from contextlib import asynccontextmanager
+from services.provider_stats import record_appointment_change
+from services.appointment_index import booking_lock, ensure_no_conflict, with_bounds, BookingConflict, BookingBusy
+from services.slot_engine import invalidate_appointment_availability
+from services.reminder_scheduler import schedule_appointment_reminder, cancel_appointment_reminder, REMINDER_STATUSES
 import uuid
 import secrets
 
 router = APIRouter(prefix="/appointments", tags=["Appointments"])
 
+@asynccontextmanager
+async def _booking_guard(provider_id: str):
+    """booking_lock that maps booking errors to HTTP errors"""
+    try:
+        async with booking_lock(provider_id):
+            yield
+    except BookingConflict:
+        raise HTTPException(status_code=409, detail="This time overlaps an existing appointment")
+    except BookingBusy:
+        raise HTTPException(status_code=503, detail="Booking is busy, please try again")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid appointment date or time")
+
 def generate_google_meet_link():
     """Generate a unique Google Meet-style link
     In production, you would integrate with Google Calendar API or Google Meet API
@@ -52,8 +71,15 @@ async def create_appointment(
         "createdAt": datetime.now(timezone.utc),
         "updatedAt": datetime.now(timezone.utc)
     })
-    
-    await appointments_collection.insert_one(appointment_dict)
+    with_bounds(appointment_dict)
+    
+    # Check for overlaps and insert while holding the provider's booking lock
+    async with _booking_guard(appointment.providerId):
+        await ensure_no_conflict(appointment.providerId, appointment_dict)
+        await appointments_collection.insert_one(appointment_dict)
+        invalidate_appointment_availability(appointment_dict)
+    await record_appointment_change(None, appointment_dict)
+    await schedule_appointment_reminder(appointment_dict)
     await log_audit(current_user["userId"], "create", "appointment", appointment_id)
     
     return {
@@ -109,11 +135,45 @@ async def update_appointment(
     
     update_dict["updatedAt"] = datetime.now(timezone.utc)
     
-    # Update appointment
-    await appointments_collection.update_one(
-        {"_id": appointment_id},
-        {"$set": update_dict}
-    )
+    moved = "date" in update_dict or "time" in update_dict
+    if moved:
+        # Keep startsAt/endsAt in step with the new date/time
+        update_dict.update({
+            key: value for key, value in with_bounds({**appointment, **update_dict}).items()
+            if key in ("startsAt", "endsAt")
+        })
+    
+    updated = {**appointment, **update_dict}
+    reactivated = appointment.get("status") == "cancelled" and updated.get("status") != "cancelled"
+    
+    if updated.get("status") != "cancelled" and (moved or reactivated):
+        # Rescheduling must not overlap another booking
+        async with _booking_guard(appointment["providerId"]):
+            await ensure_no_conflict(appointment["providerId"], updated, exclude_id=appointment_id)
+            previous = await appointments_collection.find_one_and_update(
+                {"_id": appointment_id},
+                {"$set": update_dict},
+                return_document=ReturnDocument.BEFORE
+            )
+    else:
+        previous = await appointments_collection.find_one_and_update(
+            {"_id": appointment_id},
+            {"$set": update_dict},
+            return_document=ReturnDocument.BEFORE
+        )
+    
+    if previous is None:
+        # Deleted since it was read above
+        raise HTTPException(status_code=404, detail="Appointment not found")
+    
+    updated = {**previous, **update_dict}
+    invalidate_appointment_availability(previous, updated)
+    await record_appointment_change(previous, updated)
+    if updated.get("status") not in REMINDER_STATUSES:
+        await cancel_appointment_reminder(appointment_id)
+    elif moved or previous.get("status") not in REMINDER_STATUSES:
+        # Only a new start time or a reactivation needs a (new) reminder
+        await schedule_appointment_reminder(updated)
     
     await log_audit(current_user["userId"], "update", "appointment", appointment_id, update_dict)
     
@@ -135,10 +195,17 @@ async def cancel_appointment(
         raise HTTPException(status_code=403, detail="Not authorized")
     
     # Update status to cancelled
-    await appointments_collection.update_one(
+    cancel_update = {"status": "cancelled", "updatedAt": datetime.now(timezone.utc)}
+    previous = await appointments_collection.find_one_and_update(
         {"_id": appointment_id},
-        {"$set": {"status": "cancelled", "updatedAt": datetime.now(timezone.utc)}}
+        {"$set": cancel_update},
+        return_document=ReturnDocument.BEFORE
     )
+    if previous is None:
+        raise HTTPException(status_code=404, detail="Appointment not found")
+    invalidate_appointment_availability(previous)
+    await record_appointment_change(previous, {**previous, **cancel_update})
+    await cancel_appointment_reminder(appointment_id)
     
     await log_audit(current_user["userId"], "delete", "appointment", appointment_id)
     
@@ -0,0 +1,134 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import StreamingResponse
+from auth import get_current_provider
+from database import users_collection, log_audit
+from services.audit_store import audit_store
+from datetime import datetime, timezone
+from typing import Optional
+import csv
+import io
+import json
+
+router = APIRouter(prefix="/audit", tags=["Audit"])
+
+CSV_COLUMNS = ["timestamp", "userId", "action", "resourceType", "resourceId", "ipAddress", "details"]
+
+# Rows are buffered into chunks of this many before being sent
+STREAM_CHUNK_ROWS = 500
+
+
+def _to_utc_naive(value: Optional[datetime]) -> Optional[datetime]:
+    """Audit timestamps are stored as naive UTC"""
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _serialize(entry: dict) -> dict:
+    timestamp = entry.get("timestamp")
+    return {
+        "id": str(entry["_id"]),
+        "timestamp": timestamp.isoformat() if isinstance(timestamp, datetime) else timestamp,
+        "userId": entry.get("userId"),
+        "action": entry.get("action"),
+        "resourceType": entry.get("resourceType"),
+        "resourceId": entry.get("resourceId"),
+        "ipAddress": entry.get("ipAddress"),
+        "details": entry.get("details") or {}
+    }
+
+
+async def _ndjson_rows(entries):
+    chunk = []
+    async for entry in entries:
+        chunk.append(json.dumps(_serialize(entry), default=str))
+        if len(chunk) >= STREAM_CHUNK_ROWS:
+            yield "\n".join(chunk) + "\n"
+            chunk = []
+    if chunk:
+        yield "\n".join(chunk) + "\n"
+
+
+async def _csv_rows(entries):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    rows = 0
+    async for entry in entries:
+        row = _serialize(entry)
+        row["details"] = json.dumps(row["details"], default=str)
+        writer.writerow([row[column] for column in CSV_COLUMNS])
+        rows += 1
+        if rows >= STREAM_CHUNK_ROWS:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            rows = 0
+    yield buffer.getvalue()
+
+
+@router.get("/export")
+async def export_audit_logs(
+    user_id: Optional[str] = Query(None, alias="userId", description="Only entries of this user"),
+    resource_type: Optional[str] = Query(None, alias="resourceType"),
+    action: Optional[str] = Query(None),
+    start: Optional[datetime] = Query(None, alias="from", description="Inclusive start (ISO 8601)"),
+    end: Optional[datetime] = Query(None, alias="to", description="Exclusive end (ISO 8601)"),
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    current_user: dict = Depends(get_current_provider)
+):
+    """
+    Stream audit entries of the provider and their clients as NDJSON or CSV.
+
+    Entries are read from the database cursor and written to the response
+    in chunks, so exports of any size run in constant memory.
+    """
+    provider_id = current_user["userId"]
+    start, end = _to_utc_naive(start), _to_utc_naive(end)
+    if start and end and start >= end:
+        raise HTTPException(status_code=400, detail="'from' must be before 'to'")
+
+    if user_id:
+        if user_id != provider_id:
+            client = await users_collection.find_one(
+                {"user_id": user_id, "userType": "client", "providerId": provider_id},
+                {"_id": 1}
+            )
+            if not client:
+                raise HTTPException(status_code=403, detail="Not authorized to view this user's audit log")
+        query = {"userId": user_id}
+    else:
+        user_ids = [provider_id]
+        async for client in users_collection.find(
+            {"userType": "client", "providerId": provider_id},
+            {"_id": 0, "user_id": 1}
+        ):
+            user_ids.append(client["user_id"])
+        query = {"userId": {"$in": user_ids}}
+
+    if resource_type:
+        query["resourceType"] = resource_type
+    if action:
+        query["action"] = action
+
+    await log_audit(provider_id, "export", "audit_log", user_id or provider_id, {
+        "format": format,
+        "resourceType": resource_type,
+        "action": action,
+        "from": start.isoformat() if start else None,
+        "to": end.isoformat() if end else None
+    })
+
+    entries = audit_store.iter_logs(query, start, end)
+    stamp = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+
+    if format == "csv":
+        body, media_type, extension = _csv_rows(entries), "text/csv", "csv"
+    else:
+        body, media_type, extension = _ndjson_rows(entries), "application/x-ndjson", "ndjson"
+
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="audit-{stamp}.{extension}"'}
+    )
@@ -1,8 +1,9 @@
 from fastapi import APIRouter, HTTPException, Depends, Response, Request
 from fastapi.responses import JSONResponse
 from models import UserCreate, UserResponse, Token, LoginRequest, GoogleAuthRequest, TokenData
-from auth import get_password_hash, verify_password, create_access_token, get_current_user
-from database import users_collection, invite_codes_collection, log_audit
+from auth import get_password_hash_async, verify_password_async, create_access_token, get_current_user
+from database import users_collection, invite_codes_collection, log_audit, get_user_loader
+from services.provider_stats import record_client_joined
 import httpx
 from datetime import datetime, timezone, timedelta
 from bson import ObjectId
@@ -62,7 +63,7 @@ async def register(user: UserCreate):
     user_id = f"user_{uuid.uuid4().hex[:12]}"
     
     # Hash password
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash_async(user.password)
     
     # Create user document
     user_dict = user.model_dump(exclude={"password", "inviteCode"})
@@ -84,6 +85,8 @@ async def register(user: UserCreate):
     
     # Insert user
     await users_collection.insert_one(user_dict)
+    if user.userType == "client" and provider_id:
+        await record_client_joined(provider_id)
     
     # Create token
     token = create_access_token({
@@ -110,7 +113,7 @@ async def login(credentials: LoginRequest):
     """Login with email/password"""
     # Find user
     user = await users_collection.find_one({"email": credentials.email})
-    if not user or not verify_password(credentials.password, user["password"]):
+    if not user or not await verify_password_async(credentials.password, user["password"]):
         raise HTTPException(status_code=401, detail="Invalid email or password")
     
     # Create token
@@ -120,11 +123,10 @@ async def login(credentials: LoginRequest):
         "userType": user["userType"]
     })
     
-    # Get user without password and _id
-    user_doc = await users_collection.find_one(
-        {"user_id": user["user_id"]},
-        {"_id": 0, "password": 0}
-    )
+    # Get user without password and _id (served from the document read above)
+    loader = get_user_loader()
+    loader.prime(user)
+    user_doc = await loader.load(user["user_id"])
     
     await log_audit(user["user_id"], "view", "user", user["user_id"], {"action": "login"})
     
@@ -195,7 +197,7 @@ async def google_auth(auth_request: GoogleAuthRequest, response: Response):
                 "avatar": user_data.get("picture"),
                 "userType": auth_request.userType,
                 "phone": None,
-                "password": get_password_hash(str(uuid.uuid4())),  # Random password for OAuth users
+                "password": await get_password_hash_async(str(uuid.uuid4())),  # Random password for OAuth users
                 "createdAt": datetime.now(timezone.utc),
                 "updatedAt": datetime.now(timezone.utc)
             }
@@ -214,6 +216,8 @@ async def google_auth(auth_request: GoogleAuthRequest, response: Response):
                 user_doc["providerId"] = provider_id
             
             await users_collection.insert_one(user_doc)
+            if auth_request.userType == "client" and provider_id:
+                await record_client_joined(provider_id)
             user_type = auth_request.userType
         
         # Create JWT token
@@ -330,11 +334,11 @@ async def change_password(password_data: dict, current_user: dict = Depends(get_
         raise HTTPException(status_code=404, detail="User not found")
     
     # Verify current password
-    if not verify_password(current_password, user["password"]):
+    if not await verify_password_async(current_password, user["password"]):
         raise HTTPException(status_code=400, detail="Current password is incorrect")
     
     # Update password
-    hashed_password = get_password_hash(new_password)
+    hashed_password = await get_password_hash_async(new_password)
     await users_collection.update_one(
         {"user_id": user_id},
         {"$set": {
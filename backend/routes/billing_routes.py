@@ -1,8 +1,11 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
 from auth import get_current_user, get_current_provider
 from database import invoices_collection, appointments_collection, log_audit
 from models import InvoiceCreate
 from datetime import datetime, date, timezone
+from services.provider_stats import record_invoice_change
+from services.pagination import paginate, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from typing import Optional
 import uuid
 import os
 
@@ -19,9 +22,11 @@ router = APIRouter(prefix="/billing", tags=["Billing"])
 @router.get("/invoices")
 async def get_invoices(
     status: str = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size; enables cursor pagination"),
+    after: Optional[str] = Query(None, description="Cursor returned as nextCursor by the previous page"),
     current_user: dict = Depends(get_current_user)
 ):
-    """Get user invoices"""
+    """Get user invoices, optionally one page at a time"""
     user_id = current_user["userId"]
     user_type = current_user["userType"]
     
@@ -34,6 +39,12 @@ async def get_invoices(
     if status:
         query["status"] = status
     
+    if limit or after:
+        return await paginate(
+            invoices_collection, query, {"_id": 0},
+            "invoiceDate", -1, limit or DEFAULT_PAGE_SIZE, after
+        )
+    
     invoices = await invoices_collection.find(
         query,
         {"_id": 0}
@@ -74,6 +85,7 @@ async def create_invoice(
     })
     
     await invoices_collection.insert_one(invoice_dict)
+    await record_invoice_change(None, invoice_dict)
     await log_audit(provider_id, "create", "invoice", invoice_id)
     
     return {
@@ -155,15 +167,17 @@ async def process_payment(
             raise HTTPException(status_code=400, detail=f"Payment failed: {str(e)}")
     
     # Update invoice
+    invoice_update = {
+        "status": "paid",
+        "paymentMethod": "card",
+        "transactionId": transaction_id,
+        "updatedAt": datetime.now(timezone.utc)
+    }
     await invoices_collection.update_one(
         {"_id": invoice_id},
-        {"$set": {
-            "status": "paid",
-            "paymentMethod": "card",
-            "transactionId": transaction_id,
-            "updatedAt": datetime.now(timezone.utc)
-        }}
+        {"$set": invoice_update}
     )
+    await record_invoice_change(invoice, {**invoice, **invoice_update})
     
     await log_audit(current_user["userId"], "update", "invoice", invoice_id, {"action": "payment"})
     
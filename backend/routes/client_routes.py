@@ -1,8 +1,12 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
 from auth import get_current_client
-from database import users_collection, appointments_collection, messages_collection, invoices_collection, working_hours_collection, log_audit
+from database import users_collection, appointments_collection, log_audit
 from models import ClientDashboardStats, AppointmentCreate
-from datetime import datetime, date, timezone, timedelta
+from datetime import datetime, date, timezone
+from services.provider_stats import get_client_dashboard_stats
+from services.pagination import paginate, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from services.slot_engine import get_available_slots, get_day_slots
+from typing import Optional
 import uuid
 
 router = APIRouter(prefix="/client", tags=["Client"])
@@ -12,36 +16,10 @@ async def get_dashboard(current_user: dict = Depends(get_current_client)):
     """Get client dashboard statistics"""
     client_id = current_user["userId"]
     
-    # Get upcoming appointments
-    upcoming_appointments = await appointments_collection.count_documents({
-        "clientId": client_id,
-        "status": {"$in": ["confirmed", "pending"]}
-    })
+    # Statistics are maintained incrementally in one client_stats document
+    stats = await get_client_dashboard_stats(client_id)
     
-    # Get pending payments
-    pending_payments = await invoices_collection.count_documents({
-        "clientId": client_id,
-        "status": {"$in": ["pending", "overdue"]}
-    })
-    
-    # Get unread messages
-    unread_messages = await messages_collection.count_documents({
-        "receiverId": client_id,
-        "read": False
-    })
-    
-    # Get completed sessions
-    completed_sessions = await appointments_collection.count_documents({
-        "clientId": client_id,
-        "status": "completed"
-    })
-    
-    return ClientDashboardStats(
-        upcomingAppointments=upcoming_appointments,
-        pendingPayments=pending_payments,
-        unreadMessages=unread_messages,
-        completedSessions=completed_sessions
-    )
+    return ClientDashboardStats(**stats)
 
 @router.get("/provider")
 async def get_provider(current_user: dict = Depends(get_current_client)):
@@ -67,37 +45,60 @@ async def get_provider(current_user: dict = Depends(get_current_client)):
 @router.get("/appointments")
 async def get_appointments(
     status: str = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size; enables cursor pagination"),
+    after: Optional[str] = Query(None, description="Cursor returned as nextCursor by the previous page"),
     current_user: dict = Depends(get_current_client)
 ):
-    """Get client appointments"""
+    """Get client appointments, optionally one page at a time"""
     client_id = current_user["userId"]
     
     query = {"clientId": client_id}
     if status:
         query["status"] = status
     
+    if limit or after:
+        return await paginate(
+            appointments_collection, query, {"_id": 0},
+            "startsAt", -1, limit or DEFAULT_PAGE_SIZE, after
+        )
+    
     appointments = await appointments_collection.find(
         query,
         {"_id": 0}
-    ).sort("date", -1).to_list(None)
+    ).sort([("startsAt", -1), ("_id", -1)]).to_list(None)
     
     return appointments
 
 
+async def _get_client_provider_id(client_id: str) -> str:
+    client = await users_collection.find_one({"user_id": client_id})
+    if not client or not client.get("providerId"):
+        raise HTTPException(status_code=404, detail="No provider assigned")
+    return client["providerId"]
+
+
+@router.get("/provider/available-slots")
+async def get_provider_available_slots_range(
+    start: date = Query(..., alias="from", description="First date (YYYY-MM-DD)"),
+    end: date = Query(..., alias="to", description="Last date (YYYY-MM-DD), inclusive"),
+    current_user: dict = Depends(get_current_client)
+):
+    """Get available time slots from assigned provider for every date in a range"""
+    provider_id = await _get_client_provider_id(current_user["userId"])
+    
+    try:
+        return await get_available_slots(provider_id, start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.get("/provider/available-slots/{date_str}")
 async def get_provider_available_slots(
     date_str: str,
     current_user: dict = Depends(get_current_client)
 ):
     """Get available time slots from assigned provider for a specific date"""
-    client_id = current_user["userId"]
-    
-    # Get client's provider
-    client = await users_collection.find_one({"user_id": client_id})
-    if not client or not client.get("providerId"):
-        raise HTTPException(status_code=404, detail="No provider assigned")
-    
-    provider_id = client["providerId"]
+    provider_id = await _get_client_provider_id(current_user["userId"])
     
     # Validate date format
     try:
@@ -105,95 +106,4 @@ async def get_provider_available_slots(
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
     
-    # Don't allow booking in the past
-    if target_date < date.today():
-        return {"slots": [], "message": "Cannot book appointments in the past"}
-    
-    # Get provider's working hours
-    schedule = await working_hours_collection.find_one({"providerId": provider_id})
-    
-    if not schedule:
-        # Use default schedule (Mon-Fri 9-5)
-        schedule = {
-            "monday": {"enabled": True, "startTime": "09:00", "endTime": "17:00"},
-            "tuesday": {"enabled": True, "startTime": "09:00", "endTime": "17:00"},
-            "wednesday": {"enabled": True, "startTime": "09:00", "endTime": "17:00"},
-            "thursday": {"enabled": True, "startTime": "09:00", "endTime": "17:00"},
-            "friday": {"enabled": True, "startTime": "09:00", "endTime": "17:00"},
-            "saturday": {"enabled": False, "startTime": "09:00", "endTime": "17:00"},
-            "sunday": {"enabled": False, "startTime": "09:00", "endTime": "17:00"},
-            "slotDuration": 60
-        }
-    
-    # Get day of week
-    day_names = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
-    day_name = day_names[target_date.weekday()]
-    
-    day_schedule = schedule.get(day_name, {})
-    
-    if not day_schedule.get('enabled', False):
-        return {"slots": [], "message": f"Provider is not available on {day_name.capitalize()}"}
-    
-    # Get slot duration
-    slot_duration = schedule.get('slotDuration', 60)
-    
-    # Generate time slots
-    start_time = datetime.strptime(day_schedule['startTime'], "%H:%M")
-    end_time = datetime.strptime(day_schedule['endTime'], "%H:%M")
-    
-    # Get break times if set
-    break_start = None
-    break_end = None
-    if day_schedule.get('breakStart') and day_schedule.get('breakEnd'):
-        break_start = datetime.strptime(day_schedule['breakStart'], "%H:%M")
-        break_end = datetime.strptime(day_schedule['breakEnd'], "%H:%M")
-    
-    # Get existing appointments for this date (NOT cancelled)
-    existing_appointments = await appointments_collection.find({
-        "providerId": provider_id,
-        "date": date_str,
-        "status": {"$nin": ["cancelled"]}
-    }).to_list(None)
-    
-    booked_times = set()
-    for apt in existing_appointments:
-        booked_times.add(apt['time'])
-    
-    # Generate available slots
-    slots = []
-    current_time = start_time
-    
-    while current_time + timedelta(minutes=slot_duration) <= end_time:
-        time_str = current_time.strftime("%I:%M %p")
-        time_24h = current_time.strftime("%H:%M")
-        
-        # Check if slot is during break
-        is_break = False
-        if break_start and break_end:
-            if break_start <= current_time < break_end:
-                is_break = True
-        
-        # Check if slot is already booked
-        is_booked = time_str in booked_times
-        
-        if not is_break and not is_booked:
-            # For today, don't show past times
-            if target_date == date.today():
-                now = datetime.now()
-                slot_datetime = datetime.combine(target_date, current_time.time())
-                if slot_datetime > now:
-                    slots.append({
-                        "time": time_str,
-                        "time24h": time_24h,
-                        "available": True
-                    })
-            else:
-                slots.append({
-                    "time": time_str,
-                    "time24h": time_24h,
-                    "available": True
-                })
-        
-        current_time += timedelta(minutes=slot_duration)
-    
-    return {"slots": slots, "slotDuration": slot_duration}
+    return await get_day_slots(provider_id, target_date)
@@ -1,39 +1,72 @@
-from fastapi import APIRouter, HTTPException, Depends
-from fastapi.responses import Response
-from auth import get_current_user
+from fastapi import APIRouter, HTTPException, Depends, Header, Query
+from fastapi.responses import Response, StreamingResponse
+from auth import get_current_user, get_current_provider
 from database import (
-    invoices_collection, appointments_collection, users_collection,
-    provider_settings_collection, log_audit
+    invoices_collection, appointments_collection, log_audit, load_user, load_users
 )
-from datetime import datetime, timezone
-import io
-
-# PDF Generation
-try:
-    from reportlab.lib.pagesizes import A4
-    from reportlab.lib.units import mm
-    from reportlab.lib import colors
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
-    from reportlab.lib.enums import TA_LEFT, TA_RIGHT, TA_CENTER
-    import base64
-    PDF_ENABLED = True
-except ImportError:
-    PDF_ENABLED = False
-
+from services.provider_cache import get_provider_settings
+from services.invoice_pdf import PDF_ENABLED, get_invoice_number
+from services.pdf_cache import pdf_cache_key
+from services.invoice_export import get_invoice_pdf, stream_invoice_zip
+from datetime import date, datetime
+from typing import Optional
 router = APIRouter(prefix="/invoices", tags=["Invoices"])
 
-def decode_base64_image(data_url: str) -> bytes:
-    """Decode base64 data URL to bytes"""
-    if data_url and data_url.startswith('data:'):
-        # Remove the data URL prefix
-        header, base64_data = data_url.split(',', 1)
-        return base64.b64decode(base64_data)
-    return None
+@router.get("/export")
+async def export_invoice_pdfs(
+    start: Optional[date] = Query(None, alias="from", description="First invoice date (inclusive)"),
+    end: Optional[date] = Query(None, alias="to", description="Last invoice date (inclusive)"),
+    status: Optional[str] = Query(None, description="Filter by status: pending, paid, overdue, cancelled"),
+    current_user: dict = Depends(get_current_provider)
+):
+    """
+    Download the PDFs of all matching invoices as one ZIP archive.
+    
+    PDFs are rendered in parallel in the worker pool and the archive is
+    streamed as it is built, so memory use does not depend on the number
+    of invoices.
+    """
+    if not PDF_ENABLED:
+        raise HTTPException(
+            status_code=501, 
+            detail="PDF generation not available. Please install reportlab."
+        )
+    
+    provider_id = current_user["userId"]
+    
+    query = {"providerId": provider_id}
+    date_range = {}
+    if start:
+        date_range["$gte"] = start.isoformat()
+    if end:
+        date_range["$lte"] = end.isoformat()
+    if date_range:
+        query["invoiceDate"] = date_range
+    if status:
+        query["status"] = status
+    
+    provider = await load_user(provider_id)
+    provider_settings = await get_provider_settings(provider_id)
+    
+    await log_audit(provider_id, "view", "invoice_pdf_export", provider_id, {
+        "from": start.isoformat() if start else None,
+        "to": end.isoformat() if end else None,
+        "status": status
+    })
+    
+    invoices = invoices_collection.find(query).sort([("invoiceDate", 1), ("_id", 1)])
+    period = "_".join(d.isoformat() for d in (start, end) if d) or datetime.now().strftime("%Y-%m-%d")
+    
+    return StreamingResponse(
+        stream_invoice_zip(invoices, provider, provider_settings),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="invoices_{period}.zip"'}
+    )
 
 @router.get("/{invoice_id}/pdf")
 async def generate_invoice_pdf(
     invoice_id: str,
+    if_none_match: Optional[str] = Header(None),
     current_user: dict = Depends(get_current_user)
 ):
     """
@@ -46,6 +79,9 @@ async def generate_invoice_pdf(
     - Description of services
     - Net amount, VAT amount, gross amount
     - Payment terms and bank details
+    
+    Rendered PDFs are cached on disk by a hash of their inputs, which is
+    also sent as the ETag; a matching If-None-Match gets a 304.
     """
     if not PDF_ENABLED:
         raise HTTPException(
@@ -65,247 +101,32 @@ async def generate_invoice_pdf(
     if invoice["clientId"] != user_id and invoice["providerId"] != user_id:
         raise HTTPException(status_code=403, detail="Not authorized to access this invoice")
     
-    # Get provider info and settings
-    provider = await users_collection.find_one(
-        {"user_id": invoice["providerId"]},
-        {"_id": 0, "password": 0}
-    )
-    
-    provider_settings = await provider_settings_collection.find_one(
-        {"providerId": invoice["providerId"]},
-        {"_id": 0, "providerId": 0}
-    )
+    # Get provider and client info (one batched query) and settings
+    provider, client = await load_users([invoice["providerId"], invoice["clientId"]])
     
-    # Get client info
-    client = await users_collection.find_one(
-        {"user_id": invoice["clientId"]},
-        {"_id": 0, "password": 0}
-    )
-    
-    # Generate PDF
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(
-        buffer, 
-        pagesize=A4,
-        rightMargin=20*mm,
-        leftMargin=20*mm,
-        topMargin=20*mm,
-        bottomMargin=20*mm
-    )
-    
-    elements = []
-    styles = getSampleStyleSheet()
-    
-    # Custom styles
-    title_style = ParagraphStyle(
-        'Title',
-        parent=styles['Heading1'],
-        fontSize=24,
-        spaceAfter=10,
-        textColor=colors.HexColor('#1e40af')
-    )
-    
-    header_style = ParagraphStyle(
-        'Header',
-        parent=styles['Heading2'],
-        fontSize=12,
-        spaceAfter=5,
-        textColor=colors.HexColor('#374151')
-    )
-    
-    normal_style = ParagraphStyle(
-        'Normal',
-        parent=styles['Normal'],
-        fontSize=10,
-        spaceAfter=3
-    )
-    
-    small_style = ParagraphStyle(
-        'Small',
-        parent=styles['Normal'],
-        fontSize=8,
-        textColor=colors.HexColor('#6b7280')
-    )
-    
-    # Settings with defaults
-    settings = provider_settings or {}
-    vat_rate = settings.get('vatRate', 22.0)  # Slovenia standard VAT
-    
-    # Calculate amounts
-    gross_amount = invoice.get('amount', 0)
-    net_amount = gross_amount / (1 + vat_rate / 100)
-    vat_amount = gross_amount - net_amount
+    provider_settings = await get_provider_settings(invoice["providerId"])
     
-    # ===== HEADER WITH LOGO =====
-    header_data = []
-    
-    # Logo (if exists)
-    if settings.get('logoUrl'):
-        try:
-            logo_bytes = decode_base64_image(settings['logoUrl'])
-            if logo_bytes:
-                logo_io = io.BytesIO(logo_bytes)
-                logo = Image(logo_io, width=50*mm, height=25*mm)
-                header_data.append([logo, ''])
-        except Exception:
-            pass  # Skip logo if error
-    
-    # Invoice title
-    elements.append(Paragraph("RAČUN / INVOICE", title_style))
-    elements.append(Spacer(1, 5*mm))
-    
-    # ===== INVOICE INFO =====
-    invoice_number = invoice.get('invoiceNumber', f"INV-{invoice_id[:8].upper()}")
-    invoice_date = invoice.get('invoiceDate', invoice.get('createdAt', datetime.now()).strftime('%Y-%m-%d') if isinstance(invoice.get('createdAt'), datetime) else str(invoice.get('createdAt', '')))
-    due_date = invoice.get('dueDate', '')
-    
-    invoice_info = f"""
-    <b>Številka računa / Invoice No:</b> {invoice_number}<br/>
-    <b>Datum izdaje / Issue Date:</b> {invoice_date}<br/>
-    <b>Datum zapadlosti / Due Date:</b> {due_date}<br/>
-    <b>Kraj izdaje / Place:</b> {settings.get('city', 'Slovenia')}
-    """
-    elements.append(Paragraph(invoice_info, normal_style))
-    elements.append(Spacer(1, 10*mm))
-    
-    # ===== PROVIDER (ISSUER) INFO =====
-    elements.append(Paragraph("IZDAJATELJ / ISSUER", header_style))
-    
-    provider_name = settings.get('businessName') or provider.get('name', 'Provider')
-    provider_info = f"""
-    <b>{provider_name}</b><br/>
-    {settings.get('businessAddress', '')}<br/>
-    {settings.get('postalCode', '')} {settings.get('city', '')}<br/>
-    {settings.get('country', 'Slovenia')}<br/><br/>
-    <b>Davčna št. / Tax No:</b> {settings.get('taxNumber', 'N/A')}<br/>
-    <b>ID za DDV / VAT ID:</b> {settings.get('vatNumber', 'N/A')}<br/>
-    <b>Matična št. / Reg. No:</b> {settings.get('registrationNumber', 'N/A')}<br/>
-    <b>Email:</b> {settings.get('businessEmail', provider.get('email', ''))}<br/>
-    <b>Tel:</b> {settings.get('businessPhone', provider.get('phone', ''))}
-    """
-    elements.append(Paragraph(provider_info, normal_style))
-    elements.append(Spacer(1, 10*mm))
-    
-    # ===== CLIENT (RECIPIENT) INFO =====
-    elements.append(Paragraph("PREJEMNIK / RECIPIENT", header_style))
-    
-    client_name = client.get('name', 'Client') if client else 'Client'
-    client_info = f"""
-    <b>{client_name}</b><br/>
-    {client.get('address', '') if client else ''}<br/>
-    <b>Email:</b> {client.get('email', '') if client else ''}
-    """
-    elements.append(Paragraph(client_info, normal_style))
-    elements.append(Spacer(1, 10*mm))
-    
-    # ===== SERVICE TABLE =====
-    elements.append(Paragraph("STORITVE / SERVICES", header_style))
-    elements.append(Spacer(1, 3*mm))
-    
-    # Table header
-    table_data = [
-        ['Opis / Description', 'Kol. / Qty', 'Cena / Price', 'Znesek / Amount']
-    ]
-    
-    # Service row
-    description = invoice.get('description', 'Healthcare Service')
-    table_data.append([
-        description,
-        '1',
-        f'€{net_amount:.2f}',
-        f'€{net_amount:.2f}'
-    ])
-    
-    # Subtotal, VAT, Total
-    table_data.append(['', '', 'Osnova za DDV / Net:', f'€{net_amount:.2f}'])
-    table_data.append(['', '', f'DDV / VAT ({vat_rate}%):', f'€{vat_amount:.2f}'])
-    table_data.append(['', '', 'SKUPAJ / TOTAL:', f'€{gross_amount:.2f}'])
-    
-    # Create table
-    table = Table(table_data, colWidths=[90*mm, 20*mm, 35*mm, 35*mm])
-    table.setStyle(TableStyle([
-        # Header row
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1e40af')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 10),
-        ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-        
-        # Data rows
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 9),
-        ('ALIGN', (1, 1), (-1, -1), 'RIGHT'),
-        
-        # Totals styling
-        ('FONTNAME', (2, -3), (-1, -1), 'Helvetica-Bold'),
-        ('BACKGROUND', (2, -1), (-1, -1), colors.HexColor('#dbeafe')),
-        
-        # Grid
-        ('GRID', (0, 0), (-1, 1), 0.5, colors.HexColor('#d1d5db')),
-        ('LINEBELOW', (0, 0), (-1, 0), 1, colors.HexColor('#1e40af')),
-        
-        # Padding
-        ('TOPPADDING', (0, 0), (-1, -1), 6),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-    ]))
-    
-    elements.append(table)
-    elements.append(Spacer(1, 15*mm))
-    
-    # ===== PAYMENT DETAILS =====
-    elements.append(Paragraph("PLAČILNI PODATKI / PAYMENT DETAILS", header_style))
-    
-    payment_info = f"""
-    <b>Banka / Bank:</b> {settings.get('bankName', 'N/A')}<br/>
-    <b>IBAN:</b> {settings.get('iban', 'N/A')}<br/>
-    <b>BIC/SWIFT:</b> {settings.get('bic', 'N/A')}<br/>
-    <b>Sklic / Reference:</b> {invoice_number}<br/><br/>
-    <b>Rok plačila / Payment terms:</b> {settings.get('defaultPaymentTermDays', 15)} dni / days
-    """
-    elements.append(Paragraph(payment_info, normal_style))
-    elements.append(Spacer(1, 10*mm))
-    
-    # ===== STATUS =====
-    status = invoice.get('status', 'pending')
-    status_color = colors.HexColor('#16a34a') if status == 'paid' else colors.HexColor('#dc2626')
-    status_text = 'PLAČANO / PAID' if status == 'paid' else 'NEPLAČANO / UNPAID'
-    
-    status_style = ParagraphStyle(
-        'Status',
-        parent=styles['Heading2'],
-        fontSize=14,
-        textColor=status_color,
-        alignment=TA_CENTER
-    )
-    elements.append(Paragraph(status_text, status_style))
-    elements.append(Spacer(1, 10*mm))
-    
-    # ===== FOOTER =====
-    footer_text = """
-    Ta račun je izdan v skladu z Zakonom o davku na dodano vrednost (ZDDV-1).
-    This invoice is issued in accordance with Slovenian VAT legislation.
-    """
-    elements.append(Paragraph(footer_text, small_style))
-    
-    if settings.get('website'):
-        elements.append(Paragraph(f"Web: {settings['website']}", small_style))
+    invoice_number = get_invoice_number(invoice)
+    etag = f'"{pdf_cache_key(invoice, provider, client, provider_settings)}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "private, no-cache",
+        "Content-Disposition": f'attachment; filename="invoice_{invoice_number}.pdf"'
+    }
     
-    # Build PDF
-    doc.build(elements)
+    await log_audit(user_id, "view", "invoice_pdf", invoice_id)
     
-    # Get PDF content
-    pdf_content = buffer.getvalue()
-    buffer.close()
+    # Browser already has this exact PDF
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": headers["Cache-Control"]})
     
-    await log_audit(user_id, "view", "invoice_pdf", invoice_id)
+    pdf_content = await get_invoice_pdf(invoice, provider, client, provider_settings, key=etag.strip('"'))
     
     # Return PDF
     return Response(
         content=pdf_content,
         media_type="application/pdf",
-        headers={
-            "Content-Disposition": f'attachment; filename="invoice_{invoice_number}.pdf"'
-        }
+        headers=headers
     )
 
 @router.get("/{invoice_id}/preview")
@@ -325,20 +146,9 @@ async def preview_invoice_data(
         raise HTTPException(status_code=403, detail="Not authorized")
     
     # Get related data
-    provider = await users_collection.find_one(
-        {"user_id": invoice["providerId"]},
-        {"_id": 0, "password": 0}
-    )
-    
-    provider_settings = await provider_settings_collection.find_one(
-        {"providerId": invoice["providerId"]},
-        {"_id": 0, "providerId": 0}
-    )
+    provider, client = await load_users([invoice["providerId"], invoice["clientId"]])
     
-    client = await users_collection.find_one(
-        {"user_id": invoice["clientId"]},
-        {"_id": 0, "password": 0}
-    )
+    provider_settings = await get_provider_settings(invoice["providerId"])
     
     settings = provider_settings or {}
     vat_rate = settings.get('vatRate', 22.0)
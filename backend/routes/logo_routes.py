@@ -0,0 +1,32 @@
+from fastapi import APIRouter, HTTPException, Header
+from fastapi.responses import Response
+from services.logo_store import get_logo, LOGO_CONTENT_TYPE
+from typing import Optional
+import re
+
+router = APIRouter(prefix="/logo", tags=["Logos"])
+
+HASH_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+@router.get("/{logo_hash}")
+async def serve_logo(logo_hash: str, if_none_match: Optional[str] = Header(None)):
+    """
+    Serve a provider logo by content hash.
+
+    Public (it is printed on every invoice and loaded by <img> tags) and
+    immutable: a new upload gets a new hash, so browsers may cache it forever.
+    """
+    if not HASH_PATTERN.match(logo_hash):
+        raise HTTPException(status_code=404, detail="Logo not found")
+
+    etag = f'"{logo_hash}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    content = await get_logo(logo_hash)
+    if content is None:
+        raise HTTPException(status_code=404, detail="Logo not found")
+
+    return Response(content=content, media_type=LOGO_CONTENT_TYPE, headers=headers)
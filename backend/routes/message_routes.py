@@ -1,9 +1,14 @@
-from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
-from auth import get_current_user
+from fastapi import APIRouter, HTTPException, Depends, Query, WebSocket, WebSocketDisconnect, status
+from auth import get_current_user, get_user_from_token
 from database import messages_collection, users_collection, log_audit
 from models import MessageCreate
 from datetime import datetime, timezone
-from services.email_service import send_new_message_notification, is_email_configured
+from services.email_service import is_email_configured
+from services.message_digest import message_digest
+from services.message_hub import message_hub
+from services.provider_stats import record_message_sent, record_message_read
+from services.pagination import paginate, encode_cursor, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from typing import Optional
 import uuid
 import logging
 
@@ -11,12 +16,44 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/messages", tags=["Messages"])
 
+def _parse_timestamp(value: str, name: str) -> datetime:
+    """Message timestamp from an ISO string, as the naive UTC datetime MongoDB stores"""
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {name} timestamp")
+    return parsed.astimezone(timezone.utc).replace(tzinfo=None) if parsed.tzinfo else parsed
+
+async def _sync_page(query: dict, direction: int, timestamp: datetime, message_id: Optional[str], limit: int) -> dict:
+    """Messages after (direction 1) or before (-1) the (timestamp, _id) key, oldest first"""
+    if message_id:
+        after = encode_cursor(timestamp, message_id)
+    else:
+        query = {"$and": [query, {"timestamp": {"$gt" if direction > 0 else "$lt": timestamp}}]}
+        after = None
+    page = await paginate(messages_collection, query, {}, "timestamp", direction, limit, after)
+    items = page["items"] if direction > 0 else page["items"][::-1]
+    return {"items": items, "hasMore": page["hasMore"]}
+
 @router.get("")
 async def get_messages(
     conversationWith: str = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size; enables cursor pagination"),
+    after: Optional[str] = Query(None, description="Cursor returned as nextCursor by the previous page"),
+    since: Optional[str] = Query(None, description="Sync: only messages newer than this timestamp"),
+    sinceId: Optional[str] = Query(None, description="Sync: _id of the message at the since timestamp"),
+    before: Optional[str] = Query(None, description="Scroll-back: only messages older than this timestamp"),
+    beforeId: Optional[str] = Query(None, description="Scroll-back: _id of the message at the before timestamp"),
     current_user: dict = Depends(get_current_user)
 ):
-    """Get user messages, optionally filtered by conversation partner"""
+    """
+    Get user messages, optionally filtered by conversation partner and paginated.
+    
+    Sync mode: since (+ sinceId) = the timestamp/_id of the newest message
+    the client has returns up to limit newer messages; before (+ beforeId)
+    returns the newest limit messages older than that, for scroll-back.
+    Both return {"items": [...oldest first], "hasMore"}.
+    """
     user_id = current_user["userId"]
     
     query = {
@@ -32,17 +69,47 @@ async def get_messages(
             {"senderId": conversationWith, "receiverId": user_id}
         ]
     
-    messages = await messages_collection.find(
-        query,
-        {"_id": 0}
-    ).sort("timestamp", 1).to_list(None)
+    if since and before:
+        raise HTTPException(status_code=400, detail="Use either since or before, not both")
+    if since:
+        return await _sync_page(query, 1, _parse_timestamp(since, "since"), sinceId, limit or DEFAULT_PAGE_SIZE)
+    if before:
+        return await _sync_page(query, -1, _parse_timestamp(before, "before"), beforeId, limit or DEFAULT_PAGE_SIZE)
+    
+    if limit or after:
+        return await paginate(
+            messages_collection, query, {},
+            "timestamp", 1, limit or DEFAULT_PAGE_SIZE, after
+        )
+    
+    # _id is kept so pushed read receipts can be matched to messages
+    messages = await messages_collection.find(query).sort([("timestamp", 1), ("_id", 1)]).to_list(None)
     
     return messages
 
+@router.get("/read-receipts")
+async def get_read_receipts(
+    since: str = Query(..., description="serverTime of the ready event of the previous socket connection"),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Ids of the user's sent and received messages read since a time, for
+    clients catching up on read receipts missed while their socket was down.
+    """
+    user_id = current_user["userId"]
+    read_since = _parse_timestamp(since, "since")
+    cursor = messages_collection.find(
+        {
+            "$or": [{"senderId": user_id}, {"receiverId": user_id}],
+            "readAt": {"$gte": read_since}
+        },
+        {"_id": 1}
+    )
+    return {"ids": [message["_id"] async for message in cursor]}
+
 @router.post("")
 async def send_message(
     message: MessageCreate,
-    background_tasks: BackgroundTasks,
     current_user: dict = Depends(get_current_user)
 ):
     """Send a message"""
@@ -58,37 +125,30 @@ async def send_message(
     # Create message
     message_dict = message.model_dump()
     message_id = str(uuid.uuid4())
+    now = datetime.now(timezone.utc)
+    # MongoDB keeps milliseconds; the timestamp returned and pushed must match
+    # the stored one so clients can sync from it
+    now = now.replace(microsecond=now.microsecond // 1000 * 1000)
     message_dict.update({
         "_id": message_id,
         "read": False,
-        "timestamp": datetime.now(timezone.utc),
-        "createdAt": datetime.now(timezone.utc)
+        "timestamp": now,
+        "createdAt": now
     })
     
     # In production, encrypt the message here
     # message_dict["message"] = encrypt_message(message_dict["message"])
     
     await messages_collection.insert_one(message_dict)
+    await record_message_sent(message_dict)
     await log_audit(current_user["userId"], "create", "message", message_id)
     
-    # Send email notification if client is sending to provider
+    # Push to both participants' open connections (incl. the sender's other tabs)
+    message_hub.publish([message.senderId, message.receiverId], {"type": "message", "message": message_dict})
+    
+    # Email the provider about client messages, coalesced per client into one digest per window
     if message.senderType == 'client' and is_email_configured():
-        # Get sender (client) info
-        sender = await users_collection.find_one({"user_id": message.senderId})
-        client_name = sender.get("name", "A client") if sender else "A client"
-        provider_name = receiver.get("name", "Provider")
-        provider_email = receiver.get("email")
-        
-        if provider_email:
-            # Add email notification to background tasks (non-blocking)
-            background_tasks.add_task(
-                send_new_message_notification,
-                provider_email=provider_email,
-                provider_name=provider_name,
-                client_name=client_name,
-                message_preview=message.message
-            )
-            logger.info(f"Email notification queued for provider {provider_email}")
+        await message_digest.add(message_dict)
     
     return {
         "message": "Message sent successfully",
@@ -111,10 +171,44 @@ async def mark_as_read(
     if message["receiverId"] != current_user["userId"]:
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    # Update message
-    await messages_collection.update_one(
-        {"_id": message_id},
-        {"$set": {"read": True}}
+    # Update message (only count the transition from unread to read)
+    result = await messages_collection.update_one(
+        {"_id": message_id, "read": False},
+        {"$set": {"read": True, "readAt": datetime.now(timezone.utc)}}
     )
+    if result.modified_count:
+        await record_message_read(message)
+        message_hub.publish(
+            [message["senderId"], message["receiverId"]],
+            {"type": "read", "id": message_id, "senderId": message["senderId"], "receiverId": message["receiverId"]}
+        )
     
     return {"message": "Message marked as read"}
+
+@router.websocket("/ws")
+async def message_socket(websocket: WebSocket, token: str = Query(...)):
+    """
+    Push new messages and read receipts to the user as JSON events.
+    Browsers can't set headers on WebSockets, so the JWT comes as ?token=.
+    Sending "ping" gets a pong event back (keep-alive).
+    """
+    try:
+        user = get_user_from_token(token)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    
+    await websocket.accept()
+    message_hub.subscribe(user["userId"], websocket)
+    try:
+        # Read receipts from this point on are pushed; after a reconnect the
+        # client fetches the ones missed since via /read-receipts
+        await websocket.send_json({"type": "ready", "serverTime": datetime.now(timezone.utc).isoformat()})
+        while True:
+            if await websocket.receive_text() == "ping":
+                await websocket.send_text('{"type": "pong"}')
+    except (WebSocketDisconnect, RuntimeError):
+        # RuntimeError: the hub closed a connection that stopped taking events
+        pass
+    finally:
+        message_hub.unsubscribe(user["userId"], websocket)
@@ -3,6 +3,8 @@ from auth import get_current_user
 from database import appointments_collection, invoices_collection, payments_collection, users_collection, log_audit
 from models import PaymentIntentCreate, PaymentConfirm
 from datetime import datetime, date, timezone
+from pymongo import ReturnDocument
+from services.provider_stats import record_appointment_change, record_invoice_change
 import uuid
 import os
 
@@ -165,19 +167,21 @@ async def confirm_payment(
     )
     
     # Update appointment status to confirmed
-    await appointments_collection.update_one(
+    appointment_update = {
+        "status": "confirmed",
+        "paymentStatus": "paid",
+        "updatedAt": datetime.now(timezone.utc)
+    }
+    previous = await appointments_collection.find_one_and_update(
         {"_id": confirm_data.appointmentId},
-        {
-            "$set": {
-                "status": "confirmed",
-                "paymentStatus": "paid",
-                "updatedAt": datetime.now(timezone.utc)
-            }
-        }
+        {"$set": appointment_update},
+        return_document=ReturnDocument.BEFORE
     )
+    if previous:
+        await record_appointment_change(previous, {**previous, **appointment_update})
     
     # Create invoice record
-    appointment = await appointments_collection.find_one({"_id": confirm_data.appointmentId})
+    appointment = {**previous, **appointment_update} if previous else {}
     
     invoice_record = {
         "_id": str(uuid.uuid4()),
@@ -194,6 +198,7 @@ async def confirm_payment(
         "createdAt": datetime.now(timezone.utc)
     }
     await invoices_collection.insert_one(invoice_record)
+    await record_invoice_change(None, invoice_record)
     
     await log_audit(user_id, "create", "payment", payment["_id"])
     
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, HTTPException, Depends, Query
 from auth import get_current_provider
-from database import pending_items_collection, users_collection, appointments_collection, log_audit
+from database import pending_items_collection, appointments_collection, log_audit, load_users
 from models import PendingItemCreate, PendingItemUpdate
 from datetime import datetime, timezone, timedelta
 from typing import Optional, Literal
@@ -113,13 +113,9 @@ async def get_pending_items(
         {"_id": 0}
     ).sort(sort_field, sort_direction).to_list(100)
     
-    # Enrich with client names and urgency
-    for item in items:
-        # Get client name
-        client = await users_collection.find_one(
-            {"user_id": item["clientId"]},
-            {"name": 1, "_id": 0}
-        )
+    # Enrich with client names (one batched query) and urgency
+    clients = await load_users([item["clientId"] for item in items])
+    for item, client in zip(items, clients):
         item["clientName"] = client.get("name", "Unknown") if client else "Unknown"
         
         # Calculate urgency
@@ -1,8 +1,14 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
 from auth import get_current_provider
-from database import users_collection, appointments_collection, messages_collection, invoices_collection, clinical_notes_collection, invite_codes_collection, working_hours_collection, log_audit
+from database import users_collection, appointments_collection, clinical_notes_collection, invite_codes_collection, working_hours_collection, log_audit
 from models import ProviderDashboardStats, ClinicalNoteCreate, ClinicalNoteInDB, InviteCodeCreate, WorkingHours, WorkingHoursUpdate, DaySchedule
 from datetime import datetime, date, timezone, timedelta
+from services.provider_stats import get_provider_dashboard_stats, record_clinical_note_created
+from services.pagination import paginate, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from services.provider_cache import get_working_hours as get_cached_working_hours, invalidate_working_hours
+from services.slot_engine import get_available_slots as get_available_slots_for_range, get_day_slots, invalidate_provider_availability
+from services.appointment_index import local_to_utc
+from typing import Optional
 from bson import ObjectId
 import uuid
 import secrets
@@ -101,79 +107,30 @@ async def get_dashboard(current_user: dict = Depends(get_current_provider)):
     """Get provider dashboard statistics"""
     provider_id = current_user["userId"]
     
-    # Get active clients
-    active_clients = await users_collection.count_documents({
-        "userType": "client",
-        "providerId": provider_id
-    })
-    
-    # Get today's appointments
-    today = date.today()
-    today_appointments = await appointments_collection.count_documents({
-        "providerId": provider_id,
-        "date": today.isoformat(),
-        "status": {"$ne": "cancelled"}
-    })
-    
-    # Get week's appointments
-    week_appointments = await appointments_collection.count_documents({
-        "providerId": provider_id,
-        "status": {"$ne": "cancelled"}
-    })
-    
-    # Get unread messages
-    unread_messages = await messages_collection.count_documents({
-        "receiverId": provider_id,
-        "read": False
-    })
-    
-    # Get pending notes (completed appointments without notes)
-    completed_appointments = await appointments_collection.find({
-        "providerId": provider_id,
-        "status": "completed"
-    }).to_list(None)
+    # Statistics are maintained incrementally in one provider_stats document
+    stats = await get_provider_dashboard_stats(provider_id)
     
-    pending_notes = 0
-    for apt in completed_appointments:
-        note = await clinical_notes_collection.find_one({"appointmentId": apt["_id"]})
-        if not note:
-            pending_notes += 1
-    
-    # Calculate income (simplified - from paid invoices)
-    paid_invoices = await invoices_collection.find({
-        "providerId": provider_id,
-        "status": "paid"
-    }).to_list(None)
-    
-    total_income = sum(inv["amount"] for inv in paid_invoices)
-    
-    # Monthly income (current month)
-    current_month = datetime.now(timezone.utc).month
-    monthly_invoices = [inv for inv in paid_invoices if datetime.fromisoformat(inv["date"]).month == current_month]
-    monthly_income = sum(inv["amount"] for inv in monthly_invoices)
-    
-    # Upcoming appointments
-    upcoming = await appointments_collection.count_documents({
-        "providerId": provider_id,
-        "status": {"$in": ["confirmed", "pending"]}
-    })
-    
-    return ProviderDashboardStats(
-        totalIncome=total_income,
-        monthlyIncome=monthly_income,
-        appointmentsToday=today_appointments,
-        appointmentsWeek=week_appointments,
-        pendingNotes=pending_notes,
-        activeClients=active_clients,
-        messagesUnread=unread_messages,
-        upcomingAppointments=upcoming
-    )
+    return ProviderDashboardStats(**stats)
 
 @router.get("/clients")
-async def get_clients(current_user: dict = Depends(get_current_provider)):
-    """Get all clients of the provider"""
+async def get_clients(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size; enables cursor pagination"),
+    after: Optional[str] = Query(None, description="Cursor returned as nextCursor by the previous page"),
+    current_user: dict = Depends(get_current_provider)
+):
+    """Get clients of the provider (all of them, or one page when limit/after is given)"""
     provider_id = current_user["userId"]
     
+    if limit or after:
+        page = await paginate(
+            users_collection,
+            {"userType": "client", "providerId": provider_id},
+            {"_id": 0, "password": 0},
+            "_id", 1, limit or DEFAULT_PAGE_SIZE, after
+        )
+        await log_audit(provider_id, "view", "clients", provider_id, {"count": len(page["items"])})
+        return page
+    
     clients = await users_collection.find(
         {"userType": "client", "providerId": provider_id},
         {"_id": 0, "password": 0}
@@ -187,21 +144,37 @@ async def get_clients(current_user: dict = Depends(get_current_provider)):
 async def get_appointments(
     date: str = None,
     status: str = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size; enables cursor pagination"),
+    after: Optional[str] = Query(None, description="Cursor returned as nextCursor by the previous page"),
     current_user: dict = Depends(get_current_provider)
 ):
-    """Get provider appointments with optional filters"""
+    """Get provider appointments with optional filters and cursor pagination"""
     provider_id = current_user["userId"]
     
     query = {"providerId": provider_id}
     if date:
-        query["date"] = date
+        try:
+            day = datetime.strptime(date, "%Y-%m-%d").date()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+        query["$or"] = [
+            {"startsAt": {"$gte": local_to_utc(day), "$lt": local_to_utc(day + timedelta(days=1))}},
+            # Legacy appointments the backfill could not give a startsAt
+            {"date": day.isoformat(), "startsAt": {"$exists": False}}
+        ]
     if status:
         query["status"] = status
     
+    if limit or after:
+        return await paginate(
+            appointments_collection, query, {"_id": 0},
+            "startsAt", -1, limit or DEFAULT_PAGE_SIZE, after
+        )
+    
     appointments = await appointments_collection.find(
         query,
         {"_id": 0}
-    ).sort("date", -1).to_list(None)
+    ).sort([("startsAt", -1), ("date", -1), ("_id", -1)]).to_list(None)
     
     return appointments
 
@@ -233,6 +206,7 @@ async def create_clinical_note(
     })
     
     await clinical_notes_collection.insert_one(note_dict)
+    await record_clinical_note_created(appointment)
     await log_audit(provider_id, "create", "clinical_note", note_dict["_id"])
     
     return {"message": "Clinical note created successfully", "id": note_dict["_id"]}
@@ -270,16 +244,14 @@ async def get_working_hours(current_user: dict = Depends(get_current_provider)):
     """Get provider's working hours schedule"""
     provider_id = current_user["userId"]
     
-    schedule = await working_hours_collection.find_one(
-        {"providerId": provider_id},
-        {"_id": 0, "providerId": 0}
-    )
+    schedule = await get_cached_working_hours(provider_id)
     
     if not schedule:
         # Return default working hours if none set
         default_schedule = WorkingHours()
         return default_schedule.model_dump()
     
+    schedule.pop("providerId", None)
     return schedule
 
 @router.put("/working-hours")
@@ -300,11 +272,27 @@ async def update_working_hours(
         {"$set": schedule_dict},
         upsert=True
     )
+    invalidate_working_hours(provider_id)
+    invalidate_provider_availability(provider_id)
     
     await log_audit(provider_id, "update", "working_hours", provider_id)
     
     return {"message": "Working hours updated successfully"}
 
+@router.get("/available-slots")
+async def get_available_slots_range(
+    start: date = Query(..., alias="from", description="First date (YYYY-MM-DD)"),
+    end: date = Query(..., alias="to", description="Last date (YYYY-MM-DD), inclusive"),
+    current_user: dict = Depends(get_current_provider)
+):
+    """Get available time slots for every date in a range"""
+    provider_id = current_user["userId"]
+    
+    try:
+        return await get_available_slots_for_range(provider_id, start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.get("/available-slots/{date_str}")
 async def get_available_slots(
     date_str: str,
@@ -322,86 +310,4 @@ async def _get_provider_available_slots(provider_id: str, date_str: str):
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
     
-    # Don't allow booking in the past
-    if target_date < date.today():
-        return {"slots": [], "message": "Cannot book appointments in the past"}
-    
-    # Get provider's working hours
-    schedule = await working_hours_collection.find_one({"providerId": provider_id})
-    
-    if not schedule:
-        # Use default schedule
-        schedule = WorkingHours().model_dump()
-    
-    # Get day of week
-    day_names = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
-    day_name = day_names[target_date.weekday()]
-    
-    day_schedule = schedule.get(day_name, {})
-    
-    if not day_schedule.get('enabled', False):
-        return {"slots": [], "message": f"Provider is not available on {day_name.capitalize()}"}
-    
-    # Get slot duration
-    slot_duration = schedule.get('slotDuration', 60)
-    
-    # Generate time slots
-    start_time = datetime.strptime(day_schedule['startTime'], "%H:%M")
-    end_time = datetime.strptime(day_schedule['endTime'], "%H:%M")
-    
-    # Get break times if set
-    break_start = None
-    break_end = None
-    if day_schedule.get('breakStart') and day_schedule.get('breakEnd'):
-        break_start = datetime.strptime(day_schedule['breakStart'], "%H:%M")
-        break_end = datetime.strptime(day_schedule['breakEnd'], "%H:%M")
-    
-    # Get existing appointments for this date
-    existing_appointments = await appointments_collection.find({
-        "providerId": provider_id,
-        "date": date_str,
-        "status": {"$nin": ["cancelled"]}
-    }).to_list(None)
-    
-    booked_times = set()
-    for apt in existing_appointments:
-        booked_times.add(apt['time'])
-    
-    # Generate available slots
-    slots = []
-    current_time = start_time
-    
-    while current_time + timedelta(minutes=slot_duration) <= end_time:
-        time_str = current_time.strftime("%I:%M %p")
-        time_24h = current_time.strftime("%H:%M")
-        
-        # Check if slot is during break
-        is_break = False
-        if break_start and break_end:
-            if break_start <= current_time < break_end:
-                is_break = True
-        
-        # Check if slot is already booked
-        is_booked = time_str in booked_times
-        
-        if not is_break and not is_booked:
-            # For today, don't show past times
-            if target_date == date.today():
-                now = datetime.now()
-                slot_datetime = datetime.combine(target_date, current_time.time())
-                if slot_datetime > now:
-                    slots.append({
-                        "time": time_str,
-                        "time24h": time_24h,
-                        "available": True
-                    })
-            else:
-                slots.append({
-                    "time": time_str,
-                    "time24h": time_24h,
-                    "available": True
-                })
-        
-        current_time += timedelta(minutes=slot_duration)
-    
-    return {"slots": slots, "slotDuration": slot_duration}
+    return await get_day_slots(provider_id, target_date)
@@ -7,9 +7,10 @@ from services.invoice_validation import (
     get_country_requirements,
     get_all_country_configs
 )
+from services.provider_cache import get_provider_settings, invalidate_provider_settings
+from services.logo_store import store_logo, logo_url, InvalidLogo
 from datetime import datetime, timezone
 import uuid
-import base64
 import os
 
 router = APIRouter(prefix="/provider/settings", tags=["Provider Settings"])
@@ -19,10 +20,7 @@ async def get_business_settings(current_user: dict = Depends(get_current_provide
     """Get provider's business settings for invoicing"""
     provider_id = current_user["userId"]
     
-    settings = await provider_settings_collection.find_one(
-        {"providerId": provider_id},
-        {"_id": 0, "providerId": 0}
-    )
+    settings = await get_provider_settings(provider_id)
     
     if not settings:
         # Return default settings with provider info
@@ -63,14 +61,12 @@ async def update_business_settings(
         {"$set": update_data},
         upsert=True
     )
+    invalidate_provider_settings(provider_id)
     
     await log_audit(provider_id, "update", "provider_settings", provider_id)
     
     # Return updated settings
-    updated = await provider_settings_collection.find_one(
-        {"providerId": provider_id},
-        {"_id": 0, "providerId": 0}
-    )
+    updated = await get_provider_settings(provider_id)
     
     return updated
 
@@ -90,30 +86,35 @@ async def upload_logo(
             detail="Invalid file type. Allowed: JPEG, PNG, WebP"
         )
     
-    # Read and encode file
+    # Read file
     contents = await file.read()
     
     # Check file size (max 2MB)
     if len(contents) > 2 * 1024 * 1024:
         raise HTTPException(status_code=400, detail="File too large. Maximum 2MB allowed.")
     
-    # Convert to base64 data URL
-    base64_data = base64.b64encode(contents).decode('utf-8')
-    data_url = f"data:{file.content_type};base64,{base64_data}"
+    # Downscale, re-encode and store by content hash
+    try:
+        logo_hash = await store_logo(contents)
+    except InvalidLogo as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    url = logo_url(logo_hash)
     
-    # Update settings with logo
+    # Update settings with a reference to the logo
     await provider_settings_collection.update_one(
         {"providerId": provider_id},
         {"$set": {
-            "logoUrl": data_url,
+            "logoHash": logo_hash,
+            "logoUrl": url,
             "updatedAt": datetime.now(timezone.utc)
         }},
         upsert=True
     )
+    invalidate_provider_settings(provider_id)
     
     await log_audit(provider_id, "update", "provider_logo", provider_id)
     
-    return {"logoUrl": data_url, "message": "Logo uploaded successfully"}
+    return {"logoUrl": url, "logoHash": logo_hash, "message": "Logo uploaded successfully"}
 
 @router.delete("/logo")
 async def delete_logo(current_user: dict = Depends(get_current_provider)):
@@ -124,9 +125,11 @@ async def delete_logo(current_user: dict = Depends(get_current_provider)):
         {"providerId": provider_id},
         {"$set": {
             "logoUrl": None,
+            "logoHash": None,
             "updatedAt": datetime.now(timezone.utc)
         }}
     )
+    invalidate_provider_settings(provider_id)
     
     await log_audit(provider_id, "delete", "provider_logo", provider_id)
     
@@ -152,6 +155,7 @@ async def get_next_invoice_number(current_user: dict = Depends(get_current_provi
         {"$inc": {"invoiceNextNumber": 1}},
         upsert=True
     )
+    invalidate_provider_settings(provider_id)
     
     return {"invoiceNumber": invoice_number, "nextNumber": next_number + 1}
 
@@ -2,15 +2,20 @@ from fastapi import APIRouter, HTTPException, Depends
 from auth import get_current_user, get_current_provider
 from database import (
     refund_requests_collection, appointments_collection, 
-    payments_collection, invoices_collection, users_collection, log_audit
+    payments_collection, invoices_collection, users_collection, log_audit, load_users
 )
 from models import RefundRequestCreate, RefundApproval
 from datetime import datetime, timezone, timedelta
+from pymongo import ReturnDocument
 from services.email_service import (
     send_refund_requested_notification,
     send_refund_approved_notification,
-    send_refund_rejected_notification
+    send_refund_rejected_notification,
+    practice_locale
 )
+from services.provider_stats import record_appointment_change
+from services.slot_engine import invalidate_appointment_availability
+from services.reminder_scheduler import cancel_appointment_reminder
 import uuid
 import os
 import logging
@@ -146,7 +151,8 @@ async def request_refund(
                 appointment_date=appointment.get("date", ""),
                 appointment_time=appointment.get("time", ""),
                 amount=refund_doc["amount"],
-                reason=request.reason.strip()
+                reason=request.reason.strip(),
+                locale=await practice_locale(appointment["providerId"])
             )
             logger.info(f"Refund request notification sent to provider {provider['email']}")
     except Exception as e:
@@ -193,20 +199,16 @@ async def get_pending_refunds(current_user: dict = Depends(get_current_provider)
         {"_id": 0}
     ).sort("createdAt", -1).to_list(50)
     
-    # Enrich with client and appointment info
+    # Enrich with client and appointment info (one batched query each)
+    clients = await load_users([req["clientId"] for req in requests])
+    appointments = await appointments_collection.find(
+        {"_id": {"$in": [req["appointmentId"] for req in requests]}}
+    ).to_list(None)
+    appointments_by_id = {apt["_id"]: apt for apt in appointments}
+    
     enriched_requests = []
-    for req in requests:
-        # Get client info
-        client = await users_collection.find_one(
-            {"user_id": req["clientId"]},
-            {"_id": 0, "password": 0}
-        )
-        
-        # Get appointment info
-        appointment = await appointments_collection.find_one(
-            {"_id": req["appointmentId"]},
-            {"_id": 0}
-        )
+    for req, client in zip(requests, clients):
+        appointment = appointments_by_id.get(req["appointmentId"])
         
         req["clientName"] = client.get("name") if client else "Unknown"
         req["clientEmail"] = client.get("email") if client else None
@@ -273,14 +275,20 @@ async def process_refund(
         )
         
         # Cancel the appointment
-        await appointments_collection.update_one(
+        cancel_update = {
+            "status": "cancelled",
+            "cancelledAt": datetime.now(timezone.utc),
+            "cancellationReason": "Refund approved"
+        }
+        previous = await appointments_collection.find_one_and_update(
             {"_id": refund_request["appointmentId"]},
-            {"$set": {
-                "status": "cancelled",
-                "cancelledAt": datetime.now(timezone.utc),
-                "cancellationReason": "Refund approved"
-            }}
+            {"$set": cancel_update},
+            return_document=ReturnDocument.BEFORE
         )
+        if previous:
+            invalidate_appointment_availability(previous)
+            await record_appointment_change(previous, {**previous, **cancel_update})
+            await cancel_appointment_reminder(previous["_id"])
         
         # Update payment status
         await payments_collection.update_one(
@@ -312,7 +320,8 @@ async def process_refund(
                     appointment_type=appointment.get("type", "Appointment") if appointment else "Appointment",
                     appointment_date=appointment.get("date", "") if appointment else "",
                     amount=refund_request["amount"],
-                    provider_response=approval.providerResponse
+                    provider_response=approval.providerResponse,
+                    locale=await practice_locale(provider_id)
                 )
                 logger.info(f"Refund approved notification sent to client {client['email']}")
         except Exception as e:
@@ -354,7 +363,8 @@ async def process_refund(
                     appointment_type=appointment.get("type", "Appointment") if appointment else "Appointment",
                     appointment_date=appointment.get("date", "") if appointment else "",
                     amount=refund_request["amount"],
-                    provider_response=approval.providerResponse or "Refund request rejected"
+                    provider_response=approval.providerResponse or "Refund request rejected",
+                    locale=await practice_locale(provider_id)
                 )
                 logger.info(f"Refund rejected notification sent to client {client['email']}")
         except Exception as e:
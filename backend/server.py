@@ -1,9 +1,11 @@
-from fastapi import FastAPI, APIRouter
+from fastapi import FastAPI, APIRouter, Request, Depends, HTTPException
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
 import logging
+import secrets
 from pathlib import Path
 from datetime import datetime
 import uvicorn
@@ -20,12 +22,42 @@ from routes.pending_items_routes import router as pending_items_router
 from routes.provider_settings_routes import router as provider_settings_router
 from routes.refund_routes import router as refund_router
 from routes.invoice_pdf_routes import router as invoice_pdf_router
+from routes.audit_routes import router as audit_router
+from routes.logo_routes import router as logo_router
+
+# Import cache metrics
+from services.cache import cache_stats
+
+# Import background audit log writer
+from services.audit_writer import audit_writer
+from services.audit_store import start_audit_retention
+
+# Import PDF render pool
+from services.pdf_renderer import pdf_renderer
+
+# Import logo store migration
+from services.logo_store import migrate_data_url_logos
+
+# Import appointment startsAt/endsAt backfill
+from services.appointment_index import backfill_appointment_bounds
 
 # Import database initialization
-from database import init_db
+from database import init_db, user_loader_scope
+
+# Import email outbox worker
+from services.email_outbox import email_outbox
+
+# Import new-message digest notifier
+from services.message_digest import message_digest
+
+# Import real-time message hub
+from services.message_hub import message_hub
 
 # Import reminder scheduler
-from services.reminder_scheduler import start_reminder_scheduler
+from services.reminder_scheduler import reminder_scheduler
+
+# Import dashboard counter reconciler
+from services.provider_stats import start_stats_reconciler
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -63,6 +95,31 @@ async def health_check():
         "timestamp": datetime.utcnow().isoformat()
     }
 
+# /api/metrics is internal: off unless METRICS_TOKEN is set, then it needs
+# "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+metrics_auth = HTTPBearer(auto_error=False)
+
+async def require_metrics_token(credentials: HTTPAuthorizationCredentials = Depends(metrics_auth)):
+    if not METRICS_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not credentials or not secrets.compare_digest(credentials.credentials, METRICS_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+
+@api_router.get("/metrics", dependencies=[Depends(require_metrics_token)])
+async def metrics():
+    """In-process cache counters, audit writer, PDF render queue, reminder, message digest, message hub and email outbox stats for this worker"""
+    return {
+        "caches": cache_stats(),
+        "auditLog": audit_writer.stats(),
+        "pdfRenderer": pdf_renderer.stats(),
+        "reminders": reminder_scheduler.stats(),
+        "messageDigests": message_digest.stats(),
+        "messageHub": message_hub.stats(),
+        "emailOutbox": await email_outbox.stats(),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
 # Include all route modules
 api_router.include_router(auth_router)
 api_router.include_router(provider_router)
@@ -75,10 +132,18 @@ api_router.include_router(pending_items_router)
 api_router.include_router(provider_settings_router)
 api_router.include_router(refund_router)
 api_router.include_router(invoice_pdf_router)
+api_router.include_router(audit_router)
+api_router.include_router(logo_router)
 
 # Include the router in the main app
 app.include_router(api_router)
 
+# Request-scoped user loader (batches and caches users_collection lookups)
+@app.middleware("http")
+async def request_user_loader(request: Request, call_next):
+    with user_loader_scope():
+        return await call_next(request)
+
 # CORS Configuration
 app.add_middleware(
     CORSMiddleware,
@@ -103,10 +168,40 @@ async def startup_event():
         await init_db()
         logger.info("✓ Database initialized successfully")
         
+        # Move legacy base64 logos into the logo store
+        await migrate_data_url_logos()
+        
+        # Set startsAt/endsAt on appointments that predate them
+        await backfill_appointment_bounds()
+        
+        # Start batched audit log writer
+        await audit_writer.start()
+        logger.info("✓ Audit log writer started")
+        
+        # Start audit log retention/archival (only when configured)
+        if start_audit_retention():
+            logger.info("✓ Audit retention job started")
+        
         # Start appointment reminder scheduler
-        start_reminder_scheduler()
+        await reminder_scheduler.start()
         logger.info("✓ Reminder scheduler started")
         
+        # Start real-time message push
+        await message_hub.start()
+        logger.info("✓ Message hub started")
+        
+        # Start new-message digest notifier
+        await message_digest.start()
+        logger.info("✓ Message digest notifier started")
+        
+        # Start outbound email worker
+        await email_outbox.start()
+        logger.info("✓ Email outbox worker started")
+        
+        # Start dashboard counter reconciliation
+        start_stats_reconciler()
+        logger.info("✓ Dashboard counter reconciler started")
+        
         logger.info("✓ DocPortal API is ready")
     except Exception as e:
         logger.error(f"Failed to initialize database: {e}")
@@ -115,6 +210,13 @@ async def startup_event():
 async def shutdown_db_client():
     """Close database connection on shutdown"""
     logger.info("Shutting down DocPortal API...")
+    await reminder_scheduler.stop()
+    await message_digest.stop()
+    await message_hub.stop()
+    await email_outbox.stop()
+    await audit_writer.stop()
+    logger.info("✓ Audit log queue flushed")
+    pdf_renderer.shutdown()
     client.close()
     logger.info("✓ Database connection closed")
 
@@ -0,0 +1,209 @@
+"""
+Per-provider appointment interval index and booking conflict checks.
+
+Appointments are turned into [start, end) intervals of absolute minutes
+(day ordinal * 1440 + minute of the day, so bookings that run past
+midnight still overlap correctly) and loaded into an IntervalTree. The
+same index answers "does this booking overlap anything?" when an
+appointment is created or rescheduled, and "which minutes are booked?"
+for the slot engine.
+
+Check-and-insert runs under a per-provider lease in the booking_locks
+collection, so two workers cannot both accept overlapping bookings.
+
+date/time are the practice's local wall-clock time. Every appointment also
+stores startsAt/endsAt, the same moment as UTC datetimes, so range queries
+and sorting by start time can use the (providerId, startsAt) index.
+"""
+
+import asyncio
+import logging
+import os
+import uuid
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+from zoneinfo import ZoneInfo
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+from database import appointments_collection, booking_locks_collection
+from services.interval_tree import IntervalTree
+
+logger = logging.getLogger(__name__)
+
+MINUTES_PER_DAY = 24 * 60
+
+# Time zone appointment dates and times are entered in
+APPOINTMENT_TIMEZONE = ZoneInfo(os.environ.get("APPOINTMENT_TIMEZONE", "Europe/Ljubljana"))
+
+# Used when an appointment has no duration stored
+DEFAULT_DURATION = 60
+
+# Lease held while checking and writing a booking
+BOOKING_LOCK_TTL = 10  # seconds
+BOOKING_LOCK_WAIT = 5  # seconds
+
+
+class BookingConflict(Exception):
+    def __init__(self, conflicts: List[dict]):
+        super().__init__("Appointment overlaps an existing booking")
+        self.conflicts = conflicts
+
+
+class BookingBusy(Exception):
+    pass
+
+
+def parse_minutes(value: Optional[str]) -> Optional[int]:
+    """Minute of the day of an "HH:MM" or "HH:MM AM" time (None if unparseable)"""
+    if not value:
+        return None
+    for fmt in ("%I:%M %p", "%H:%M"):
+        try:
+            parsed = datetime.strptime(value.strip(), fmt)
+        except ValueError:
+            continue
+        return parsed.hour * 60 + parsed.minute
+    return None
+
+
+def absolute_minute(day: date, minute: int) -> int:
+    return day.toordinal() * MINUTES_PER_DAY + minute
+
+
+def appointment_interval(appointment: dict) -> Optional[tuple]:
+    """The [start, end) absolute minutes of an appointment (None if its date/time is unparseable)"""
+    minute = parse_minutes(appointment.get("time"))
+    try:
+        day = date.fromisoformat(str(appointment.get("date")))
+    except ValueError:
+        return None
+    if minute is None:
+        return None
+    start = absolute_minute(day, minute)
+    return start, start + int(appointment.get("duration") or DEFAULT_DURATION)
+
+
+def local_to_utc(day: date, minute: int = 0) -> datetime:
+    """UTC datetime of a wall-clock minute in APPOINTMENT_TIMEZONE"""
+    # Wall-clock arithmetic: the offset of the resulting local time applies
+    local = datetime(day.year, day.month, day.day, tzinfo=APPOINTMENT_TIMEZONE) + timedelta(minutes=minute)
+    return local.astimezone(timezone.utc)
+
+
+def appointment_bounds(appointment: dict) -> Optional[Tuple[datetime, datetime]]:
+    """The (startsAt, endsAt) UTC datetimes of an appointment (None if its date/time is unparseable)"""
+    interval = appointment_interval(appointment)
+    if not interval:
+        return None
+    day = date.fromordinal(interval[0] // MINUTES_PER_DAY)
+    starts_at = local_to_utc(day, interval[0] % MINUTES_PER_DAY)
+    return starts_at, starts_at + timedelta(minutes=interval[1] - interval[0])
+
+
+def with_bounds(appointment: dict) -> dict:
+    """Set startsAt/endsAt on an appointment document (or update) from its date, time and duration"""
+    bounds = appointment_bounds(appointment)
+    if bounds:
+        appointment["startsAt"], appointment["endsAt"] = bounds
+    return appointment
+
+
+async def backfill_appointment_bounds(batch_size: int = 500) -> int:
+    """Set startsAt/endsAt on appointments written before the fields existed"""
+    updated = 0
+    batch = []
+    async for appointment in appointments_collection.find(
+        {"startsAt": {"$exists": False}},
+        {"date": 1, "time": 1, "duration": 1}
+    ):
+        bounds = appointment_bounds(appointment)
+        if not bounds:
+            logger.warning(f"Appointment {appointment['_id']} has an unparseable date/time, not backfilled")
+            continue
+        batch.append(UpdateOne(
+            {"_id": appointment["_id"]},
+            {"$set": {"startsAt": bounds[0], "endsAt": bounds[1]}}
+        ))
+        if len(batch) >= batch_size:
+            updated += (await appointments_collection.bulk_write(batch, ordered=False)).modified_count
+            batch = []
+    if batch:
+        updated += (await appointments_collection.bulk_write(batch, ordered=False)).modified_count
+
+    if updated:
+        logger.info(f"Backfilled startsAt/endsAt on {updated} appointments")
+    return updated
+
+
+async def load_provider_index(provider_id: str, start: date, end: date,
+                              exclude_id: Optional[str] = None) -> IntervalTree:
+    """Interval index of the provider's active appointments touching start..end (inclusive)"""
+    query = {
+        "providerId": provider_id,
+        # The day before too: a late appointment can run into start
+        "startsAt": {"$gte": local_to_utc(start - timedelta(days=1)), "$lt": local_to_utc(end + timedelta(days=1))},
+        "status": {"$nin": ["cancelled"]}
+    }
+    if exclude_id:
+        query["_id"] = {"$ne": exclude_id}
+
+    intervals = []
+    async for appointment in appointments_collection.find(query, {"date": 1, "time": 1, "duration": 1}):
+        interval = appointment_interval(appointment)
+        if interval:
+            intervals.append((*interval, appointment["_id"]))
+    return IntervalTree(intervals)
+
+
+async def find_conflicts(provider_id: str, appointment: dict,
+                         exclude_id: Optional[str] = None) -> List[dict]:
+    """Active appointments of the provider that overlap the given one"""
+    interval = appointment_interval(appointment)
+    if not interval:
+        raise ValueError("Invalid appointment date or time")
+
+    # Long bookings can reach into the following day
+    first_day = date.fromordinal(interval[0] // MINUTES_PER_DAY)
+    last_day = date.fromordinal((interval[1] - 1) // MINUTES_PER_DAY)
+    index = await load_provider_index(provider_id, first_day, max(first_day, last_day), exclude_id)
+    return [
+        {"id": data, "start": start, "end": end}
+        for start, end, data in index.overlapping(*interval)
+    ]
+
+
+async def ensure_no_conflict(provider_id: str, appointment: dict, exclude_id: Optional[str] = None):
+    """Raise BookingConflict if the appointment overlaps an active booking"""
+    conflicts = await find_conflicts(provider_id, appointment, exclude_id)
+    if conflicts:
+        raise BookingConflict(conflicts)
+
+
+@asynccontextmanager
+async def booking_lock(provider_id: str):
+    """Hold the provider's booking lease (shared by all workers through MongoDB)"""
+    owner = uuid.uuid4().hex
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + BOOKING_LOCK_WAIT
+
+    while True:
+        now = datetime.utcnow()
+        try:
+            # Matches only a free or expired lease; otherwise the upsert
+            # collides with the held lock's _id
+            await booking_locks_collection.update_one(
+                {"_id": provider_id, "expiresAt": {"$lt": now}},
+                {"$set": {"owner": owner, "expiresAt": now + timedelta(seconds=BOOKING_LOCK_TTL)}},
+                upsert=True
+            )
+            break
+        except DuplicateKeyError:
+            if loop.time() > deadline:
+                raise BookingBusy()
+            await asyncio.sleep(0.02)
+
+    try:
+        yield
+    finally:
+        await booking_locks_collection.delete_one({"_id": provider_id, "owner": owner})
@@ -0,0 +1,279 @@
+"""
+Audit log storage: optional monthly partitioning, retention and archival.
+
+With AUDIT_STORAGE_MODE=monthly each entry is written to a bucket
+collection named after the month of its timestamp (audit_logs_2025_01, ...),
+created with zstd block compression. Each insert only has to update the
+indexes of the current month, and a whole month can be archived by
+exporting and dropping its collection.
+
+With the default AUDIT_STORAGE_MODE=single everything stays in audit_logs.
+The audit_logs collection is always searched as well, so entries written
+before partitioning was switched on can still be found.
+
+Retention is off unless AUDIT_RETENTION_MONTHS is set. Then buckets older
+than that many months are exported to gzipped JSONL files in
+AUDIT_ARCHIVE_DIR and dropped, and old entries in audit_logs are archived
+the same way and then deleted. With AUDIT_ARCHIVE=false nothing is deleted
+unless AUDIT_DELETE_UNARCHIVED=true as well.
+"""
+
+import asyncio
+import gzip
+import logging
+import os
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+from bson import json_util
+from pymongo.errors import BulkWriteError, CollectionInvalid
+from database import db, audit_logs_collection
+
+logger = logging.getLogger(__name__)
+
+ROOT_DIR = Path(__file__).parent.parent
+
+AUDIT_STORAGE_MODE = os.environ.get("AUDIT_STORAGE_MODE", "single").lower()
+AUDIT_RETENTION_MONTHS = (
+    int(os.environ["AUDIT_RETENTION_MONTHS"]) if os.environ.get("AUDIT_RETENTION_MONTHS") else None
+)
+AUDIT_ARCHIVE = os.environ.get("AUDIT_ARCHIVE", "true").lower() == "true"
+# Dropping old entries without an archive copy loses them for good
+AUDIT_DELETE_UNARCHIVED = os.environ.get("AUDIT_DELETE_UNARCHIVED", "false").lower() == "true"
+AUDIT_ARCHIVE_DIR = Path(os.environ.get("AUDIT_ARCHIVE_DIR", str(ROOT_DIR / "audit_archive")))
+AUDIT_RETENTION_INTERVAL_HOURS = float(os.environ.get("AUDIT_RETENTION_INTERVAL_HOURS", "24"))
+
+BUCKET_PREFIX = "audit_logs_"
+BUCKET_PATTERN = re.compile(r"^audit_logs_(\d{4})_(\d{2})$")
+ARCHIVE_BATCH_SIZE = 1000
+
+
+def bucket_name(timestamp: datetime) -> str:
+    return f"{BUCKET_PREFIX}{timestamp.year:04d}_{timestamp.month:02d}"
+
+
+def _bucket_month(name: str) -> Optional[datetime]:
+    match = BUCKET_PATTERN.match(name)
+    if not match:
+        return None
+    return datetime(int(match.group(1)), int(match.group(2)), 1)
+
+
+def _month_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, 1)
+
+
+def _add_months(value: datetime, months: int) -> datetime:
+    month_index = value.year * 12 + value.month - 1 + months
+    return datetime(month_index // 12, month_index % 12 + 1, 1)
+
+
+def retention_disabled_reason() -> Optional[str]:
+    """Why retention must not run with the current configuration, or None"""
+    if AUDIT_RETENTION_MONTHS is None:
+        return "AUDIT_RETENTION_MONTHS is not set"
+    if not AUDIT_ARCHIVE and not AUDIT_DELETE_UNARCHIVED:
+        return "AUDIT_ARCHIVE is off and AUDIT_DELETE_UNARCHIVED is not set"
+    return None
+
+
+class AuditStore:
+    """Collection-like front for audit_logs that routes entries to their bucket"""
+
+    def __init__(self, mode: str = AUDIT_STORAGE_MODE):
+        self.mode = mode
+        self._ready = set()
+        self._lock = asyncio.Lock()
+
+    @property
+    def partitioned(self) -> bool:
+        return self.mode == "monthly"
+
+    async def _bucket(self, name: str):
+        """Get a bucket collection, creating it (compressed, indexed) on first use"""
+        if name not in self._ready:
+            async with self._lock:
+                if name not in self._ready:
+                    try:
+                        await db.create_collection(
+                            name,
+                            storageEngine={"wiredTiger": {"configString": "block_compressor=zstd"}}
+                        )
+                    except CollectionInvalid:
+                        pass  # Already exists
+                    collection = db[name]
+                    await collection.create_index([("userId", 1), ("timestamp", -1)])
+                    await collection.create_index("action")
+                    self._ready.add(name)
+        return db[name]
+
+    async def insert_one(self, entry: dict):
+        await self.insert_many([entry])
+
+    async def insert_many(self, entries: list, ordered: bool = False):
+        """
+        Insert entries into their month buckets.
+        Duplicate _ids (entries already written by an earlier attempt) are ignored.
+        """
+        if not self.partitioned:
+            groups = {None: entries}
+        else:
+            groups = {}
+            for entry in entries:
+                groups.setdefault(bucket_name(entry["timestamp"]), []).append(entry)
+
+        for name, group in groups.items():
+            collection = audit_logs_collection if name is None else await self._bucket(name)
+            try:
+                await collection.insert_many(group, ordered=ordered)
+            except BulkWriteError as e:
+                if any(err.get("code") != 11000 for err in e.details.get("writeErrors", [])):
+                    raise
+
+    async def list_buckets(self) -> list:
+        """Names of existing month buckets, newest first"""
+        names = await db.list_collection_names(filter={"name": {"$regex": f"^{BUCKET_PREFIX}"}})
+        return sorted((n for n in names if BUCKET_PATTERN.match(n)), reverse=True)
+
+    async def iter_logs(self, query: dict = None, start: datetime = None, end: datetime = None,
+                        projection: dict = None, batch_size: int = 1000):
+        """
+        Yield audit entries matching query with timestamp in [start, end), newest first.
+
+        Only the buckets overlapping the range are queried, newest bucket
+        first; the unpartitioned audit_logs collection is searched last.
+        Entries are streamed from the cursors in batches of batch_size, so
+        memory use does not grow with the size of the result.
+        """
+        query = dict(query or {})
+        time_range = {}
+        if start:
+            time_range["$gte"] = start
+        if end:
+            time_range["$lt"] = end
+        if time_range:
+            query["timestamp"] = time_range
+
+        collections = []
+        for name in await self.list_buckets():
+            month = _bucket_month(name)
+            if end and month >= end:
+                continue
+            if start and _add_months(month, 1) <= start:
+                continue
+            collections.append(db[name])
+        collections.append(audit_logs_collection)
+
+        for collection in collections:
+            cursor = collection.find(query, projection).sort("timestamp", -1).batch_size(batch_size)
+            async for entry in cursor:
+                yield entry
+
+    def iter_user_logs(self, user_id: str, start: datetime = None, end: datetime = None,
+                       projection: dict = None):
+        """Yield one user's audit entries in [start, end), newest first"""
+        return self.iter_logs({"userId": user_id}, start, end, projection)
+
+    async def find_user_logs(self, user_id: str, start: datetime = None, end: datetime = None,
+                             limit: int = 100) -> list:
+        """A user's audit entries in [start, end), newest first, at most limit"""
+        entries = []
+        async for entry in self.iter_user_logs(user_id, start, end):
+            entries.append(entry)
+            if len(entries) >= limit:
+                break
+        return entries
+
+    # ==================== Retention ====================
+
+    def _write_archive(self, path: Path, entries: list):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with gzip.open(path, "at", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json_util.dumps(entry) + "\n")
+
+    async def _export(self, collection, query: dict, path: Path) -> int:
+        """Append matching entries to a gzipped JSONL archive; returns the count"""
+        exported = 0
+        batch = []
+        async for entry in collection.find(query).sort("timestamp", 1):
+            batch.append(entry)
+            if len(batch) >= ARCHIVE_BATCH_SIZE:
+                await asyncio.to_thread(self._write_archive, path, batch)
+                exported += len(batch)
+                batch = []
+        if batch:
+            await asyncio.to_thread(self._write_archive, path, batch)
+            exported += len(batch)
+        return exported
+
+    async def apply_retention(self, now: datetime = None) -> dict:
+        """Archive and remove audit entries older than AUDIT_RETENTION_MONTHS"""
+        reason = retention_disabled_reason()
+        if reason:
+            raise RuntimeError(f"Audit retention is disabled: {reason}")
+        cutoff = _add_months(_month_start(now or datetime.utcnow()), -AUDIT_RETENTION_MONTHS)
+        archived_buckets = []
+        archived_entries = 0
+
+        for name in await self.list_buckets():
+            if _bucket_month(name) >= cutoff:
+                continue
+            if AUDIT_ARCHIVE:
+                archived_entries += await self._export(db[name], {}, AUDIT_ARCHIVE_DIR / f"{name}.jsonl.gz")
+            await db.drop_collection(name)
+            self._ready.discard(name)
+            archived_buckets.append(name)
+
+        # Unpartitioned entries: archive month by month, then delete
+        oldest = await audit_logs_collection.find_one(
+            {"timestamp": {"$lt": cutoff}}, {"timestamp": 1}, sort=[("timestamp", 1)]
+        )
+        if oldest:
+            month = _month_start(oldest["timestamp"])
+            while month < cutoff:
+                month_query = {"timestamp": {"$gte": month, "$lt": _add_months(month, 1)}}
+                if AUDIT_ARCHIVE:
+                    archived_entries += await self._export(
+                        audit_logs_collection, month_query, AUDIT_ARCHIVE_DIR / f"{bucket_name(month)}.jsonl.gz"
+                    )
+                await audit_logs_collection.delete_many(month_query)
+                month = _add_months(month, 1)
+
+        if archived_buckets or archived_entries:
+            logger.info(
+                f"Audit retention: dropped {len(archived_buckets)} buckets, "
+                f"archived {archived_entries} entries older than {cutoff.date().isoformat()}"
+            )
+
+        return {"cutoff": cutoff, "droppedBuckets": archived_buckets, "archivedEntries": archived_entries}
+
+
+audit_store = AuditStore()
+
+
+async def audit_retention_job():
+    """Background task that periodically applies audit log retention"""
+    logger.info("Audit retention job started")
+
+    while True:
+        try:
+            await audit_store.apply_retention()
+        except Exception as e:
+            logger.error(f"Audit retention error: {str(e)}")
+        await asyncio.sleep(AUDIT_RETENTION_INTERVAL_HOURS * 3600)
+
+
+def start_audit_retention() -> bool:
+    """
+    Start the audit retention job as a background task.
+    Call this from server startup. Does nothing unless retention is configured.
+    """
+    reason = retention_disabled_reason()
+    if reason:
+        logger.info(f"Audit retention not started: {reason}")
+        return False
+    asyncio.create_task(audit_retention_job())
+    logger.info("Audit retention task created")
+    return True
@@ -0,0 +1,201 @@
+"""
+Background audit log writer.
+
+log_audit() used to await an insert_one inside nearly every request,
+including pure reads. Entries are now put on a bounded in-memory queue and
+written with insert_many whenever AUDIT_BATCH_SIZE entries are waiting or
+AUDIT_FLUSH_INTERVAL seconds have passed. The queue is drained on shutdown.
+
+Durability: when a batch can't be written (Mongo unavailable) and
+AUDIT_DURABLE is on, the batch is appended to a local JSONL spill file.
+The spill file is replayed into Mongo on startup and after the next
+successful flush, so no entry is lost. Entries get their _id when queued,
+so replaying a partially written batch never duplicates an entry.
+"""
+
+import asyncio
+import logging
+import os
+from pathlib import Path
+from bson import ObjectId, json_util
+from pymongo.errors import BulkWriteError
+from services.audit_store import audit_store
+
+logger = logging.getLogger(__name__)
+
+ROOT_DIR = Path(__file__).parent.parent
+
+AUDIT_BATCH_SIZE = int(os.environ.get("AUDIT_BATCH_SIZE", "200"))
+AUDIT_FLUSH_INTERVAL = float(os.environ.get("AUDIT_FLUSH_INTERVAL", "1.0"))
+AUDIT_QUEUE_MAX = int(os.environ.get("AUDIT_QUEUE_MAX", "10000"))
+AUDIT_DURABLE = os.environ.get("AUDIT_DURABLE", "true").lower() == "true"
+AUDIT_SPILL_PATH = Path(os.environ.get("AUDIT_SPILL_PATH", str(ROOT_DIR / "audit_spill.jsonl")))
+
+_STOP = object()
+
+
+class AuditLogWriter:
+    """Batches audit entries from a bounded queue into insert_many calls"""
+
+    def __init__(self, collection, batch_size: int = AUDIT_BATCH_SIZE,
+                 flush_interval: float = AUDIT_FLUSH_INTERVAL, queue_max: int = AUDIT_QUEUE_MAX,
+                 durable: bool = AUDIT_DURABLE, spill_path: Path = AUDIT_SPILL_PATH):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue_max = queue_max
+        self.durable = durable
+        self.spill_path = Path(spill_path)
+        self._queue = None
+        self._task = None
+        self.written = 0
+        self.spilled = 0
+        self.replayed = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        """Replay any spilled entries and start the flush loop"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_max)
+        await self._replay_spill()
+        self._task = asyncio.create_task(self._run())
+        logger.info("Audit log writer started")
+
+    async def stop(self):
+        """Flush everything still queued and stop the flush loop"""
+        if not self.running:
+            return
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+        logger.info(f"Audit log writer stopped ({self.written} written, {self.spilled} spilled)")
+
+    async def enqueue(self, entry: dict):
+        """Queue one entry; waits only when the queue is full (backpressure)"""
+        entry.setdefault("_id", ObjectId())
+        await self._queue.put(entry)
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "queueDepth": self._queue.qsize() if self._queue else 0,
+            "written": self.written,
+            "spilled": self.spilled,
+            "replayed": self.replayed
+        }
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+
+        while not stopping:
+            first = await self._queue.get()
+            if first is _STOP:
+                break
+            batch = [first]
+            deadline = loop.time() + self.flush_interval
+
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    entry = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if entry is _STOP:
+                    stopping = True
+                    break
+                batch.append(entry)
+
+            await self._write(batch)
+
+        # Drain whatever was queued behind the stop marker
+        remaining = []
+        while not self._queue.empty():
+            entry = self._queue.get_nowait()
+            if entry is not _STOP:
+                remaining.append(entry)
+        for i in range(0, len(remaining), self.batch_size):
+            await self._write(remaining[i:i + self.batch_size])
+
+    async def _insert(self, entries: list):
+        try:
+            await self.collection.insert_many(entries, ordered=False)
+        except BulkWriteError as e:
+            # Entries already written by an earlier, partially failed attempt
+            if any(err.get("code") != 11000 for err in e.details.get("writeErrors", [])):
+                raise
+
+    async def _write(self, batch: list):
+        try:
+            await self._insert(batch)
+            self.written += len(batch)
+        except Exception as e:
+            logger.error(f"Failed to write {len(batch)} audit entries: {str(e)}")
+            if self.durable:
+                await asyncio.to_thread(self._append_spill, batch)
+                self.spilled += len(batch)
+            return
+
+        if self.durable and (self.spill_path.exists() or self._replay_path.exists()):
+            await self._replay_spill()
+
+    def _append_spill(self, batch: list):
+        self.spill_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.spill_path, "a", encoding="utf-8") as f:
+            for entry in batch:
+                f.write(json_util.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    @property
+    def _replay_path(self) -> Path:
+        return self.spill_path.with_suffix(".replay")
+
+    def _take_spill(self) -> list:
+        """
+        Move the spill file aside and load its entries.
+        The .replay file is kept until every entry is back in Mongo.
+        """
+        replay_path = self._replay_path
+        if self.spill_path.exists():
+            if replay_path.exists():
+                # Leftover from an interrupted replay: merge it first
+                with open(replay_path, "a", encoding="utf-8") as dst, open(self.spill_path, encoding="utf-8") as src:
+                    dst.write(src.read())
+                    dst.flush()
+                    os.fsync(dst.fileno())
+                self.spill_path.unlink()
+            else:
+                os.replace(self.spill_path, replay_path)
+        if not replay_path.exists():
+            return []
+        with open(replay_path, encoding="utf-8") as f:
+            return [json_util.loads(line) for line in f if line.strip()]
+
+    async def _replay_spill(self):
+        if not self.durable:
+            return
+        entries = await asyncio.to_thread(self._take_spill)
+        if not entries:
+            return
+        try:
+            # Entries keep their _id, so re-inserting a partly replayed file is safe
+            for i in range(0, len(entries), self.batch_size):
+                await self._insert(entries[i:i + self.batch_size])
+        except Exception as e:
+            # The .replay file stays and is retried with the next replay
+            logger.error(f"Failed to replay spilled audit entries: {str(e)}")
+            return
+        self._replay_path.unlink()
+        self.replayed += len(entries)
+        logger.info(f"Replayed {len(entries)} spilled audit entries")
+
+
+# Process-wide writer used by database.log_audit; started/stopped by server.py
+audit_writer = AuditLogWriter(audit_store)
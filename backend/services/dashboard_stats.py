@@ -0,0 +1,211 @@
+"""
+Dashboard statistics computed from the source collections.
+
+The provider dashboard used to issue one query per statistic plus one
+clinical-note lookup per completed appointment. Everything is now computed
+by a single aggregation: a $facet over the provider's appointments, followed
+by uncorrelated $lookup stages for clients, unread messages and paid invoices.
+"""
+
+from datetime import date, timedelta
+from database import (
+    appointments_collection, users_collection, messages_collection,
+    invoices_collection, clinical_notes_collection
+)
+
+
+def _week_bounds(today: date):
+    """Return the ISO date strings of Monday and Sunday of the current week"""
+    week_start = today - timedelta(days=today.weekday())
+    week_end = week_start + timedelta(days=6)
+    return week_start.isoformat(), week_end.isoformat()
+
+
+def _count(facet: dict, key: str) -> int:
+    """Read a {"$count": "n"} result out of a facet/lookup array"""
+    values = facet.get(key) or []
+    return values[0]["n"] if values else 0
+
+
+def _upcoming_facet() -> list:
+    """Appointments that are still pending or confirmed"""
+    return [
+        {"$match": {"status": {"$in": ["confirmed", "pending"]}}},
+        {"$count": "n"}
+    ]
+
+
+def _pending_notes_facet() -> list:
+    """Completed appointments that have no clinical note yet"""
+    return [
+        {"$match": {"status": "completed"}},
+        {"$lookup": {
+            "from": clinical_notes_collection.name,
+            "localField": "_id",
+            "foreignField": "appointmentId",
+            "as": "notes"
+        }},
+        {"$match": {"notes": {"$size": 0}}},
+        {"$count": "n"}
+    ]
+
+
+def _count_lookup(collection, match: dict, as_field: str) -> dict:
+    """Uncorrelated $lookup that counts the documents of another collection"""
+    return {"$lookup": {
+        "from": collection.name,
+        "pipeline": [{"$match": match}, {"$count": "n"}],
+        "as": as_field
+    }}
+
+
+def build_provider_dashboard_pipeline(provider_id: str, today: date) -> list:
+    """
+    Build the aggregation that returns every ProviderDashboardStats input
+    in one round trip. Runs against the appointments collection.
+    """
+    today_str = today.isoformat()
+    week_start, week_end = _week_bounds(today)
+    current_month = today.strftime("%Y-%m")
+
+    return [
+        {"$match": {"providerId": provider_id}},
+        # $facet always emits exactly one document, even for providers
+        # without appointments, so the lookups below always run
+        {"$facet": {
+            "appointmentsToday": [
+                {"$match": {"date": today_str, "status": {"$ne": "cancelled"}}},
+                {"$count": "n"}
+            ],
+            "appointmentsWeek": [
+                {"$match": {
+                    "date": {"$gte": week_start, "$lte": week_end},
+                    "status": {"$ne": "cancelled"}
+                }},
+                {"$count": "n"}
+            ],
+            "upcomingAppointments": _upcoming_facet(),
+            "pendingNotes": _pending_notes_facet()
+        }},
+        _count_lookup(users_collection, {"userType": "client", "providerId": provider_id}, "activeClients"),
+        _count_lookup(messages_collection, {"receiverId": provider_id, "read": False}, "messagesUnread"),
+        {"$lookup": {
+            "from": invoices_collection.name,
+            "pipeline": [
+                {"$match": {"providerId": provider_id, "status": "paid"}},
+                {"$group": {
+                    "_id": None,
+                    "totalIncome": {"$sum": "$amount"},
+                    "monthlyIncome": {"$sum": {"$cond": [
+                        {"$eq": [
+                            {"$substrCP": [{"$ifNull": ["$invoiceDate", ""]}, 0, 7]},
+                            current_month
+                        ]},
+                        "$amount",
+                        0
+                    ]}}
+                }}
+            ],
+            "as": "income"
+        }}
+    ]
+
+
+async def compute_provider_dashboard(provider_id: str, today: date = None) -> dict:
+    """Compute provider dashboard statistics with a single aggregation query"""
+    today = today or date.today()
+    pipeline = build_provider_dashboard_pipeline(provider_id, today)
+
+    results = await appointments_collection.aggregate(pipeline).to_list(1)
+    result = results[0] if results else {}
+    income = (result.get("income") or [{}])[0]
+
+    return {
+        "totalIncome": float(income.get("totalIncome", 0)),
+        "monthlyIncome": float(income.get("monthlyIncome", 0)),
+        "appointmentsToday": _count(result, "appointmentsToday"),
+        "appointmentsWeek": _count(result, "appointmentsWeek"),
+        "pendingNotes": _count(result, "pendingNotes"),
+        "activeClients": _count(result, "activeClients"),
+        "messagesUnread": _count(result, "messagesUnread"),
+        "upcomingAppointments": _count(result, "upcomingAppointments")
+    }
+
+
+async def compute_provider_counters(provider_id: str) -> dict:
+    """
+    Rebuild the materialized provider counters (see services.provider_stats)
+    from the source collections. Date-dependent statistics are kept as
+    per-day appointment counts and per-month income so they can be
+    maintained with $inc.
+    """
+    pipeline = [
+        {"$match": {"providerId": provider_id}},
+        {"$facet": {
+            "appointmentsByDate": [
+                {"$match": {"status": {"$ne": "cancelled"}}},
+                {"$group": {"_id": "$date", "n": {"$sum": 1}}}
+            ],
+            "upcomingAppointments": _upcoming_facet(),
+            "pendingNotes": _pending_notes_facet()
+        }},
+        _count_lookup(users_collection, {"userType": "client", "providerId": provider_id}, "activeClients"),
+        _count_lookup(messages_collection, {"receiverId": provider_id, "read": False}, "messagesUnread"),
+        {"$lookup": {
+            "from": invoices_collection.name,
+            "pipeline": [
+                {"$match": {"providerId": provider_id, "status": "paid"}},
+                {"$group": {
+                    "_id": {"$substrCP": [{"$ifNull": ["$invoiceDate", ""]}, 0, 7]},
+                    "amount": {"$sum": "$amount"}
+                }}
+            ],
+            "as": "incomeByMonth"
+        }}
+    ]
+
+    results = await appointments_collection.aggregate(pipeline).to_list(1)
+    result = results[0] if results else {}
+    income_rows = result.get("incomeByMonth") or []
+
+    return {
+        "activeClients": _count(result, "activeClients"),
+        "messagesUnread": _count(result, "messagesUnread"),
+        "upcomingAppointments": _count(result, "upcomingAppointments"),
+        "pendingNotes": _count(result, "pendingNotes"),
+        "totalIncome": float(sum(row["amount"] for row in income_rows)),
+        "incomeByMonth": {row["_id"]: float(row["amount"]) for row in income_rows if row["_id"]},
+        "appointmentsByDate": {
+            row["_id"]: row["n"] for row in result.get("appointmentsByDate") or [] if row["_id"]
+        }
+    }
+
+
+async def compute_client_counters(client_id: str) -> dict:
+    """Rebuild the materialized client dashboard counters from the source collections"""
+    pipeline = [
+        {"$match": {"clientId": client_id}},
+        {"$facet": {
+            "upcomingAppointments": _upcoming_facet(),
+            "completedSessions": [
+                {"$match": {"status": "completed"}},
+                {"$count": "n"}
+            ]
+        }},
+        _count_lookup(
+            invoices_collection,
+            {"clientId": client_id, "status": {"$in": ["pending", "overdue"]}},
+            "pendingPayments"
+        ),
+        _count_lookup(messages_collection, {"receiverId": client_id, "read": False}, "unreadMessages")
+    ]
+
+    results = await appointments_collection.aggregate(pipeline).to_list(1)
+    result = results[0] if results else {}
+
+    return {
+        "upcomingAppointments": _count(result, "upcomingAppointments"),
+        "pendingPayments": _count(result, "pendingPayments"),
+        "unreadMessages": _count(result, "unreadMessages"),
+        "completedSessions": _count(result, "completedSessions")
+    }
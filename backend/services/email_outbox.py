@@ -0,0 +1,367 @@
+"""
+Durable outbound email queue.
+
+send_email() no longer talks to the email provider inside the request or
+job that wants the email. It inserts the message into the email_outbox
+collection and returns; a background worker claims due messages in
+batches, hands each batch to the configured backend, and records the
+outcome per message. Messages survive restarts, failed sends are retried
+with exponential backoff until EMAIL_MAX_ATTEMPTS, and backend calls are
+throttled to EMAIL_SEND_RATE per second.
+
+Backends (EMAIL_BACKEND):
+  resend - Resend batch API, up to 100 messages per call (default when
+           RESEND_API_KEY is set)
+  smtp   - plain SMTP, e.g. a local debugging server such as
+           `python -m aiosmtpd -n -l localhost:1025`
+  file   - writes each message as an .eml file into EMAIL_FILE_DIR
+  disabled - nothing is queued (default without RESEND_API_KEY)
+
+smtp and file make it possible to run the whole pipeline offline.
+"""
+
+import asyncio
+import logging
+import os
+import smtplib
+import uuid
+from datetime import datetime, timezone, timedelta
+from email.message import EmailMessage
+from pathlib import Path
+from typing import List, Optional
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+from database import email_outbox_collection
+
+logger = logging.getLogger(__name__)
+
+ROOT_DIR = Path(__file__).parent.parent
+
+RESEND_API_KEY = os.environ.get('RESEND_API_KEY')
+SENDER_EMAIL = os.environ.get('SENDER_EMAIL', 'onboarding@resend.dev')
+
+EMAIL_BACKEND = os.environ.get("EMAIL_BACKEND") or ("resend" if RESEND_API_KEY else "disabled")
+EMAIL_BATCH_SIZE = int(os.environ.get("EMAIL_BATCH_SIZE", "50"))
+EMAIL_SEND_RATE = float(os.environ.get("EMAIL_SEND_RATE", "2"))  # backend calls per second
+EMAIL_MAX_ATTEMPTS = int(os.environ.get("EMAIL_MAX_ATTEMPTS", "8"))
+EMAIL_RETRY_BASE_SECONDS = float(os.environ.get("EMAIL_RETRY_BASE_SECONDS", "30"))
+EMAIL_RETRY_MAX_SECONDS = float(os.environ.get("EMAIL_RETRY_MAX_SECONDS", "3600"))
+EMAIL_FILE_DIR = Path(os.environ.get("EMAIL_FILE_DIR", str(ROOT_DIR / "email_outbox")))
+EMAIL_SMTP_HOST = os.environ.get("EMAIL_SMTP_HOST", "localhost")
+EMAIL_SMTP_PORT = int(os.environ.get("EMAIL_SMTP_PORT", "1025"))
+EMAIL_SMTP_USER = os.environ.get("EMAIL_SMTP_USER")
+EMAIL_SMTP_PASSWORD = os.environ.get("EMAIL_SMTP_PASSWORD")
+EMAIL_SMTP_STARTTLS = os.environ.get("EMAIL_SMTP_STARTTLS", "false").lower() == "true"
+
+# Longest sleep when nothing is due (messages queued by other processes)
+IDLE_POLL_SECONDS = 30.0
+# A claimed batch whose worker disappeared becomes claimable again after this
+CLAIM_LEASE = timedelta(minutes=5)
+
+
+class SendResult:
+    """Outcome of one message of a batch"""
+
+    def __init__(self, ok: bool, message_id: Optional[str] = None, error: Optional[str] = None):
+        self.ok = ok
+        self.message_id = message_id
+        self.error = error
+
+
+class ResendBackend:
+    max_batch = 100
+
+    def __init__(self):
+        import resend
+        resend.api_key = RESEND_API_KEY
+        self._resend = resend
+
+    def _send(self, messages: List[dict]) -> List[SendResult]:
+        params = [
+            {"from": m["from"], "to": [m["to"]], "subject": m["subject"], "html": m["html"]}
+            for m in messages
+        ]
+        # The batch is accepted or rejected as a whole; ids come back in order
+        response = self._resend.Batch.send(params)
+        ids = [item.get("id") for item in response.get("data", [])]
+        return [SendResult(True, message_id) for message_id in ids] + \
+            [SendResult(False, error="No id returned") for _ in messages[len(ids):]]
+
+    async def send_batch(self, messages: List[dict]) -> List[SendResult]:
+        return await asyncio.to_thread(self._send, messages)
+
+
+def _mime(message: dict) -> EmailMessage:
+    mime = EmailMessage()
+    mime["From"] = message["from"]
+    mime["To"] = message["to"]
+    mime["Subject"] = message["subject"]
+    mime["Message-ID"] = f"<{message['_id']}@docportal>"
+    mime.set_content("This email requires an HTML capable client.")
+    mime.add_alternative(message["html"], subtype="html")
+    return mime
+
+
+class SmtpBackend:
+    max_batch = 100
+
+    def _send(self, messages: List[dict]) -> List[SendResult]:
+        results = []
+        # One connection per batch
+        with smtplib.SMTP(EMAIL_SMTP_HOST, EMAIL_SMTP_PORT, timeout=30) as smtp:
+            if EMAIL_SMTP_STARTTLS:
+                smtp.starttls()
+            if EMAIL_SMTP_USER:
+                smtp.login(EMAIL_SMTP_USER, EMAIL_SMTP_PASSWORD or "")
+            for message in messages:
+                try:
+                    smtp.send_message(_mime(message))
+                    results.append(SendResult(True, str(message["_id"])))
+                except smtplib.SMTPException as e:
+                    results.append(SendResult(False, error=str(e)))
+        return results
+
+    async def send_batch(self, messages: List[dict]) -> List[SendResult]:
+        return await asyncio.to_thread(self._send, messages)
+
+
+class FileBackend:
+    max_batch = 1000
+
+    def __init__(self, directory: Path = EMAIL_FILE_DIR):
+        self.directory = Path(directory)
+
+    def _send(self, messages: List[dict]) -> List[SendResult]:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for message in messages:
+            path = self.directory / f"{message['_id']}.eml"
+            path.write_bytes(bytes(_mime(message)))
+        return [SendResult(True, str(message["_id"])) for message in messages]
+
+    async def send_batch(self, messages: List[dict]) -> List[SendResult]:
+        return await asyncio.to_thread(self._send, messages)
+
+
+EMAIL_BACKENDS = {
+    "resend": ResendBackend,
+    "smtp": SmtpBackend,
+    "file": FileBackend,
+}
+
+
+def create_backend(name: str = EMAIL_BACKEND):
+    if name == "disabled":
+        return None
+    if name not in EMAIL_BACKENDS:
+        raise ValueError(f"Unknown EMAIL_BACKEND '{name}' (expected one of: {', '.join(EMAIL_BACKENDS)}, disabled)")
+    return EMAIL_BACKENDS[name]()
+
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+
+    async def wait(self):
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        if self._next > now:
+            await asyncio.sleep(self._next - now)
+        self._next = max(now, self._next) + self.interval
+
+
+def retry_delay(attempts: int) -> float:
+    return min(EMAIL_RETRY_BASE_SECONDS * 2 ** (attempts - 1), EMAIL_RETRY_MAX_SECONDS)
+
+
+def _utc(value: datetime) -> datetime:
+    # Datetimes read back from MongoDB are naive UTC
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+class EmailOutboxWorker:
+    """Sends queued emails in rate-limited batches"""
+
+    def __init__(self, collection, backend=None, batch_size: int = EMAIL_BATCH_SIZE,
+                 rate: float = EMAIL_SEND_RATE):
+        self.collection = collection
+        self.backend = backend
+        self.batch_size = batch_size
+        self.rate_limiter = RateLimiter(rate)
+        self._task = None
+        self._wakeup = None
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.batches = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        if self.running or not self.enabled:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Email outbox worker started ({EMAIL_BACKEND} backend)")
+
+    async def stop(self):
+        if not self.running:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logger.info(f"Email outbox worker stopped ({self.sent} sent)")
+
+    def wake(self):
+        if self._wakeup:
+            self._wakeup.set()
+
+    async def enqueue(self, to_email: str, subject: str, html_content: str,
+                      dedupe_key: Optional[str] = None) -> str:
+        """Queue one email; a dedupe_key already in the outbox is not queued twice"""
+        now = datetime.now(timezone.utc)
+        message_id = dedupe_key or str(ObjectId())
+        try:
+            await self.collection.insert_one({
+                "_id": message_id,
+                "from": SENDER_EMAIL,
+                "to": to_email,
+                "subject": subject,
+                "html": html_content,
+                "status": "pending",
+                "attempts": 0,
+                "nextAttemptAt": now,
+                "createdAt": now
+            })
+        except DuplicateKeyError:
+            logger.info(f"Email {message_id} already queued")
+            return message_id
+        self.wake()
+        return message_id
+
+    async def stats(self) -> dict:
+        return {
+            "backend": EMAIL_BACKEND,
+            "running": self.running,
+            "pending": await self.collection.count_documents({"status": {"$in": ["pending", "sending"]}}),
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed": self.failed,
+            "batches": self.batches
+        }
+
+    async def _run(self):
+        while True:
+            try:
+                while await self._send_next_batch():
+                    pass
+                delay = await self._seconds_until_next_message()
+            except Exception as e:
+                logger.error(f"Email outbox worker error: {str(e)}")
+                delay = IDLE_POLL_SECONDS
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _seconds_until_next_message(self) -> float:
+        pending = await self.collection.find_one(
+            {"status": "pending"}, {"nextAttemptAt": 1}, sort=[("nextAttemptAt", 1)]
+        )
+        stale = await self.collection.find_one(
+            {"status": "sending"}, {"lockedUntil": 1}, sort=[("lockedUntil", 1)]
+        )
+        due_times = [_utc(pending["nextAttemptAt"])] if pending else []
+        if stale:
+            due_times.append(_utc(stale["lockedUntil"]))
+        if not due_times:
+            return IDLE_POLL_SECONDS
+        delay = (min(due_times) - datetime.now(timezone.utc)).total_seconds()
+        return min(max(delay, 0.0), IDLE_POLL_SECONDS)
+
+    def _due_filter(self, now: datetime) -> dict:
+        return {"$or": [
+            {"status": "pending", "nextAttemptAt": {"$lte": now}},
+            {"status": "sending", "lockedUntil": {"$lte": now}}
+        ]}
+
+    async def _claim_batch(self) -> List[dict]:
+        """Claim up to one batch of due messages for this worker"""
+        now = datetime.now(timezone.utc)
+        limit = min(self.batch_size, self.backend.max_batch)
+        candidates = await self.collection.find(
+            self._due_filter(now), {"_id": 1}
+        ).sort("nextAttemptAt", 1).limit(limit).to_list(limit)
+        if not candidates:
+            return []
+
+        # The filter is re-checked per document, so messages another worker
+        # claimed in between are skipped
+        claim = uuid.uuid4().hex
+        await self.collection.update_many(
+            {"_id": {"$in": [c["_id"] for c in candidates]}, **self._due_filter(now)},
+            {"$set": {"status": "sending", "claim": claim, "lockedUntil": now + CLAIM_LEASE},
+             "$inc": {"attempts": 1}}
+        )
+        return await self.collection.find({"claim": claim, "status": "sending"}).to_list(limit)
+
+    async def _send_next_batch(self) -> bool:
+        """Send one batch; returns False when nothing was due"""
+        messages = await self._claim_batch()
+        if not messages:
+            return False
+
+        await self.rate_limiter.wait()
+        try:
+            results = await self.backend.send_batch(messages)
+        except Exception as e:
+            logger.error(f"Email batch of {len(messages)} failed: {str(e)}")
+            results = [SendResult(False, error=str(e)) for _ in messages]
+        self.batches += 1
+
+        now = datetime.now(timezone.utc)
+        updates = []
+        for message, result in zip(messages, results):
+            current = {"_id": message["_id"], "claim": message["claim"]}
+            if result.ok:
+                self.sent += 1
+                updates.append(UpdateOne(current, {
+                    "$set": {"status": "sent", "sentAt": now, "providerMessageId": result.message_id},
+                    "$unset": {"claim": "", "lockedUntil": ""}
+                }))
+            elif message["attempts"] >= EMAIL_MAX_ATTEMPTS:
+                self.failed += 1
+                logger.error(f"Giving up on email {message['_id']} to {message['to']}: {result.error}")
+                updates.append(UpdateOne(current, {
+                    "$set": {"status": "failed", "lastError": result.error},
+                    "$unset": {"claim": "", "lockedUntil": ""}
+                }))
+            else:
+                self.retried += 1
+                updates.append(UpdateOne(current, {
+                    "$set": {
+                        "status": "pending",
+                        "lastError": result.error,
+                        "nextAttemptAt": now + timedelta(seconds=retry_delay(message["attempts"]))
+                    },
+                    "$unset": {"claim": "", "lockedUntil": ""}
+                }))
+        await self.collection.bulk_write(updates, ordered=False)
+        return True
+
+
+email_outbox = EmailOutboxWorker(email_outbox_collection, create_backend())
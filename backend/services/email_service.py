@@ -1,5 +1,3 @@
-import os
-import asyncio
 import logging
 from dotenv import load_dotenv
 from pathlib import Path
@@ -7,25 +5,23 @@ from pathlib import Path
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+from services.email_outbox import email_outbox, EMAIL_BACKEND  # noqa: E402
+from services.email_templates import render_email  # noqa: E402
+from services.provider_cache import get_provider_settings  # noqa: E402
+
 logger = logging.getLogger(__name__)
 
-# Check if Resend is configured
-RESEND_API_KEY = os.environ.get('RESEND_API_KEY')
-SENDER_EMAIL = os.environ.get('SENDER_EMAIL', 'onboarding@resend.dev')
+# Longest message excerpt quoted in a new-message email
+MESSAGE_PREVIEW_LENGTH = 150
 
-# Only import resend if configured
-if RESEND_API_KEY:
-    import resend
-    resend.api_key = RESEND_API_KEY
-    EMAIL_CONFIGURED = True
-else:
-    EMAIL_CONFIGURED = False
-    logger.warning("RESEND_API_KEY not configured. Email notifications will be disabled.")
+EMAIL_CONFIGURED = email_outbox.enabled
+if not EMAIL_CONFIGURED:
+    logger.warning("RESEND_API_KEY not configured and no EMAIL_BACKEND set. Email notifications will be disabled.")
 
 
-async def send_email(to_email: str, subject: str, html_content: str) -> dict:
+async def send_email(to_email: str, subject: str, html_content: str, dedupe_key: str = None) -> dict:
     """
-    Send an email using Resend API.
+    Queue an email in the outbox; the outbox worker sends it.
     Returns a dict with status and message.
     """
     if not EMAIL_CONFIGURED:
@@ -36,122 +32,71 @@ async def send_email(to_email: str, subject: str, html_content: str) -> dict:
             "configured": False
         }
     
-    params = {
-        "from": SENDER_EMAIL,
-        "to": [to_email],
-        "subject": subject,
-        "html": html_content
+    email_id = await email_outbox.enqueue(to_email, subject, html_content, dedupe_key)
+    logger.info(f"Email queued for {to_email} via {EMAIL_BACKEND}: {subject}")
+    return {
+        "status": "queued",
+        "message": f"Email to {to_email} queued",
+        "email_id": email_id,
+        "configured": True
     }
-    
-    try:
-        # Run sync SDK in thread to keep FastAPI non-blocking
-        email = await asyncio.to_thread(resend.Emails.send, params)
-        logger.info(f"Email sent successfully to {to_email}: {subject}")
-        return {
-            "status": "success",
-            "message": f"Email sent to {to_email}",
-            "email_id": email.get("id"),
-            "configured": True
-        }
-    except Exception as e:
-        logger.error(f"Failed to send email to {to_email}: {str(e)}")
-        return {
-            "status": "error",
-            "message": str(e),
-            "configured": True
-        }
+
+
+async def practice_locale(provider_id: str) -> str:
+    """Language of a provider's practice (their invoiceLanguage), used for emails about it"""
+    settings = await get_provider_settings(provider_id)
+    return (settings or {}).get("invoiceLanguage") or "en"
+
+
+def _preview(message: str) -> str:
+    # Truncate message preview if too long
+    if len(message) > MESSAGE_PREVIEW_LENGTH:
+        return message[:MESSAGE_PREVIEW_LENGTH - 3] + "..."
+    return message
 
 
 async def send_new_message_notification(
     provider_email: str,
     provider_name: str,
     client_name: str,
-    message_preview: str
+    message_preview: str,
+    locale: str = None,
+    dedupe_key: str = None
 ) -> dict:
     """
     Send notification to provider when a client sends a new message.
     """
-    subject = f"New Message from {client_name} - DocPortal"
-    
-    # Truncate message preview if too long
-    if len(message_preview) > 150:
-        message_preview = message_preview[:147] + "..."
+    subject, html_content = render_email(
+        "new_message", locale,
+        recipient_name=provider_name,
+        client_name=client_name,
+        message_preview=_preview(message_preview)
+    )
     
-    html_content = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="utf-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    </head>
-    <body style="margin: 0; padding: 0; font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, 'Helvetica Neue', Arial, sans-serif; background-color: #f4f4f5;">
-        <table role="presentation" width="100%" cellspacing="0" cellpadding="0" style="max-width: 600px; margin: 0 auto; padding: 20px;">
-            <tr>
-                <td style="background-color: #ffffff; border-radius: 12px; padding: 40px; box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);">
-                    <!-- Header -->
-                    <table role="presentation" width="100%" cellspacing="0" cellpadding="0">
-                        <tr>
-                            <td style="padding-bottom: 24px; border-bottom: 1px solid #e4e4e7;">
-                                <h1 style="margin: 0; font-size: 24px; font-weight: 700; color: #2563eb;">DocPortal</h1>
-                            </td>
-                        </tr>
-                    </table>
-                    
-                    <!-- Content -->
-                    <table role="presentation" width="100%" cellspacing="0" cellpadding="0">
-                        <tr>
-                            <td style="padding-top: 24px;">
-                                <p style="margin: 0 0 16px 0; font-size: 16px; color: #3f3f46;">
-                                    Hi {provider_name.split()[0] if provider_name else 'there'},
-                                </p>
-                                <p style="margin: 0 0 24px 0; font-size: 16px; color: #3f3f46;">
-                                    You have received a new message from <strong style="color: #18181b;">{client_name}</strong>:
-                                </p>
-                                
-                                <!-- Message Box -->
-                                <table role="presentation" width="100%" cellspacing="0" cellpadding="0">
-                                    <tr>
-                                        <td style="background-color: #f4f4f5; border-radius: 8px; padding: 20px; border-left: 4px solid #2563eb;">
-                                            <p style="margin: 0; font-size: 15px; color: #52525b; font-style: italic;">
-                                                "{message_preview}"
-                                            </p>
-                                        </td>
-                                    </tr>
-                                </table>
-                                
-                                <!-- CTA Button -->
-                                <table role="presentation" width="100%" cellspacing="0" cellpadding="0">
-                                    <tr>
-                                        <td style="padding-top: 32px; text-align: center;">
-                                            <p style="margin: 0; font-size: 14px; color: #71717a;">
-                                                Log in to DocPortal to view and respond to this message.
-                                            </p>
-                                        </td>
-                                    </tr>
-                                </table>
-                            </td>
-                        </tr>
-                    </table>
-                    
-                    <!-- Footer -->
-                    <table role="presentation" width="100%" cellspacing="0" cellpadding="0">
-                        <tr>
-                            <td style="padding-top: 32px; border-top: 1px solid #e4e4e7; margin-top: 32px;">
-                                <p style="margin: 0; font-size: 12px; color: #a1a1aa; text-align: center;">
-                                    This is an automated notification from DocPortal.<br>
-                                    Please do not reply directly to this email.
-                                </p>
-                            </td>
-                        </tr>
-                    </table>
-                </td>
-            </tr>
-        </table>
-    </body>
-    </html>
+    return await send_email(provider_email, subject, html_content, dedupe_key)
+
+
+async def send_message_digest_notification(
+    provider_email: str,
+    provider_name: str,
+    client_name: str,
+    message_count: int,
+    message_previews: list,
+    locale: str = None,
+    dedupe_key: str = None
+) -> dict:
+    """
+    Send one notification to provider for several new messages from a client.
     """
+    subject, html_content = render_email(
+        "message_digest", locale,
+        recipient_name=provider_name,
+        client_name=client_name,
+        message_count=message_count,
+        message_previews=[_preview(message) for message in message_previews]
+    )
     
-    return await send_email(provider_email, subject, html_content)
+    return await send_email(provider_email, subject, html_content, dedupe_key)
 
 
 def is_email_configured() -> bool:
@@ -166,110 +111,24 @@ async def send_appointment_reminder(
     appointment_type: str,
     appointment_date: str,
     appointment_time: str,
-    video_link: str = None
+    video_link: str = None,
+    dedupe_key: str = None,
+    locale: str = None
 ) -> dict:
     """
     Send appointment reminder email to client (24 hours before).
     """
-    subject = f"Reminder: Your appointment tomorrow - {appointment_type}"
+    subject, html_content = render_email(
+        "appointment_reminder", locale,
+        recipient_name=client_name,
+        provider_name=provider_name,
+        appointment_type=appointment_type,
+        appointment_date=appointment_date,
+        appointment_time=appointment_time,
+        video_link=video_link
+    )
     
-    video_section = ""
-    if video_link:
-        video_section = f"""
-        <table role="presentation" width="100%" cellspacing="0" cellpadding="0" style="margin-top: 16px;">
-            <tr>
-                <td style="background-color: #dbeafe; border-radius: 8px; padding: 20px; text-align: center;">
-                    <p style="margin: 0 0 12px 0; font-size: 14px; color: #1e40af;"><strong>Video Consultation</strong></p>
-                    <a href="{video_link}" style="display: inline-block; background-color: #2563eb; color: white; padding: 12px 24px; border-radius: 6px; text-decoration: none; font-weight: 600;">
-                        Join Video Call
-                    </a>
-                </td>
-            </tr>
-        </table>
-        """
-    
-    html_content = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="utf-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    </head>
-    <body style="margin: 0; padding: 0; font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, 'Helvetica Neue', Arial, sans-serif; background-color: #f4f4f5;">
-        <table role="presentation" width="100%" cellspacing="0" cellpadding="0" style="max-width: 600px; margin: 0 auto; padding: 20px;">
-            <tr>
-                <td style="background-color: #ffffff; border-radius: 12px; padding: 40px; box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);">
-                    <!-- Header -->
-                    <table role="presentation" width="100%" cellspacing="0" cellpadding="0">
-                        <tr>
-                            <td style="padding-bottom: 24px; border-bottom: 1px solid #e4e4e7;">
-                                <h1 style="margin: 0; font-size: 24px; font-weight: 700; color: #2563eb;">DocPortal</h1>
-                            </td>
-                        </tr>
-                    </table>
-                    
-                    <!-- Content -->
-                    <table role="presentation" width="100%" cellspacing="0" cellpadding="0">
-                        <tr>
-                            <td style="padding-top: 24px;">
-                                <p style="margin: 0 0 16px 0; font-size: 16px; color: #3f3f46;">
-                                    Hi {client_name.split()[0] if client_name else 'there'},
-                                </p>
-                                <p style="margin: 0 0 24px 0; font-size: 16px; color: #3f3f46;">
-                                    This is a friendly reminder about your upcoming appointment <strong>tomorrow</strong>.
-                                </p>
-                                
-                                <!-- Appointment Details Box -->
-                                <table role="presentation" width="100%" cellspacing="0" cellpadding="0">
-                                    <tr>
-                                        <td style="background-color: #ecfdf5; border-radius: 8px; padding: 20px; border-left: 4px solid #10b981;">
-                                            <p style="margin: 0 0 8px 0; font-size: 14px; color: #065f46;"><strong>Appointment Details:</strong></p>
-                                            <p style="margin: 0 0 4px 0; font-size: 14px; color: #047857;">Type: {appointment_type}</p>
-                                            <p style="margin: 0 0 4px 0; font-size: 14px; color: #047857;">Date: {appointment_date}</p>
-                                            <p style="margin: 0 0 4px 0; font-size: 14px; color: #047857;">Time: {appointment_time}</p>
-                                            <p style="margin: 0; font-size: 14px; color: #047857;">Provider: {provider_name}</p>
-                                        </td>
-                                    </tr>
-                                </table>
-                                
-                                {video_section}
-                                
-                                <!-- Tips -->
-                                <table role="presentation" width="100%" cellspacing="0" cellpadding="0">
-                                    <tr>
-                                        <td style="padding-top: 24px;">
-                                            <p style="margin: 0 0 8px 0; font-size: 14px; color: #71717a;"><strong>Tips for your appointment:</strong></p>
-                                            <ul style="margin: 0; padding-left: 20px; font-size: 14px; color: #71717a;">
-                                                <li>Be ready 5 minutes before your scheduled time</li>
-                                                <li>Have a stable internet connection for video calls</li>
-                                                <li>Prepare any questions you want to discuss</li>
-                                            </ul>
-                                        </td>
-                                    </tr>
-                                </table>
-                            </td>
-                        </tr>
-                    </table>
-                    
-                    <!-- Footer -->
-                    <table role="presentation" width="100%" cellspacing="0" cellpadding="0">
-                        <tr>
-                            <td style="padding-top: 32px; border-top: 1px solid #e4e4e7; margin-top: 32px;">
-                                <p style="margin: 0; font-size: 12px; color: #a1a1aa; text-align: center;">
-                                    Need to reschedule? Log in to DocPortal to manage your appointment.<br>
-                                    This is an automated reminder.
-                                </p>
-                            </td>
-                        </tr>
-                    </table>
-                </td>
-            </tr>
-        </table>
-    </body>
-    </html>
-    """
-    
-    result = await send_email(client_email, subject, html_content)
+    result = await send_email(client_email, subject, html_content, dedupe_key)
     
     # Log for demo mode
     if not EMAIL_CONFIGURED:
@@ -287,99 +146,22 @@ async def send_refund_requested_notification(
     appointment_date: str,
     appointment_time: str,
     amount: float,
-    reason: str
+    reason: str,
+    locale: str = None
 ) -> dict:
     """
     Send notification to provider when a client requests a refund.
     """
-    subject = f"New Refund Request from {client_name} - DocPortal"
-    
-    html_content = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="utf-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    </head>
-    <body style="margin: 0; padding: 0; font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, 'Helvetica Neue', Arial, sans-serif; background-color: #f4f4f5;">
-        <table role="presentation" width="100%" cellspacing="0" cellpadding="0" style="max-width: 600px; margin: 0 auto; padding: 20px;">
-            <tr>
-                <td style="background-color: #ffffff; border-radius: 12px; padding: 40px; box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);">
-                    <!-- Header -->
-                    <table role="presentation" width="100%" cellspacing="0" cellpadding="0">
-                        <tr>
-                            <td style="padding-bottom: 24px; border-bottom: 1px solid #e4e4e7;">
-                                <h1 style="margin: 0; font-size: 24px; font-weight: 700; color: #2563eb;">DocPortal</h1>
-                            </td>
-                        </tr>
-                    </table>
-                    
-                    <!-- Content -->
-                    <table role="presentation" width="100%" cellspacing="0" cellpadding="0">
-                        <tr>
-                            <td style="padding-top: 24px;">
-                                <p style="margin: 0 0 16px 0; font-size: 16px; color: #3f3f46;">
-                                    Hi {provider_name.split()[0] if provider_name else 'there'},
-                                </p>
-                                <p style="margin: 0 0 24px 0; font-size: 16px; color: #3f3f46;">
-                                    <strong style="color: #18181b;">{client_name}</strong> has requested a refund for their appointment.
-                                </p>
-                                
-                                <!-- Appointment Details Box -->
-                                <table role="presentation" width="100%" cellspacing="0" cellpadding="0">
-                                    <tr>
-                                        <td style="background-color: #fef3c7; border-radius: 8px; padding: 20px; border-left: 4px solid #f59e0b;">
-                                            <p style="margin: 0 0 8px 0; font-size: 14px; color: #92400e;"><strong>Appointment Details:</strong></p>
-                                            <p style="margin: 0 0 4px 0; font-size: 14px; color: #78350f;">Type: {appointment_type}</p>
-                                            <p style="margin: 0 0 4px 0; font-size: 14px; color: #78350f;">Date: {appointment_date} at {appointment_time}</p>
-                                            <p style="margin: 0; font-size: 16px; color: #78350f;"><strong>Amount: €{amount:.2f}</strong></p>
-                                        </td>
-                                    </tr>
-                                </table>
-                                
-                                <!-- Reason Box -->
-                                <table role="presentation" width="100%" cellspacing="0" cellpadding="0" style="margin-top: 16px;">
-                                    <tr>
-                                        <td style="background-color: #f4f4f5; border-radius: 8px; padding: 20px;">
-                                            <p style="margin: 0 0 8px 0; font-size: 14px; color: #52525b;"><strong>Patient's Reason:</strong></p>
-                                            <p style="margin: 0; font-size: 15px; color: #3f3f46; font-style: italic;">
-                                                "{reason}"
-                                            </p>
-                                        </td>
-                                    </tr>
-                                </table>
-                                
-                                <!-- CTA -->
-                                <table role="presentation" width="100%" cellspacing="0" cellpadding="0">
-                                    <tr>
-                                        <td style="padding-top: 32px; text-align: center;">
-                                            <p style="margin: 0; font-size: 14px; color: #71717a;">
-                                                Please log in to DocPortal to review and process this refund request.
-                                            </p>
-                                        </td>
-                                    </tr>
-                                </table>
-                            </td>
-                        </tr>
-                    </table>
-                    
-                    <!-- Footer -->
-                    <table role="presentation" width="100%" cellspacing="0" cellpadding="0">
-                        <tr>
-                            <td style="padding-top: 32px; border-top: 1px solid #e4e4e7; margin-top: 32px;">
-                                <p style="margin: 0; font-size: 12px; color: #a1a1aa; text-align: center;">
-                                    This is an automated notification from DocPortal.<br>
-                                    Please do not reply directly to this email.
-                                </p>
-                            </td>
-                        </tr>
-                    </table>
-                </td>
-            </tr>
-        </table>
-    </body>
-    </html>
-    """
+    subject, html_content = render_email(
+        "refund_requested", locale,
+        recipient_name=provider_name,
+        client_name=client_name,
+        appointment_type=appointment_type,
+        appointment_date=appointment_date,
+        appointment_time=appointment_time,
+        amount=amount,
+        reason=reason
+    )
     
     result = await send_email(provider_email, subject, html_content)
     
@@ -397,104 +179,20 @@ async def send_refund_approved_notification(
     appointment_type: str,
     appointment_date: str,
     amount: float,
-    provider_response: str = None
+    provider_response: str = None,
+    locale: str = None
 ) -> dict:
     """
     Send notification to client when their refund is approved.
     """
-    subject = "Your Refund Has Been Approved - DocPortal"
-    
-    response_html = ""
-    if provider_response:
-        response_html = f"""
-        <table role="presentation" width="100%" cellspacing="0" cellpadding="0" style="margin-top: 16px;">
-            <tr>
-                <td style="background-color: #f4f4f5; border-radius: 8px; padding: 20px;">
-                    <p style="margin: 0 0 8px 0; font-size: 14px; color: #52525b;"><strong>Provider's Note:</strong></p>
-                    <p style="margin: 0; font-size: 15px; color: #3f3f46; font-style: italic;">
-                        "{provider_response}"
-                    </p>
-                </td>
-            </tr>
-        </table>
-        """
-    
-    html_content = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="utf-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    </head>
-    <body style="margin: 0; padding: 0; font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, 'Helvetica Neue', Arial, sans-serif; background-color: #f4f4f5;">
-        <table role="presentation" width="100%" cellspacing="0" cellpadding="0" style="max-width: 600px; margin: 0 auto; padding: 20px;">
-            <tr>
-                <td style="background-color: #ffffff; border-radius: 12px; padding: 40px; box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);">
-                    <!-- Header -->
-                    <table role="presentation" width="100%" cellspacing="0" cellpadding="0">
-                        <tr>
-                            <td style="padding-bottom: 24px; border-bottom: 1px solid #e4e4e7;">
-                                <h1 style="margin: 0; font-size: 24px; font-weight: 700; color: #2563eb;">DocPortal</h1>
-                            </td>
-                        </tr>
-                    </table>
-                    
-                    <!-- Content -->
-                    <table role="presentation" width="100%" cellspacing="0" cellpadding="0">
-                        <tr>
-                            <td style="padding-top: 24px;">
-                                <p style="margin: 0 0 16px 0; font-size: 16px; color: #3f3f46;">
-                                    Hi {client_name.split()[0] if client_name else 'there'},
-                                </p>
-                                <p style="margin: 0 0 24px 0; font-size: 16px; color: #3f3f46;">
-                                    Good news! Your refund request has been <strong style="color: #16a34a;">approved</strong>.
-                                </p>
-                                
-                                <!-- Refund Details Box -->
-                                <table role="presentation" width="100%" cellspacing="0" cellpadding="0">
-                                    <tr>
-                                        <td style="background-color: #dcfce7; border-radius: 8px; padding: 20px; border-left: 4px solid #16a34a;">
-                                            <p style="margin: 0 0 8px 0; font-size: 14px; color: #166534;"><strong>Refund Details:</strong></p>
-                                            <p style="margin: 0 0 4px 0; font-size: 14px; color: #15803d;">Appointment: {appointment_type}</p>
-                                            <p style="margin: 0 0 4px 0; font-size: 14px; color: #15803d;">Date: {appointment_date}</p>
-                                            <p style="margin: 0; font-size: 18px; color: #166534;"><strong>Refund Amount: €{amount:.2f}</strong></p>
-                                        </td>
-                                    </tr>
-                                </table>
-                                
-                                {response_html}
-                                
-                                <!-- Info -->
-                                <table role="presentation" width="100%" cellspacing="0" cellpadding="0">
-                                    <tr>
-                                        <td style="padding-top: 24px;">
-                                            <p style="margin: 0; font-size: 14px; color: #71717a;">
-                                                The refund will be processed to your original payment method within 5-10 business days.
-                                            </p>
-                                        </td>
-                                    </tr>
-                                </table>
-                            </td>
-                        </tr>
-                    </table>
-                    
-                    <!-- Footer -->
-                    <table role="presentation" width="100%" cellspacing="0" cellpadding="0">
-                        <tr>
-                            <td style="padding-top: 32px; border-top: 1px solid #e4e4e7; margin-top: 32px;">
-                                <p style="margin: 0; font-size: 12px; color: #a1a1aa; text-align: center;">
-                                    Thank you for using DocPortal.<br>
-                                    This is an automated notification.
-                                </p>
-                            </td>
-                        </tr>
-                    </table>
-                </td>
-            </tr>
-        </table>
-    </body>
-    </html>
-    """
+    subject, html_content = render_email(
+        "refund_approved", locale,
+        recipient_name=client_name,
+        appointment_type=appointment_type,
+        appointment_date=appointment_date,
+        amount=amount,
+        provider_response=provider_response
+    )
     
     result = await send_email(client_email, subject, html_content)
     
@@ -512,99 +210,20 @@ async def send_refund_rejected_notification(
     appointment_type: str,
     appointment_date: str,
     amount: float,
-    provider_response: str
+    provider_response: str,
+    locale: str = None
 ) -> dict:
     """
     Send notification to client when their refund is rejected.
     """
-    subject = "Update on Your Refund Request - DocPortal"
-    
-    html_content = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="utf-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    </head>
-    <body style="margin: 0; padding: 0; font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, 'Helvetica Neue', Arial, sans-serif; background-color: #f4f4f5;">
-        <table role="presentation" width="100%" cellspacing="0" cellpadding="0" style="max-width: 600px; margin: 0 auto; padding: 20px;">
-            <tr>
-                <td style="background-color: #ffffff; border-radius: 12px; padding: 40px; box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);">
-                    <!-- Header -->
-                    <table role="presentation" width="100%" cellspacing="0" cellpadding="0">
-                        <tr>
-                            <td style="padding-bottom: 24px; border-bottom: 1px solid #e4e4e7;">
-                                <h1 style="margin: 0; font-size: 24px; font-weight: 700; color: #2563eb;">DocPortal</h1>
-                            </td>
-                        </tr>
-                    </table>
-                    
-                    <!-- Content -->
-                    <table role="presentation" width="100%" cellspacing="0" cellpadding="0">
-                        <tr>
-                            <td style="padding-top: 24px;">
-                                <p style="margin: 0 0 16px 0; font-size: 16px; color: #3f3f46;">
-                                    Hi {client_name.split()[0] if client_name else 'there'},
-                                </p>
-                                <p style="margin: 0 0 24px 0; font-size: 16px; color: #3f3f46;">
-                                    We regret to inform you that your refund request has been <strong style="color: #dc2626;">declined</strong>.
-                                </p>
-                                
-                                <!-- Refund Details Box -->
-                                <table role="presentation" width="100%" cellspacing="0" cellpadding="0">
-                                    <tr>
-                                        <td style="background-color: #fef2f2; border-radius: 8px; padding: 20px; border-left: 4px solid #dc2626;">
-                                            <p style="margin: 0 0 8px 0; font-size: 14px; color: #991b1b;"><strong>Request Details:</strong></p>
-                                            <p style="margin: 0 0 4px 0; font-size: 14px; color: #b91c1c;">Appointment: {appointment_type}</p>
-                                            <p style="margin: 0 0 4px 0; font-size: 14px; color: #b91c1c;">Date: {appointment_date}</p>
-                                            <p style="margin: 0; font-size: 16px; color: #991b1b;"><strong>Amount: €{amount:.2f}</strong></p>
-                                        </td>
-                                    </tr>
-                                </table>
-                                
-                                <!-- Provider Response -->
-                                <table role="presentation" width="100%" cellspacing="0" cellpadding="0" style="margin-top: 16px;">
-                                    <tr>
-                                        <td style="background-color: #f4f4f5; border-radius: 8px; padding: 20px;">
-                                            <p style="margin: 0 0 8px 0; font-size: 14px; color: #52525b;"><strong>Provider's Response:</strong></p>
-                                            <p style="margin: 0; font-size: 15px; color: #3f3f46; font-style: italic;">
-                                                "{provider_response or 'No additional information provided.'}"
-                                            </p>
-                                        </td>
-                                    </tr>
-                                </table>
-                                
-                                <!-- Info -->
-                                <table role="presentation" width="100%" cellspacing="0" cellpadding="0">
-                                    <tr>
-                                        <td style="padding-top: 24px;">
-                                            <p style="margin: 0; font-size: 14px; color: #71717a;">
-                                                If you have questions about this decision, please contact your healthcare provider directly through DocPortal messaging.
-                                            </p>
-                                        </td>
-                                    </tr>
-                                </table>
-                            </td>
-                        </tr>
-                    </table>
-                    
-                    <!-- Footer -->
-                    <table role="presentation" width="100%" cellspacing="0" cellpadding="0">
-                        <tr>
-                            <td style="padding-top: 32px; border-top: 1px solid #e4e4e7; margin-top: 32px;">
-                                <p style="margin: 0; font-size: 12px; color: #a1a1aa; text-align: center;">
-                                    This is an automated notification from DocPortal.<br>
-                                    Please do not reply directly to this email.
-                                </p>
-                            </td>
-                        </tr>
-                    </table>
-                </td>
-            </tr>
-        </table>
-    </body>
-    </html>
-    """
+    subject, html_content = render_email(
+        "refund_rejected", locale,
+        recipient_name=client_name,
+        appointment_type=appointment_type,
+        appointment_date=appointment_date,
+        amount=amount,
+        provider_response=provider_response
+    )
     
     result = await send_email(client_email, subject, html_content)
     
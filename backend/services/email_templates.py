@@ -0,0 +1,401 @@
+"""
+Precompiled, localized email templates.
+
+The notification bodies live in backend/templates/email as Jinja2
+templates and are compiled once when this module is imported. All of them
+share layout.html (header, content table, footer); the layout only depends
+on the locale and the footer text, so each (locale, footer) variant is
+rendered once per process and cached as the HTML before and after the
+body. A send only renders its small body template.
+
+render_email is pure: the same arguments always give the same subject and
+HTML, without touching the database or the outbox.
+
+Strings are kept per locale for the languages the frontend supports; an
+unknown locale falls back to English.
+"""
+
+from functools import lru_cache
+from pathlib import Path
+from typing import Tuple
+from jinja2 import Environment, FileSystemLoader, StrictUndefined, select_autoescape
+from markupsafe import Markup
+
+TEMPLATE_DIR = Path(__file__).parent.parent / "templates" / "email"
+
+DEFAULT_LOCALE = "en"
+
+# Subject string and footer of each email template
+EMAILS = {
+    "new_message": {"subject": "new_message_subject", "footer": "footer_notification"},
+    "message_digest": {"subject": "message_digest_subject", "footer": "footer_notification"},
+    "appointment_reminder": {"subject": "reminder_subject", "footer": "footer_reminder"},
+    "refund_requested": {"subject": "refund_requested_subject", "footer": "footer_notification"},
+    "refund_approved": {"subject": "refund_approved_subject", "footer": "footer_thanks"},
+    "refund_rejected": {"subject": "refund_rejected_subject", "footer": "footer_notification"},
+}
+
+STRINGS = {
+    "en": {
+        "greeting": "Hi {name},", "greeting_plain": "Hi there,", "money": "€{amount}", "decimal": ".",
+        "new_message_subject": "New Message from {client_name} - DocPortal",
+        "new_message_intro": "You have received a new message from {client}:",
+        "new_message_cta": "Log in to DocPortal to view and respond to this message.",
+        "message_digest_subject": "{message_count} New Messages from {client_name} - DocPortal",
+        "message_digest_intro": "You have received {count} new messages from {client}:",
+        "message_digest_more": "…and {count} more",
+        "reminder_subject": "Reminder: Your appointment tomorrow - {appointment_type}",
+        "reminder_intro": "This is a friendly reminder about your upcoming appointment {tomorrow}.",
+        "tomorrow": "tomorrow", "appointment_details": "Appointment Details", "type": "Type", "date": "Date",
+        "time": "Time", "provider": "Provider", "video_consultation": "Video Consultation",
+        "join_video_call": "Join Video Call", "tips_title": "Tips for your appointment",
+        "tips": [
+            "Be ready 5 minutes before your scheduled time",
+            "Have a stable internet connection for video calls",
+            "Prepare any questions you want to discuss"
+        ],
+        "refund_requested_subject": "New Refund Request from {client_name} - DocPortal",
+        "refund_requested_intro": "{client} has requested a refund for their appointment.",
+        "date_at_time": "{date} at {time}", "amount": "Amount", "patient_reason": "Patient's Reason",
+        "refund_requested_cta": "Please log in to DocPortal to review and process this refund request.",
+        "refund_approved_subject": "Your Refund Has Been Approved - DocPortal",
+        "refund_approved_intro": "Good news! Your refund request has been {approved}.",
+        "approved": "approved", "refund_details": "Refund Details", "appointment": "Appointment",
+        "refund_amount": "Refund Amount", "provider_note": "Provider's Note",
+        "refund_approved_info": "The refund will be processed to your original payment method within 5-10 business days.",
+        "refund_rejected_subject": "Update on Your Refund Request - DocPortal",
+        "refund_rejected_intro": "We regret to inform you that your refund request has been {declined}.",
+        "declined": "declined", "request_details": "Request Details", "provider_response": "Provider's Response",
+        "no_additional_info": "No additional information provided.",
+        "refund_rejected_info": "If you have questions about this decision, please contact your healthcare provider directly through DocPortal messaging.",
+        "footer_notification": ["This is an automated notification from DocPortal.", "Please do not reply directly to this email."],
+        "footer_reminder": ["Need to reschedule? Log in to DocPortal to manage your appointment.", "This is an automated reminder."],
+        "footer_thanks": ["Thank you for using DocPortal.", "This is an automated notification."]
+    },
+    "sl": {
+        "greeting": "Pozdravljeni, {name},", "greeting_plain": "Pozdravljeni,", "money": "{amount} €", "decimal": ",",
+        "new_message_subject": "Novo sporočilo od {client_name} - DocPortal",
+        "new_message_intro": "Prejeli ste novo sporočilo od {client}:",
+        "new_message_cta": "Prijavite se v DocPortal, da si ogledate sporočilo in nanj odgovorite.",
+        "message_digest_subject": "Nova sporočila ({message_count}) od {client_name} - DocPortal",
+        "message_digest_intro": "Prejeli ste nova sporočila ({count}) od {client}:",
+        "message_digest_more": "… in še {count}",
+        "reminder_subject": "Opomnik: vaš termin jutri - {appointment_type}",
+        "reminder_intro": "Prijazno vas opominjamo na vaš termin, ki bo {tomorrow}.",
+        "tomorrow": "jutri", "appointment_details": "Podrobnosti termina", "type": "Vrsta", "date": "Datum",
+        "time": "Ura", "provider": "Izvajalec", "video_consultation": "Video posvet",
+        "join_video_call": "Pridruži se videoklicu", "tips_title": "Nasveti za vaš termin",
+        "tips": [
+            "Bodite pripravljeni 5 minut pred dogovorjeno uro",
+            "Za videoklic poskrbite za stabilno internetno povezavo",
+            "Pripravite vprašanja, ki jih želite pogovoriti"
+        ],
+        "refund_requested_subject": "Nova zahteva za vračilo od {client_name} - DocPortal",
+        "refund_requested_intro": "{client} je zahteval(a) vračilo za svoj termin.",
+        "date_at_time": "{date} ob {time}", "amount": "Znesek", "patient_reason": "Razlog pacienta",
+        "refund_requested_cta": "Prijavite se v DocPortal, da pregledate in obdelate to zahtevo za vračilo.",
+        "refund_approved_subject": "Vaše vračilo je odobreno - DocPortal",
+        "refund_approved_intro": "Dobra novica! Vaša zahteva za vračilo je bila {approved}.",
+        "approved": "odobrena", "refund_details": "Podrobnosti vračila", "appointment": "Termin",
+        "refund_amount": "Znesek vračila", "provider_note": "Opomba izvajalca",
+        "refund_approved_info": "Vračilo bo v 5-10 delovnih dneh nakazano na vaše prvotno plačilno sredstvo.",
+        "refund_rejected_subject": "Novice o vaši zahtevi za vračilo - DocPortal",
+        "refund_rejected_intro": "Žal vas obveščamo, da je bila vaša zahteva za vračilo {declined}.",
+        "declined": "zavrnjena", "request_details": "Podrobnosti zahteve", "provider_response": "Odgovor izvajalca",
+        "no_additional_info": "Dodatne informacije niso bile podane.",
+        "refund_rejected_info": "Če imate vprašanja glede te odločitve, se obrnite neposredno na svojega izvajalca prek sporočil v DocPortalu.",
+        "footer_notification": ["To je samodejno obvestilo storitve DocPortal.", "Prosimo, ne odgovarjajte neposredno na to e-pošto."],
+        "footer_reminder": ["Želite spremeniti termin? Prijavite se v DocPortal in uredite svoj termin.", "To je samodejni opomnik."],
+        "footer_thanks": ["Hvala, ker uporabljate DocPortal.", "To je samodejno obvestilo."]
+    },
+    "de": {
+        "greeting": "Hallo {name},", "greeting_plain": "Guten Tag,", "money": "{amount} €", "decimal": ",",
+        "new_message_subject": "Neue Nachricht von {client_name} - DocPortal",
+        "new_message_intro": "Sie haben eine neue Nachricht von {client} erhalten:",
+        "new_message_cta": "Melden Sie sich bei DocPortal an, um die Nachricht zu lesen und zu beantworten.",
+        "message_digest_subject": "{message_count} neue Nachrichten von {client_name} - DocPortal",
+        "message_digest_intro": "Sie haben {count} neue Nachrichten von {client} erhalten:",
+        "message_digest_more": "… und {count} weitere",
+        "reminder_subject": "Erinnerung: Ihr Termin morgen - {appointment_type}",
+        "reminder_intro": "Wir möchten Sie freundlich an Ihren Termin {tomorrow} erinnern.",
+        "tomorrow": "morgen", "appointment_details": "Termindetails", "type": "Art", "date": "Datum",
+        "time": "Uhrzeit", "provider": "Behandler", "video_consultation": "Videosprechstunde",
+        "join_video_call": "Videoanruf beitreten", "tips_title": "Tipps für Ihren Termin",
+        "tips": [
+            "Seien Sie 5 Minuten vor dem vereinbarten Zeitpunkt bereit",
+            "Sorgen Sie für eine stabile Internetverbindung bei Videoanrufen",
+            "Bereiten Sie Ihre Fragen vor"
+        ],
+        "refund_requested_subject": "Neue Rückerstattungsanfrage von {client_name} - DocPortal",
+        "refund_requested_intro": "{client} hat eine Rückerstattung für einen Termin beantragt.",
+        "date_at_time": "{date} um {time}", "amount": "Betrag", "patient_reason": "Begründung des Patienten",
+        "refund_requested_cta": "Bitte melden Sie sich bei DocPortal an, um diese Rückerstattungsanfrage zu prüfen und zu bearbeiten.",
+        "refund_approved_subject": "Ihre Rückerstattung wurde genehmigt - DocPortal",
+        "refund_approved_intro": "Gute Nachrichten! Ihre Rückerstattungsanfrage wurde {approved}.",
+        "approved": "genehmigt", "refund_details": "Rückerstattungsdetails", "appointment": "Termin",
+        "refund_amount": "Rückerstattungsbetrag", "provider_note": "Anmerkung des Behandlers",
+        "refund_approved_info": "Die Rückerstattung erfolgt innerhalb von 5-10 Werktagen auf Ihre ursprüngliche Zahlungsmethode.",
+        "refund_rejected_subject": "Neuigkeiten zu Ihrer Rückerstattungsanfrage - DocPortal",
+        "refund_rejected_intro": "Leider müssen wir Ihnen mitteilen, dass Ihre Rückerstattungsanfrage {declined} wurde.",
+        "declined": "abgelehnt", "request_details": "Anfragedetails", "provider_response": "Antwort des Behandlers",
+        "no_additional_info": "Keine weiteren Informationen angegeben.",
+        "refund_rejected_info": "Bei Fragen zu dieser Entscheidung wenden Sie sich bitte direkt über die DocPortal-Nachrichten an Ihren Behandler.",
+        "footer_notification": ["Dies ist eine automatische Benachrichtigung von DocPortal.", "Bitte antworten Sie nicht direkt auf diese E-Mail."],
+        "footer_reminder": ["Termin verschieben? Melden Sie sich bei DocPortal an, um Ihren Termin zu verwalten.", "Dies ist eine automatische Erinnerung."],
+        "footer_thanks": ["Vielen Dank, dass Sie DocPortal nutzen.", "Dies ist eine automatische Benachrichtigung."]
+    },
+    "fr": {
+        "greeting": "Bonjour {name},", "greeting_plain": "Bonjour,", "money": "{amount} €", "decimal": ",",
+        "new_message_subject": "Nouveau message de {client_name} - DocPortal",
+        "new_message_intro": "Vous avez reçu un nouveau message de {client} :",
+        "new_message_cta": "Connectez-vous à DocPortal pour lire ce message et y répondre.",
+        "message_digest_subject": "{message_count} nouveaux messages de {client_name} - DocPortal",
+        "message_digest_intro": "Vous avez reçu {count} nouveaux messages de {client} :",
+        "message_digest_more": "… et {count} de plus",
+        "reminder_subject": "Rappel : votre rendez-vous de demain - {appointment_type}",
+        "reminder_intro": "Nous vous rappelons votre rendez-vous prévu {tomorrow}.",
+        "tomorrow": "demain", "appointment_details": "Détails du rendez-vous", "type": "Type", "date": "Date",
+        "time": "Heure", "provider": "Praticien", "video_consultation": "Téléconsultation",
+        "join_video_call": "Rejoindre l'appel vidéo", "tips_title": "Conseils pour votre rendez-vous",
+        "tips": [
+            "Soyez prêt(e) 5 minutes avant l'heure prévue",
+            "Assurez-vous d'avoir une connexion internet stable pour les appels vidéo",
+            "Préparez les questions que vous souhaitez aborder"
+        ],
+        "refund_requested_subject": "Nouvelle demande de remboursement de {client_name} - DocPortal",
+        "refund_requested_intro": "{client} a demandé le remboursement de son rendez-vous.",
+        "date_at_time": "{date} à {time}", "amount": "Montant", "patient_reason": "Motif du patient",
+        "refund_requested_cta": "Connectez-vous à DocPortal pour examiner et traiter cette demande de remboursement.",
+        "refund_approved_subject": "Votre remboursement a été approuvé - DocPortal",
+        "refund_approved_intro": "Bonne nouvelle ! Votre demande de remboursement a été {approved}.",
+        "approved": "approuvée", "refund_details": "Détails du remboursement", "appointment": "Rendez-vous",
+        "refund_amount": "Montant remboursé", "provider_note": "Note du praticien",
+        "refund_approved_info": "Le remboursement sera effectué sur votre moyen de paiement d'origine sous 5 à 10 jours ouvrés.",
+        "refund_rejected_subject": "Suivi de votre demande de remboursement - DocPortal",
+        "refund_rejected_intro": "Nous avons le regret de vous informer que votre demande de remboursement a été {declined}.",
+        "declined": "refusée", "request_details": "Détails de la demande", "provider_response": "Réponse du praticien",
+        "no_additional_info": "Aucune information supplémentaire fournie.",
+        "refund_rejected_info": "Pour toute question sur cette décision, contactez directement votre praticien via la messagerie DocPortal.",
+        "footer_notification": ["Ceci est une notification automatique de DocPortal.", "Merci de ne pas répondre directement à cet e-mail."],
+        "footer_reminder": ["Besoin de décaler ? Connectez-vous à DocPortal pour gérer votre rendez-vous.", "Ceci est un rappel automatique."],
+        "footer_thanks": ["Merci d'utiliser DocPortal.", "Ceci est une notification automatique."]
+    },
+    "es": {
+        "greeting": "Hola {name},", "greeting_plain": "Hola,", "money": "{amount} €", "decimal": ",",
+        "new_message_subject": "Nuevo mensaje de {client_name} - DocPortal",
+        "new_message_intro": "Ha recibido un nuevo mensaje de {client}:",
+        "new_message_cta": "Inicie sesión en DocPortal para ver y responder a este mensaje.",
+        "message_digest_subject": "{message_count} mensajes nuevos de {client_name} - DocPortal",
+        "message_digest_intro": "Ha recibido {count} mensajes nuevos de {client}:",
+        "message_digest_more": "… y {count} más",
+        "reminder_subject": "Recordatorio: su cita de mañana - {appointment_type}",
+        "reminder_intro": "Le recordamos amablemente su próxima cita, que es {tomorrow}.",
+        "tomorrow": "mañana", "appointment_details": "Detalles de la cita", "type": "Tipo", "date": "Fecha",
+        "time": "Hora", "provider": "Profesional", "video_consultation": "Videoconsulta",
+        "join_video_call": "Unirse a la videollamada", "tips_title": "Consejos para su cita",
+        "tips": [
+            "Esté listo 5 minutos antes de la hora programada",
+            "Tenga una conexión a internet estable para las videollamadas",
+            "Prepare las preguntas que desee tratar"
+        ],
+        "refund_requested_subject": "Nueva solicitud de reembolso de {client_name} - DocPortal",
+        "refund_requested_intro": "{client} ha solicitado un reembolso de su cita.",
+        "date_at_time": "{date} a las {time}", "amount": "Importe", "patient_reason": "Motivo del paciente",
+        "refund_requested_cta": "Inicie sesión en DocPortal para revisar y tramitar esta solicitud de reembolso.",
+        "refund_approved_subject": "Su reembolso ha sido aprobado - DocPortal",
+        "refund_approved_intro": "¡Buenas noticias! Su solicitud de reembolso ha sido {approved}.",
+        "approved": "aprobada", "refund_details": "Detalles del reembolso", "appointment": "Cita",
+        "refund_amount": "Importe del reembolso", "provider_note": "Nota del profesional",
+        "refund_approved_info": "El reembolso se abonará en su método de pago original en un plazo de 5 a 10 días hábiles.",
+        "refund_rejected_subject": "Novedades sobre su solicitud de reembolso - DocPortal",
+        "refund_rejected_intro": "Lamentamos informarle de que su solicitud de reembolso ha sido {declined}.",
+        "declined": "rechazada", "request_details": "Detalles de la solicitud", "provider_response": "Respuesta del profesional",
+        "no_additional_info": "No se ha proporcionado información adicional.",
+        "refund_rejected_info": "Si tiene preguntas sobre esta decisión, contacte directamente con su profesional a través de la mensajería de DocPortal.",
+        "footer_notification": ["Esta es una notificación automática de DocPortal.", "Por favor, no responda directamente a este correo."],
+        "footer_reminder": ["¿Necesita cambiar la cita? Inicie sesión en DocPortal para gestionarla.", "Este es un recordatorio automático."],
+        "footer_thanks": ["Gracias por usar DocPortal.", "Esta es una notificación automática."]
+    },
+    "it": {
+        "greeting": "Ciao {name},", "greeting_plain": "Salve,", "money": "{amount} €", "decimal": ",",
+        "new_message_subject": "Nuovo messaggio da {client_name} - DocPortal",
+        "new_message_intro": "Hai ricevuto un nuovo messaggio da {client}:",
+        "new_message_cta": "Accedi a DocPortal per leggere e rispondere a questo messaggio.",
+        "message_digest_subject": "{message_count} nuovi messaggi da {client_name} - DocPortal",
+        "message_digest_intro": "Hai ricevuto {count} nuovi messaggi da {client}:",
+        "message_digest_more": "… e altri {count}",
+        "reminder_subject": "Promemoria: il tuo appuntamento di domani - {appointment_type}",
+        "reminder_intro": "Ti ricordiamo il tuo prossimo appuntamento, previsto per {tomorrow}.",
+        "tomorrow": "domani", "appointment_details": "Dettagli dell'appuntamento", "type": "Tipo", "date": "Data",
+        "time": "Ora", "provider": "Professionista", "video_consultation": "Videoconsulto",
+        "join_video_call": "Partecipa alla videochiamata", "tips_title": "Consigli per il tuo appuntamento",
+        "tips": [
+            "Sii pronto 5 minuti prima dell'orario previsto",
+            "Assicurati di avere una connessione internet stabile per le videochiamate",
+            "Prepara le domande che vuoi discutere"
+        ],
+        "refund_requested_subject": "Nuova richiesta di rimborso da {client_name} - DocPortal",
+        "refund_requested_intro": "{client} ha richiesto un rimborso per il proprio appuntamento.",
+        "date_at_time": "{date} alle {time}", "amount": "Importo", "patient_reason": "Motivazione del paziente",
+        "refund_requested_cta": "Accedi a DocPortal per esaminare ed elaborare questa richiesta di rimborso.",
+        "refund_approved_subject": "Il tuo rimborso è stato approvato - DocPortal",
+        "refund_approved_intro": "Buone notizie! La tua richiesta di rimborso è stata {approved}.",
+        "approved": "approvata", "refund_details": "Dettagli del rimborso", "appointment": "Appuntamento",
+        "refund_amount": "Importo rimborsato", "provider_note": "Nota del professionista",
+        "refund_approved_info": "Il rimborso verrà accreditato sul metodo di pagamento originale entro 5-10 giorni lavorativi.",
+        "refund_rejected_subject": "Aggiornamento sulla tua richiesta di rimborso - DocPortal",
+        "refund_rejected_intro": "Siamo spiacenti di informarti che la tua richiesta di rimborso è stata {declined}.",
+        "declined": "respinta", "request_details": "Dettagli della richiesta", "provider_response": "Risposta del professionista",
+        "no_additional_info": "Nessuna informazione aggiuntiva fornita.",
+        "refund_rejected_info": "Per domande su questa decisione, contatta direttamente il tuo professionista tramite i messaggi di DocPortal.",
+        "footer_notification": ["Questa è una notifica automatica di DocPortal.", "Non rispondere direttamente a questa email."],
+        "footer_reminder": ["Devi spostare l'appuntamento? Accedi a DocPortal per gestirlo.", "Questo è un promemoria automatico."],
+        "footer_thanks": ["Grazie per aver scelto DocPortal.", "Questa è una notifica automatica."]
+    },
+    "pt": {
+        "greeting": "Olá {name},", "greeting_plain": "Olá,", "money": "{amount} €", "decimal": ",",
+        "new_message_subject": "Nova mensagem de {client_name} - DocPortal",
+        "new_message_intro": "Recebeu uma nova mensagem de {client}:",
+        "new_message_cta": "Inicie sessão no DocPortal para ver e responder a esta mensagem.",
+        "message_digest_subject": "{message_count} novas mensagens de {client_name} - DocPortal",
+        "message_digest_intro": "Recebeu {count} novas mensagens de {client}:",
+        "message_digest_more": "… e mais {count}",
+        "reminder_subject": "Lembrete: a sua consulta de amanhã - {appointment_type}",
+        "reminder_intro": "Lembramos que a sua próxima consulta é {tomorrow}.",
+        "tomorrow": "amanhã", "appointment_details": "Detalhes da consulta", "type": "Tipo", "date": "Data",
+        "time": "Hora", "provider": "Profissional", "video_consultation": "Videoconsulta",
+        "join_video_call": "Entrar na videochamada", "tips_title": "Dicas para a sua consulta",
+        "tips": [
+            "Esteja pronto 5 minutos antes da hora marcada",
+            "Tenha uma ligação à internet estável para videochamadas",
+            "Prepare as perguntas que pretende discutir"
+        ],
+        "refund_requested_subject": "Novo pedido de reembolso de {client_name} - DocPortal",
+        "refund_requested_intro": "{client} pediu o reembolso da sua consulta.",
+        "date_at_time": "{date} às {time}", "amount": "Valor", "patient_reason": "Motivo do paciente",
+        "refund_requested_cta": "Inicie sessão no DocPortal para analisar e processar este pedido de reembolso.",
+        "refund_approved_subject": "O seu reembolso foi aprovado - DocPortal",
+        "refund_approved_intro": "Boas notícias! O seu pedido de reembolso foi {approved}.",
+        "approved": "aprovado", "refund_details": "Detalhes do reembolso", "appointment": "Consulta",
+        "refund_amount": "Valor do reembolso", "provider_note": "Nota do profissional",
+        "refund_approved_info": "O reembolso será processado para o seu método de pagamento original no prazo de 5 a 10 dias úteis.",
+        "refund_rejected_subject": "Atualização sobre o seu pedido de reembolso - DocPortal",
+        "refund_rejected_intro": "Lamentamos informar que o seu pedido de reembolso foi {declined}.",
+        "declined": "recusado", "request_details": "Detalhes do pedido", "provider_response": "Resposta do profissional",
+        "no_additional_info": "Não foram fornecidas informações adicionais.",
+        "refund_rejected_info": "Se tiver dúvidas sobre esta decisão, contacte diretamente o seu profissional através das mensagens do DocPortal.",
+        "footer_notification": ["Esta é uma notificação automática do DocPortal.", "Por favor, não responda diretamente a este email."],
+        "footer_reminder": ["Precisa de reagendar? Inicie sessão no DocPortal para gerir a sua consulta.", "Este é um lembrete automático."],
+        "footer_thanks": ["Obrigado por utilizar o DocPortal.", "Esta é uma notificação automática."]
+    },
+    "nl": {
+        "greeting": "Hallo {name},", "greeting_plain": "Beste,", "money": "€ {amount}", "decimal": ",",
+        "new_message_subject": "Nieuw bericht van {client_name} - DocPortal",
+        "new_message_intro": "U heeft een nieuw bericht ontvangen van {client}:",
+        "new_message_cta": "Log in op DocPortal om dit bericht te bekijken en te beantwoorden.",
+        "message_digest_subject": "{message_count} nieuwe berichten van {client_name} - DocPortal",
+        "message_digest_intro": "U heeft {count} nieuwe berichten ontvangen van {client}:",
+        "message_digest_more": "… en nog {count}",
+        "reminder_subject": "Herinnering: uw afspraak morgen - {appointment_type}",
+        "reminder_intro": "Dit is een vriendelijke herinnering aan uw afspraak van {tomorrow}.",
+        "tomorrow": "morgen", "appointment_details": "Afspraakgegevens", "type": "Soort", "date": "Datum",
+        "time": "Tijd", "provider": "Zorgverlener", "video_consultation": "Videoconsult",
+        "join_video_call": "Deelnemen aan videogesprek", "tips_title": "Tips voor uw afspraak",
+        "tips": [
+            "Zorg dat u 5 minuten voor de afgesproken tijd klaar bent",
+            "Zorg voor een stabiele internetverbinding bij videogesprekken",
+            "Bereid de vragen voor die u wilt bespreken"
+        ],
+        "refund_requested_subject": "Nieuw terugbetalingsverzoek van {client_name} - DocPortal",
+        "refund_requested_intro": "{client} heeft terugbetaling voor een afspraak aangevraagd.",
+        "date_at_time": "{date} om {time}", "amount": "Bedrag", "patient_reason": "Reden van de patiënt",
+        "refund_requested_cta": "Log in op DocPortal om dit terugbetalingsverzoek te beoordelen en af te handelen.",
+        "refund_approved_subject": "Uw terugbetaling is goedgekeurd - DocPortal",
+        "refund_approved_intro": "Goed nieuws! Uw terugbetalingsverzoek is {approved}.",
+        "approved": "goedgekeurd", "refund_details": "Terugbetalingsgegevens", "appointment": "Afspraak",
+        "refund_amount": "Terug te betalen bedrag", "provider_note": "Opmerking van de zorgverlener",
+        "refund_approved_info": "De terugbetaling wordt binnen 5-10 werkdagen op uw oorspronkelijke betaalmethode verwerkt.",
+        "refund_rejected_subject": "Update over uw terugbetalingsverzoek - DocPortal",
+        "refund_rejected_intro": "Helaas moeten wij u laten weten dat uw terugbetalingsverzoek is {declined}.",
+        "declined": "afgewezen", "request_details": "Gegevens van het verzoek", "provider_response": "Reactie van de zorgverlener",
+        "no_additional_info": "Geen aanvullende informatie opgegeven.",
+        "refund_rejected_info": "Heeft u vragen over deze beslissing? Neem dan rechtstreeks contact op met uw zorgverlener via de berichten in DocPortal.",
+        "footer_notification": ["Dit is een automatische melding van DocPortal.", "Beantwoord deze e-mail alstublieft niet rechtstreeks."],
+        "footer_reminder": ["Afspraak verzetten? Log in op DocPortal om uw afspraak te beheren.", "Dit is een automatische herinnering."],
+        "footer_thanks": ["Bedankt voor het gebruik van DocPortal.", "Dit is een automatische melding."]
+    }
+}
+
+# Stands in for the body while the layout is rendered, then split on
+_CONTENT_MARKER = "<!--email-content-->"
+
+
+def _fmt(text: str, **values) -> Markup:
+    """Fill a trusted localized string; values are escaped unless already markup"""
+    return Markup(text).format(**values)
+
+
+def _strong(text: str, color: str = None) -> Markup:
+    if color:
+        return Markup('<strong style="color: {};">{}</strong>').format(color, text)
+    return Markup("<strong>{}</strong>").format(text)
+
+
+def _money(amount: float, strings: dict) -> str:
+    return strings["money"].format(amount=f"{amount:.2f}".replace(".", strings["decimal"]))
+
+
+def _create_environment() -> Environment:
+    env = Environment(
+        loader=FileSystemLoader(str(TEMPLATE_DIR)),
+        autoescape=select_autoescape(["html"]),
+        undefined=StrictUndefined,
+        auto_reload=False,
+        trim_blocks=True,
+        lstrip_blocks=True
+    )
+    env.filters["fmt"] = _fmt
+    env.filters["money"] = _money
+    env.globals["strong"] = _strong
+    return env
+
+
+_env = _create_environment()
+LAYOUT = _env.get_template("layout.html")
+TEMPLATES = {name: _env.get_template(f"{name}.html") for name in EMAILS}
+
+
+def resolve_locale(locale: str = None) -> str:
+    """Supported locale for a language code such as "de" or "de-AT" (English otherwise)"""
+    language = (locale or "").split("-")[0].split("_")[0].lower()
+    return language if language in STRINGS else DEFAULT_LOCALE
+
+
+@lru_cache(maxsize=None)
+def _layout(locale: str, footer: str) -> Tuple[str, str]:
+    """The layout HTML before and after the body, rendered once per (locale, footer)"""
+    html = LAYOUT.render(locale=locale, t=STRINGS[locale], footer=footer, content=Markup(_CONTENT_MARKER))
+    head, tail = html.split(_CONTENT_MARKER)
+    return head, tail
+
+
+def render_email(name: str, locale: str = None, recipient_name: str = None, **context) -> Tuple[str, str]:
+    """
+    Render one of the EMAILS templates. Returns (subject, html).
+
+    recipient_name is used for the greeting; context holds the template's
+    own values (client_name, appointment_type, amount, ...).
+    """
+    locale = resolve_locale(locale)
+    strings = STRINGS[locale]
+    spec = EMAILS[name]
+
+    if recipient_name and recipient_name.strip():
+        greeting = _fmt(strings["greeting"], name=recipient_name.split()[0])
+    else:
+        greeting = strings["greeting_plain"]
+    body = TEMPLATES[name].render(t=strings, greeting=greeting, **context)
+    head, tail = _layout(locale, spec["footer"])
+
+    subject = strings[spec["subject"]].format(**context)
+    return subject, head + body + tail
@@ -0,0 +1,150 @@
+"""
+Interval tree over half-open [start, end) integer intervals.
+
+The tree is an augmented balanced binary search tree keyed by start: each
+node stores one interval plus the largest end in its subtree, so an
+overlap query skips every subtree that ends before the query starts and
+every right subtree that starts after it ends. Building from n intervals
+is O(n log n); a query costs O(log n + k) for k results. Inserts keep the
+tree balanced as a treap (random priorities, rotations on insert).
+"""
+
+import random
+from typing import Any, Iterable, List, Optional, Tuple
+
+Interval = Tuple[int, int, Any]
+
+
+class _Node:
+    __slots__ = ("start", "end", "data", "max_end", "priority", "left", "right")
+
+    def __init__(self, start: int, end: int, data: Any, priority: float):
+        self.start = start
+        self.end = end
+        self.data = data
+        self.max_end = end
+        self.priority = priority
+        self.left: Optional["_Node"] = None
+        self.right: Optional["_Node"] = None
+
+    def update(self):
+        self.max_end = self.end
+        if self.left and self.left.max_end > self.max_end:
+            self.max_end = self.left.max_end
+        if self.right and self.right.max_end > self.max_end:
+            self.max_end = self.right.max_end
+
+
+class IntervalTree:
+    def __init__(self, intervals: Iterable[Interval] = ()):
+        self._random = random.Random(0)
+        ordered = sorted((iv for iv in intervals if iv[1] > iv[0]), key=lambda iv: iv[0])
+        self._root = self._build(ordered, 0, len(ordered))
+        self._size = len(ordered)
+
+        # Hand out random priorities in level order, largest first, so the
+        # balanced tree is a valid treap and later inserts stay balanced
+        priorities = sorted((self._random.random() for _ in range(self._size)), reverse=True)
+        level = [self._root] if self._root else []
+        index = 0
+        while level:
+            next_level = []
+            for node in level:
+                node.priority = priorities[index]
+                index += 1
+                next_level.extend(child for child in (node.left, node.right) if child)
+            level = next_level
+
+    def _build(self, ordered: List[Interval], lo: int, hi: int) -> Optional[_Node]:
+        if lo >= hi:
+            return None
+        mid = (lo + hi) // 2
+        start, end, data = ordered[mid]
+        node = _Node(start, end, data, 0.0)
+        node.left = self._build(ordered, lo, mid)
+        node.right = self._build(ordered, mid + 1, hi)
+        node.update()
+        return node
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, start: int, end: int, data: Any = None):
+        """Insert [start, end); empty intervals are ignored"""
+        if end <= start:
+            return
+        self._root = self._insert(self._root, _Node(start, end, data, self._random.random()))
+        self._size += 1
+
+    def _insert(self, node: Optional[_Node], new: _Node) -> _Node:
+        if node is None:
+            return new
+        if new.start < node.start:
+            node.left = self._insert(node.left, new)
+            if node.left.priority > node.priority:
+                node = self._rotate_right(node)
+        else:
+            node.right = self._insert(node.right, new)
+            if node.right.priority > node.priority:
+                node = self._rotate_left(node)
+        node.update()
+        return node
+
+    @staticmethod
+    def _rotate_right(node: _Node) -> _Node:
+        pivot = node.left
+        node.left = pivot.right
+        pivot.right = node
+        node.update()
+        pivot.update()
+        return pivot
+
+    @staticmethod
+    def _rotate_left(node: _Node) -> _Node:
+        pivot = node.right
+        node.right = pivot.left
+        pivot.left = node
+        node.update()
+        pivot.update()
+        return pivot
+
+    def overlapping(self, start: int, end: int) -> List[Interval]:
+        """All stored intervals that share at least one point with [start, end)"""
+        found = []
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if node is None or node.max_end <= start:
+                continue
+            stack.append(node.left)
+            if node.start < end:
+                if node.end > start:
+                    found.append((node.start, node.end, node.data))
+                stack.append(node.right)
+        found.sort(key=lambda iv: iv[0])
+        return found
+
+    def overlaps(self, start: int, end: int) -> bool:
+        """Whether any stored interval intersects [start, end)"""
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if node is None or node.max_end <= start:
+                continue
+            if node.start < end:
+                if node.end > start:
+                    return True
+                stack.append(node.right)
+            stack.append(node.left)
+        return False
+
+    def __iter__(self):
+        """Intervals in start order"""
+        stack, node = [], self._root
+        while stack or node:
+            while node:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            yield (node.start, node.end, node.data)
+            node = node.right
@@ -0,0 +1,98 @@
+"""
+Invoice PDF retrieval and bulk ZIP export.
+
+get_invoice_pdf serves a PDF from the disk cache or renders it in the
+worker pool. stream_invoice_zip turns a cursor of invoices into a ZIP
+byte stream: up to EXPORT_WINDOW PDFs render in parallel, and each one is
+written into the archive and sent as soon as it is next in order. Memory
+is bounded by the window, not by the number of invoices.
+"""
+
+import asyncio
+import zipfile
+from collections import deque
+from typing import Optional
+from database import UserLoader
+from services.invoice_pdf import get_invoice_number
+from services.pdf_cache import pdf_cache_key, get_cached_pdf, store_pdf
+from services.pdf_renderer import pdf_renderer
+from services.logo_store import get_settings_logo
+
+# Renders kept in flight while streaming a ZIP
+EXPORT_WINDOW = max(pdf_renderer.workers, 1) * 2
+
+
+async def get_invoice_pdf(invoice: dict, provider: dict, client: dict, provider_settings: dict,
+                          key: Optional[str] = None) -> bytes:
+    """Return the invoice PDF from the disk cache, rendering it on a miss"""
+    key = key or pdf_cache_key(invoice, provider, client, provider_settings)
+    content = await get_cached_pdf(key)
+    if content is None:
+        logo = await get_settings_logo(provider_settings or {})
+        content = await pdf_renderer.render(invoice, provider, client, provider_settings, logo)
+        await store_pdf(key, content)
+    return content
+
+
+class _ZipChunks:
+    """Write-only file object that hands out whatever was written so far"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _archive_name(invoice: dict, used: set) -> str:
+    base = f"invoice_{get_invoice_number(invoice)}".replace("/", "-")
+    name = f"{base}.pdf"
+    suffix = 2
+    while name in used:
+        name = f"{base}_{suffix}.pdf"
+        suffix += 1
+    used.add(name)
+    return name
+
+
+async def stream_invoice_zip(invoices, provider: dict, provider_settings: dict):
+    """Yield a ZIP archive of the PDFs of every invoice from an async cursor"""
+    # Own loader: the body is streamed after the request's loader scope ends
+    loader = UserLoader()
+    sink = _ZipChunks()
+    archive = zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED)
+    used_names = set()
+    pending = deque()
+
+    async def render(invoice: dict) -> bytes:
+        client = await loader.load(invoice["clientId"])
+        return await get_invoice_pdf(invoice, provider, client, provider_settings)
+
+    async def write_next():
+        invoice, task = pending.popleft()
+        content = await task
+        archive.writestr(_archive_name(invoice, used_names), content)
+        return sink.take()
+
+    try:
+        async for invoice in invoices:
+            pending.append((invoice, asyncio.create_task(render(invoice))))
+            if len(pending) >= EXPORT_WINDOW:
+                yield await write_next()
+        while pending:
+            yield await write_next()
+        archive.close()
+        yield sink.take()
+    finally:
+        # Client disconnected or a render failed: drop outstanding renders
+        for _, task in pending:
+            task.cancel()
@@ -0,0 +1,177 @@
+"""
+Invoice PDF rendering.
+
+Builds the EU/Slovenian compliant invoice document with ReportLab. The
+renderer is a plain synchronous function of the invoice, provider, client
+and provider settings, so it can run off the event loop and its output can
+be cached by the hash of those inputs (see services.pdf_cache). Styles,
+labels and the decoded logo come from the precompiled templates in
+services.invoice_templates.
+"""
+
+import io
+from datetime import datetime
+
+# PDF Generation
+try:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import mm
+    from reportlab.platypus import SimpleDocTemplate, Table, Paragraph, Spacer
+    from services.invoice_templates import get_invoice_template, get_logo_flowable
+    PDF_ENABLED = True
+except ImportError:
+    PDF_ENABLED = False
+
+
+def get_invoice_number(invoice: dict) -> str:
+    return invoice.get('invoiceNumber', f"INV-{invoice['_id'][:8].upper()}")
+
+
+def render_invoice_pdf(invoice: dict, provider: dict, client: dict, provider_settings: dict,
+                       logo: bytes = None) -> bytes:
+    """Render an invoice as PDF bytes (blocking; run it off the event loop)"""
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=A4,
+        rightMargin=20*mm,
+        leftMargin=20*mm,
+        topMargin=20*mm,
+        bottomMargin=20*mm
+    )
+
+    elements = []
+
+    # Settings with defaults
+    settings = provider_settings or {}
+    vat_rate = settings.get('vatRate', 22.0)  # Slovenia standard VAT
+
+    template = get_invoice_template(settings)
+    labels = template.labels
+    normal_style = template.normal_style
+    header_style = template.header_style
+    small_style = template.small_style
+
+    # Calculate amounts
+    gross_amount = invoice.get('amount', 0)
+    net_amount = gross_amount / (1 + vat_rate / 100)
+    vat_amount = gross_amount - net_amount
+
+    # ===== HEADER WITH LOGO =====
+    logo_image = get_logo_flowable(logo, settings.get('logoHash'))
+    if logo_image:
+        logo_image.hAlign = 'LEFT'
+        elements.append(logo_image)
+        elements.append(Spacer(1, 5*mm))
+
+    # Invoice title
+    elements.append(Paragraph(labels['title'], template.title_style))
+    elements.append(Spacer(1, 5*mm))
+
+    # ===== INVOICE INFO =====
+    invoice_number = get_invoice_number(invoice)
+    invoice_date = invoice.get('invoiceDate', invoice.get('createdAt', datetime.now()).strftime('%Y-%m-%d') if isinstance(invoice.get('createdAt'), datetime) else str(invoice.get('createdAt', '')))
+    due_date = invoice.get('dueDate', '')
+
+    invoice_info = f"""
+    <b>{labels['invoice_no']}:</b> {invoice_number}<br/>
+    <b>{labels['issue_date']}:</b> {invoice_date}<br/>
+    <b>{labels['due_date']}:</b> {due_date}<br/>
+    <b>{labels['place']}:</b> {settings.get('city', template.country)}
+    """
+    elements.append(Paragraph(invoice_info, normal_style))
+    elements.append(Spacer(1, 10*mm))
+
+    # ===== PROVIDER (ISSUER) INFO =====
+    elements.append(Paragraph(labels['issuer'], header_style))
+
+    provider_name = settings.get('businessName') or provider.get('name', 'Provider')
+    provider_info = f"""
+    <b>{provider_name}</b><br/>
+    {settings.get('businessAddress', '')}<br/>
+    {settings.get('postalCode', '')} {settings.get('city', '')}<br/>
+    {settings.get('country', template.country)}<br/><br/>
+    <b>{labels['tax_no']}:</b> {settings.get('taxNumber', 'N/A')}<br/>
+    <b>{labels['vat_id']}:</b> {settings.get('vatNumber', 'N/A')}<br/>
+    <b>{labels['reg_no']}:</b> {settings.get('registrationNumber', 'N/A')}<br/>
+    <b>Email:</b> {settings.get('businessEmail', provider.get('email', ''))}<br/>
+    <b>Tel:</b> {settings.get('businessPhone', provider.get('phone', ''))}
+    """
+    elements.append(Paragraph(provider_info, normal_style))
+    elements.append(Spacer(1, 10*mm))
+
+    # ===== CLIENT (RECIPIENT) INFO =====
+    elements.append(Paragraph(labels['recipient'], header_style))
+
+    client_name = client.get('name', 'Client') if client else 'Client'
+    client_info = f"""
+    <b>{client_name}</b><br/>
+    {client.get('address', '') if client else ''}<br/>
+    <b>Email:</b> {client.get('email', '') if client else ''}
+    """
+    elements.append(Paragraph(client_info, normal_style))
+    elements.append(Spacer(1, 10*mm))
+
+    # ===== SERVICE TABLE =====
+    elements.append(Paragraph(labels['services'], header_style))
+    elements.append(Spacer(1, 3*mm))
+
+    # Table header
+    table_data = [
+        [labels['description'], labels['qty'], labels['price'], labels['amount']]
+    ]
+
+    # Service row
+    description = invoice.get('description', 'Healthcare Service')
+    table_data.append([
+        description,
+        '1',
+        f'€{net_amount:.2f}',
+        f'€{net_amount:.2f}'
+    ])
+
+    # Subtotal, VAT, Total
+    table_data.append(['', '', f"{labels['net']}:", f'€{net_amount:.2f}'])
+    table_data.append(['', '', f"{labels['vat']} ({vat_rate}%):", f'€{vat_amount:.2f}'])
+    table_data.append(['', '', f"{labels['total']}:", f'€{gross_amount:.2f}'])
+
+    # Create table
+    table = Table(table_data, colWidths=[90*mm, 20*mm, 35*mm, 35*mm])
+    table.setStyle(template.table_style)
+
+    elements.append(table)
+    elements.append(Spacer(1, 15*mm))
+
+    # ===== PAYMENT DETAILS =====
+    elements.append(Paragraph(labels['payment_details'], header_style))
+
+    payment_info = f"""
+    <b>{labels['bank']}:</b> {settings.get('bankName', 'N/A')}<br/>
+    <b>IBAN:</b> {settings.get('iban', 'N/A')}<br/>
+    <b>BIC/SWIFT:</b> {settings.get('bic', 'N/A')}<br/>
+    <b>{labels['reference']}:</b> {invoice_number}<br/><br/>
+    <b>{labels['payment_terms']}:</b> {settings.get('defaultPaymentTermDays', 15)} {labels['days']}
+    """
+    elements.append(Paragraph(payment_info, normal_style))
+    elements.append(Spacer(1, 10*mm))
+
+    # ===== STATUS =====
+    paid = invoice.get('status', 'pending') == 'paid'
+    status_text = labels['paid'] if paid else labels['unpaid']
+    elements.append(Paragraph(status_text, template.status_styles[paid]))
+    elements.append(Spacer(1, 10*mm))
+
+    # ===== FOOTER =====
+    elements.append(Paragraph(labels['legal'], small_style))
+
+    if settings.get('website'):
+        elements.append(Paragraph(f"Web: {settings['website']}", small_style))
+
+    # Build PDF
+    doc.build(elements)
+
+    # Get PDF content
+    pdf_content = buffer.getvalue()
+    buffer.close()
+
+    return pdf_content
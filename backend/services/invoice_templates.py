@@ -0,0 +1,275 @@
+"""
+Precompiled invoice PDF templates.
+
+Paragraph and table styles depend only on the invoice language and accent
+colour, so each (language, colour) template is built once per process and
+reused for every PDF. Provider logos are decoded, downscaled to print
+resolution and cached by their content hash, so a logo is decoded once
+instead of on every render.
+
+Labels are printed in the provider's invoiceLanguage next to English (just
+English for "en"), matching the bilingual Slovenian layout.
+"""
+
+import hashlib
+import io
+import re
+from functools import lru_cache
+from typing import Optional
+from services.cache import TTLCache
+from services.invoice_validation import COUNTRY_CONFIGS, LANGUAGE_TO_COUNTRY
+
+try:
+    from reportlab.lib.units import mm
+    from reportlab.lib import colors
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.platypus import TableStyle, Image
+    from reportlab.lib.enums import TA_CENTER
+    PDF_ENABLED = True
+except ImportError:
+    PDF_ENABLED = False
+
+try:
+    from PIL import Image as PILImage
+    PIL_ENABLED = True
+except ImportError:
+    PIL_ENABLED = False
+
+DEFAULT_LANGUAGE = "sl"
+DEFAULT_COLOR = "#1e40af"
+COLOR_PATTERN = re.compile(r"^#[0-9a-fA-F]{6}$")
+
+# Logo box on the invoice and the resolution it is downscaled to
+LOGO_MAX_WIDTH_MM = 50
+LOGO_MAX_HEIGHT_MM = 25
+LOGO_DPI = 300
+
+logo_cache = TTLCache("invoice_logos", maxsize=256, ttl=3600)
+
+LABELS = {
+    "en": {
+        "title": "INVOICE", "invoice_no": "Invoice No", "issue_date": "Issue Date", "due_date": "Due Date",
+        "place": "Place", "issuer": "ISSUER", "recipient": "RECIPIENT", "tax_no": "Tax No",
+        "vat_id": "VAT ID", "reg_no": "Reg. No", "services": "SERVICES", "description": "Description",
+        "qty": "Qty", "price": "Price", "amount": "Amount", "net": "Net", "vat": "VAT", "total": "TOTAL",
+        "payment_details": "PAYMENT DETAILS", "bank": "Bank", "reference": "Reference",
+        "payment_terms": "Payment terms", "days": "days", "paid": "PAID", "unpaid": "UNPAID",
+        "legal": "This invoice is issued in accordance with the VAT legislation of {country}."
+    },
+    "sl": {
+        "title": "RAČUN", "invoice_no": "Številka računa", "issue_date": "Datum izdaje",
+        "due_date": "Datum zapadlosti", "place": "Kraj izdaje", "issuer": "IZDAJATELJ",
+        "recipient": "PREJEMNIK", "tax_no": "Davčna št.", "vat_id": "ID za DDV", "reg_no": "Matična št.",
+        "services": "STORITVE", "description": "Opis", "qty": "Kol.", "price": "Cena", "amount": "Znesek",
+        "net": "Osnova za DDV", "vat": "DDV", "total": "SKUPAJ", "payment_details": "PLAČILNI PODATKI",
+        "bank": "Banka", "reference": "Sklic", "payment_terms": "Rok plačila", "days": "dni",
+        "paid": "PLAČANO", "unpaid": "NEPLAČANO",
+        "legal": "Ta račun je izdan v skladu z Zakonom o davku na dodano vrednost (ZDDV-1)."
+    },
+    "de": {
+        "title": "RECHNUNG", "invoice_no": "Rechnungsnummer", "issue_date": "Rechnungsdatum",
+        "due_date": "Fälligkeitsdatum", "place": "Ort", "issuer": "RECHNUNGSSTELLER",
+        "recipient": "EMPFÄNGER", "tax_no": "Steuernummer", "vat_id": "USt-IdNr.", "reg_no": "HRB-Nr.",
+        "services": "LEISTUNGEN", "description": "Beschreibung", "qty": "Menge", "price": "Preis",
+        "amount": "Betrag", "net": "Netto", "vat": "USt.", "total": "GESAMT",
+        "payment_details": "ZAHLUNGSINFORMATIONEN", "bank": "Bank", "reference": "Verwendungszweck",
+        "payment_terms": "Zahlungsziel", "days": "Tage", "paid": "BEZAHLT", "unpaid": "UNBEZAHLT",
+        "legal": "Diese Rechnung wurde gemäß den geltenden Umsatzsteuervorschriften ausgestellt."
+    },
+    "fr": {
+        "title": "FACTURE", "invoice_no": "N° de facture", "issue_date": "Date d'émission",
+        "due_date": "Date d'échéance", "place": "Lieu", "issuer": "ÉMETTEUR", "recipient": "DESTINATAIRE",
+        "tax_no": "N° fiscal", "vat_id": "N° TVA", "reg_no": "N° d'immatriculation", "services": "PRESTATIONS",
+        "description": "Description", "qty": "Qté", "price": "Prix", "amount": "Montant", "net": "Total HT",
+        "vat": "TVA", "total": "TOTAL TTC", "payment_details": "COORDONNÉES BANCAIRES", "bank": "Banque",
+        "reference": "Référence", "payment_terms": "Délai de paiement", "days": "jours", "paid": "PAYÉE",
+        "unpaid": "NON PAYÉE",
+        "legal": "Facture émise conformément à la législation en vigueur sur la TVA."
+    },
+    "es": {
+        "title": "FACTURA", "invoice_no": "N.º de factura", "issue_date": "Fecha de emisión",
+        "due_date": "Fecha de vencimiento", "place": "Lugar", "issuer": "EMISOR", "recipient": "DESTINATARIO",
+        "tax_no": "NIF", "vat_id": "N.º IVA", "reg_no": "N.º de registro", "services": "SERVICIOS",
+        "description": "Descripción", "qty": "Cant.", "price": "Precio", "amount": "Importe",
+        "net": "Base imponible", "vat": "IVA", "total": "TOTAL", "payment_details": "DATOS DE PAGO",
+        "bank": "Banco", "reference": "Referencia", "payment_terms": "Plazo de pago", "days": "días",
+        "paid": "PAGADA", "unpaid": "PENDIENTE",
+        "legal": "Factura emitida conforme a la normativa vigente del IVA."
+    },
+    "it": {
+        "title": "FATTURA", "invoice_no": "N. fattura", "issue_date": "Data di emissione",
+        "due_date": "Data di scadenza", "place": "Luogo", "issuer": "EMITTENTE", "recipient": "DESTINATARIO",
+        "tax_no": "Codice fiscale", "vat_id": "Partita IVA", "reg_no": "N. REA", "services": "SERVIZI",
+        "description": "Descrizione", "qty": "Qtà", "price": "Prezzo", "amount": "Importo",
+        "net": "Imponibile", "vat": "IVA", "total": "TOTALE", "payment_details": "DATI DI PAGAMENTO",
+        "bank": "Banca", "reference": "Causale", "payment_terms": "Termini di pagamento", "days": "giorni",
+        "paid": "PAGATA", "unpaid": "NON PAGATA",
+        "legal": "Fattura emessa ai sensi della normativa IVA vigente."
+    },
+    "pt": {
+        "title": "FATURA", "invoice_no": "N.º da fatura", "issue_date": "Data de emissão",
+        "due_date": "Data de vencimento", "place": "Local", "issuer": "EMITENTE", "recipient": "DESTINATÁRIO",
+        "tax_no": "NIF", "vat_id": "N.º IVA", "reg_no": "N.º de registo", "services": "SERVIÇOS",
+        "description": "Descrição", "qty": "Qtd.", "price": "Preço", "amount": "Valor",
+        "net": "Base tributável", "vat": "IVA", "total": "TOTAL", "payment_details": "DADOS DE PAGAMENTO",
+        "bank": "Banco", "reference": "Referência", "payment_terms": "Prazo de pagamento", "days": "dias",
+        "paid": "PAGA", "unpaid": "POR PAGAR",
+        "legal": "Fatura emitida nos termos da legislação do IVA em vigor."
+    },
+    "nl": {
+        "title": "FACTUUR", "invoice_no": "Factuurnummer", "issue_date": "Factuurdatum",
+        "due_date": "Vervaldatum", "place": "Plaats", "issuer": "LEVERANCIER", "recipient": "AFNEMER",
+        "tax_no": "Fiscaal nummer", "vat_id": "Btw-nummer", "reg_no": "KvK-nummer", "services": "DIENSTEN",
+        "description": "Omschrijving", "qty": "Aantal", "price": "Prijs", "amount": "Bedrag", "net": "Netto",
+        "vat": "Btw", "total": "TOTAAL", "payment_details": "BETAALGEGEVENS", "bank": "Bank",
+        "reference": "Kenmerk", "payment_terms": "Betalingstermijn", "days": "dagen", "paid": "BETAALD",
+        "unpaid": "ONBETAALD",
+        "legal": "Deze factuur is opgesteld conform de geldende btw-wetgeving."
+    }
+}
+
+# English legal note where the country name doesn't read well in the template
+LEGAL_EN_OVERRIDES = {"sl": "This invoice is issued in accordance with Slovenian VAT legislation."}
+
+
+class InvoiceTemplate:
+    """Styles and labels for one (language, accent colour) invoice variant"""
+
+    def __init__(self, language: str, color: str):
+        self.language = language
+        self.country = COUNTRY_CONFIGS[LANGUAGE_TO_COUNTRY[language]]["name"]
+        self.labels = self._build_labels(language)
+
+        primary = colors.HexColor(color)
+        styles = getSampleStyleSheet()
+
+        self.title_style = ParagraphStyle(
+            'Title',
+            parent=styles['Heading1'],
+            fontSize=24,
+            spaceAfter=10,
+            textColor=primary
+        )
+        self.header_style = ParagraphStyle(
+            'Header',
+            parent=styles['Heading2'],
+            fontSize=12,
+            spaceAfter=5,
+            textColor=colors.HexColor('#374151')
+        )
+        self.normal_style = ParagraphStyle(
+            'Normal',
+            parent=styles['Normal'],
+            fontSize=10,
+            spaceAfter=3
+        )
+        self.small_style = ParagraphStyle(
+            'Small',
+            parent=styles['Normal'],
+            fontSize=8,
+            textColor=colors.HexColor('#6b7280')
+        )
+        self.status_styles = {
+            paid: ParagraphStyle(
+                'Status',
+                parent=styles['Heading2'],
+                fontSize=14,
+                textColor=colors.HexColor('#16a34a') if paid else colors.HexColor('#dc2626'),
+                alignment=TA_CENTER
+            )
+            for paid in (True, False)
+        }
+        self.table_style = TableStyle([
+            # Header row
+            ('BACKGROUND', (0, 0), (-1, 0), primary),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 10),
+            ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+
+            # Data rows
+            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 1), (-1, -1), 9),
+            ('ALIGN', (1, 1), (-1, -1), 'RIGHT'),
+
+            # Totals styling
+            ('FONTNAME', (2, -3), (-1, -1), 'Helvetica-Bold'),
+            ('BACKGROUND', (2, -1), (-1, -1), colors.HexColor('#dbeafe')),
+
+            # Grid
+            ('GRID', (0, 0), (-1, 1), 0.5, colors.HexColor('#d1d5db')),
+            ('LINEBELOW', (0, 0), (-1, 0), 1, primary),
+
+            # Padding
+            ('TOPPADDING', (0, 0), (-1, -1), 6),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+        ])
+
+    def _build_labels(self, language: str) -> dict:
+        english = dict(LABELS["en"])
+        english["legal"] = LEGAL_EN_OVERRIDES.get(language) or english["legal"].format(country=self.country)
+        if language == "en":
+            return english
+        local = LABELS[language]
+        labels = {key: f"{local[key]} / {english[key]}" for key in english}
+        labels["legal"] = f"{local['legal']} {english['legal']}"
+        return labels
+
+
+@lru_cache(maxsize=64)
+def _template(language: str, color: str) -> InvoiceTemplate:
+    return InvoiceTemplate(language, color)
+
+
+def get_invoice_template(settings: dict) -> InvoiceTemplate:
+    """The shared template for a provider's invoiceLanguage and invoiceColor"""
+    language = settings.get("invoiceLanguage") or DEFAULT_LANGUAGE
+    if language not in LABELS:
+        language = DEFAULT_LANGUAGE
+    color = settings.get("invoiceColor") or DEFAULT_COLOR
+    if not COLOR_PATTERN.match(color):
+        color = DEFAULT_COLOR
+    return _template(language, color.lower())
+
+
+def _prepare_logo(logo_bytes: bytes) -> Optional[tuple]:
+    """Downscale a logo to print size; returns (image bytes, width pt, height pt)"""
+    box_width, box_height = LOGO_MAX_WIDTH_MM * mm, LOGO_MAX_HEIGHT_MM * mm
+    if not PIL_ENABLED:
+        return logo_bytes, box_width, box_height
+
+    image = PILImage.open(io.BytesIO(logo_bytes))
+    image.load()
+    scale = min(box_width / image.width, box_height / image.height)
+    width, height = image.width * scale, image.height * scale
+
+    max_pixels = (
+        int(LOGO_MAX_WIDTH_MM / 25.4 * LOGO_DPI),
+        int(LOGO_MAX_HEIGHT_MM / 25.4 * LOGO_DPI)
+    )
+    image.thumbnail(max_pixels)
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA")
+    output = io.BytesIO()
+    image.save(output, format="PNG", optimize=True)
+    return output.getvalue(), width, height
+
+
+def get_logo_flowable(logo_bytes: Optional[bytes], logo_hash: Optional[str] = None):
+    """A ReportLab Image for the provider logo, or None if it can't be read"""
+    if not logo_bytes:
+        return None
+
+    key = logo_hash or hashlib.sha256(logo_bytes).hexdigest()
+    hit, prepared = logo_cache.get(key)
+    if not hit:
+        try:
+            prepared = _prepare_logo(logo_bytes)
+        except Exception:
+            prepared = None  # Skip logo if error
+        logo_cache.set(key, prepared)
+
+    if not prepared:
+        return None
+    image_bytes, width, height = prepared
+    return Image(io.BytesIO(image_bytes), width=width, height=height)
@@ -0,0 +1,172 @@
+"""
+Content-addressed provider logo storage.
+
+Logos used to be stored as base64 data URLs inside provider_settings, so
+every settings read, invoice preview and PDF render carried up to ~2.7 MB.
+They are now normalized at upload time (downscaled with Pillow and
+re-encoded as PNG) and stored once in the GridFS bucket "logos" under the
+SHA-256 of the normalized image. Settings keep only logoHash and a logoUrl
+pointing at GET /api/logo/{hash}, which can be cached forever because the
+content behind a hash never changes.
+"""
+
+import asyncio
+import base64
+import hashlib
+import io
+import logging
+from datetime import datetime, timezone
+from typing import Optional
+from gridfs import DEFAULT_CHUNK_SIZE
+from gridfs.errors import FileExists
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+from pymongo.errors import DuplicateKeyError
+from database import db, provider_settings_collection
+from services.cache import TTLCache
+
+try:
+    from PIL import Image as PILImage
+    PIL_ENABLED = True
+except ImportError:
+    PIL_ENABLED = False
+
+logger = logging.getLogger(__name__)
+
+LOGO_BUCKET = "logos"
+LOGO_CONTENT_TYPE = "image/png"
+
+# 50x25 mm on the invoice at 600 dpi, plenty for screens as well
+LOGO_MAX_SIZE = (1200, 600)
+
+logo_bucket = AsyncIOMotorGridFSBucket(db, bucket_name=LOGO_BUCKET)
+logo_files_collection = db[f"{LOGO_BUCKET}.files"]
+logo_chunks_collection = db[f"{LOGO_BUCKET}.chunks"]
+
+# Blobs are immutable, so cached copies never go stale
+logo_blob_cache = TTLCache("logo_blobs", maxsize=128, ttl=3600)
+
+
+class InvalidLogo(ValueError):
+    pass
+
+
+def logo_url(logo_hash: str) -> str:
+    return f"/api/logo/{logo_hash}"
+
+
+def normalize_logo(contents: bytes) -> bytes:
+    """Downscale an uploaded image to LOGO_MAX_SIZE and re-encode it as PNG"""
+    if not PIL_ENABLED:
+        raise InvalidLogo("Image processing is not available")
+    try:
+        image = PILImage.open(io.BytesIO(contents))
+        image.load()
+    except Exception:
+        raise InvalidLogo("File is not a valid image")
+
+    image.thumbnail(LOGO_MAX_SIZE)
+    has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+    image = image.convert("RGBA" if has_alpha else "RGB")
+
+    output = io.BytesIO()
+    image.save(output, format="PNG", optimize=True)
+    return output.getvalue()
+
+
+async def store_logo(contents: bytes) -> str:
+    """Normalize and store a logo; returns its content hash"""
+    normalized = await asyncio.to_thread(normalize_logo, contents)
+    logo_hash = hashlib.sha256(normalized).hexdigest()
+
+    if not await logo_files_collection.find_one({"_id": logo_hash}, {"_id": 1}):
+        try:
+            await logo_bucket.upload_from_stream_with_id(
+                logo_hash, f"{logo_hash}.png", normalized,
+                metadata={"contentType": LOGO_CONTENT_TYPE}
+            )
+        except (FileExists, DuplicateKeyError):
+            # A concurrent upload of the same image (e.g. every worker migrating
+            # a shared legacy logo) got there first
+            await _complete_upload(logo_hash, normalized)
+    logo_blob_cache.set(logo_hash, normalized)
+    return logo_hash
+
+
+async def _complete_upload(logo_hash: str, content: bytes):
+    """
+    Finish a logo whose upload raced another one.
+
+    Both uploads write the same chunks under the same files_id, so the
+    chunks already there belong to the other upload and must not be
+    deleted. Any chunk or files document still missing is written with
+    an upsert instead, which is safe to run from every racing upload.
+    """
+    chunk_count = max(1, -(-len(content) // DEFAULT_CHUNK_SIZE))
+    for n in range(chunk_count):
+        await logo_chunks_collection.update_one(
+            {"files_id": logo_hash, "n": n},
+            {"$setOnInsert": {"data": content[n * DEFAULT_CHUNK_SIZE:(n + 1) * DEFAULT_CHUNK_SIZE]}},
+            upsert=True
+        )
+    await logo_files_collection.update_one(
+        {"_id": logo_hash},
+        {"$setOnInsert": {
+            "length": len(content),
+            "chunkSize": DEFAULT_CHUNK_SIZE,
+            "uploadDate": datetime.now(timezone.utc),
+            "filename": f"{logo_hash}.png",
+            "metadata": {"contentType": LOGO_CONTENT_TYPE}
+        }},
+        upsert=True
+    )
+
+
+async def get_logo(logo_hash: str) -> Optional[bytes]:
+    """Read a logo blob by hash (None if it doesn't exist)"""
+    hit, content = logo_blob_cache.get(logo_hash)
+    if hit:
+        return content
+
+    if not await logo_files_collection.find_one({"_id": logo_hash}, {"_id": 1}):
+        return None
+    stream = await logo_bucket.open_download_stream(logo_hash)
+    content = await stream.read()
+    logo_blob_cache.set(logo_hash, content)
+    return content
+
+
+async def get_settings_logo(settings: dict) -> Optional[bytes]:
+    """The logo image of a provider's settings, if any"""
+    if settings.get("logoHash"):
+        return await get_logo(settings["logoHash"])
+
+    # Not yet migrated: legacy data URL
+    data_url = settings.get("logoUrl") or ""
+    if data_url.startswith("data:"):
+        return base64.b64decode(data_url.split(",", 1)[1])
+    return None
+
+
+async def migrate_data_url_logos() -> int:
+    """Move logos still stored as data URLs into the blob store"""
+    migrated = 0
+    async for settings in provider_settings_collection.find(
+        {"logoUrl": {"$regex": "^data:"}},
+        {"providerId": 1, "logoUrl": 1}
+    ):
+        try:
+            contents = base64.b64decode(settings["logoUrl"].split(",", 1)[1])
+            logo_hash = await store_logo(contents)
+        except Exception as e:
+            logger.error(f"Failed to migrate logo of provider {settings.get('providerId')}: {str(e)}")
+            continue
+
+        await provider_settings_collection.update_one(
+            {"_id": settings["_id"]},
+            {"$set": {"logoHash": logo_hash, "logoUrl": logo_url(logo_hash)}}
+        )
+        migrated += 1
+
+    if migrated:
+        logger.info(f"Migrated {migrated} data URL logos to the logo store")
+    return migrated
@@ -0,0 +1,252 @@
+"""
+Coalesced new-message email notifications.
+
+Instead of one email per client message, the first unnotified message from
+a client opens a digest for the (provider, client) pair in the
+message_digests collection, due MESSAGE_DIGEST_WINDOW_SECONDS later.
+Further messages in that window only move the digest's lastMessageAt. When
+the digest is due the worker emails the provider once: the single message
+as before, or the number of messages with the latest previews. Messages
+the provider already read in the app are left out, and a digest with
+nothing unread sends nothing.
+
+Digests live in MongoDB, so pending notifications survive restarts and are
+claimed with a lease, so only one worker sends each digest. Messages that
+arrive while a digest is being sent are kept for the next one.
+"""
+
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone, timedelta
+from typing import Optional
+from pymongo import ReturnDocument
+from database import message_digests_collection, messages_collection, load_users
+from services.email_service import send_new_message_notification, send_message_digest_notification, practice_locale
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_DIGEST_WINDOW_SECONDS = float(os.environ.get("MESSAGE_DIGEST_WINDOW_SECONDS", "300"))
+MESSAGE_DIGEST_MAX_PREVIEWS = int(os.environ.get("MESSAGE_DIGEST_MAX_PREVIEWS", "5"))
+
+# Longest sleep when nothing is due; bounds how late a digest opened by
+# another worker process is noticed
+IDLE_POLL_SECONDS = min(60.0, max(MESSAGE_DIGEST_WINDOW_SECONDS, 1.0))
+# A claimed digest whose worker disappeared becomes claimable again after this
+DIGEST_LEASE = timedelta(minutes=5)
+# Delay before a digest that failed is tried again
+DIGEST_RETRY = timedelta(minutes=1)
+
+
+def digest_id(provider_id: str, client_id: str) -> str:
+    return f"{provider_id}:{client_id}"
+
+
+def _utc(value: datetime) -> datetime:
+    # Datetimes read back from MongoDB are naive UTC
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+class MessageDigestNotifier:
+    """Collects client messages per (provider, client) and emails one digest per window"""
+
+    def __init__(self, collection, window: float = MESSAGE_DIGEST_WINDOW_SECONDS):
+        self.collection = collection
+        self.window = timedelta(seconds=window)
+        self._task = None
+        self._wakeup = None
+        self.sent = 0
+        self.coalesced = 0
+        self.skipped = 0
+        self.failed = 0
+        self.next_due = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        if self.running:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        logger.info("Message digest notifier started")
+
+    async def stop(self):
+        if not self.running:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logger.info(f"Message digest notifier stopped ({self.sent} sent)")
+
+    def wake(self):
+        """Re-check the earliest due digest (a digest was opened)"""
+        if self._wakeup:
+            self._wakeup.set()
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "windowSeconds": self.window.total_seconds(),
+            "sent": self.sent,
+            "coalesced": self.coalesced,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "nextDue": self.next_due.isoformat() if self.next_due else None
+        }
+
+    async def add(self, message: dict):
+        """Note a new client message for the provider's next digest"""
+        provider_id, client_id = message["receiverId"], message["senderId"]
+        timestamp = message["timestamp"]
+        result = await self.collection.update_one(
+            {"_id": digest_id(provider_id, client_id)},
+            {
+                "$max": {"lastMessageAt": timestamp},
+                "$setOnInsert": {
+                    "providerId": provider_id,
+                    "clientId": client_id,
+                    "since": timestamp,
+                    "dueAt": timestamp + self.window
+                }
+            },
+            upsert=True
+        )
+        if result.upserted_id:
+            self.wake()
+
+    async def _run(self):
+        while True:
+            try:
+                await self._send_due_digests()
+                delay = await self._seconds_until_next_digest()
+            except Exception as e:
+                logger.error(f"Message digest notifier error: {str(e)}")
+                delay = IDLE_POLL_SECONDS
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _seconds_until_next_digest(self) -> float:
+        pending = await self.collection.find_one(
+            {"lockedUntil": {"$exists": False}}, {"dueAt": 1}, sort=[("dueAt", 1)]
+        )
+        # Claimed digests come back when their lease runs out
+        stale = await self.collection.find_one(
+            {"lockedUntil": {"$exists": True}}, {"lockedUntil": 1}, sort=[("lockedUntil", 1)]
+        )
+        due_times = [_utc(pending["dueAt"])] if pending else []
+        if stale:
+            due_times.append(_utc(stale["lockedUntil"]))
+        if not due_times:
+            self.next_due = None
+            return IDLE_POLL_SECONDS
+
+        self.next_due = min(due_times)
+        delay = (self.next_due - datetime.now(timezone.utc)).total_seconds()
+        return min(max(delay, 0.0), IDLE_POLL_SECONDS)
+
+    async def _claim(self) -> Optional[dict]:
+        now = datetime.now(timezone.utc)
+        return await self.collection.find_one_and_update(
+            {
+                "dueAt": {"$lte": now},
+                "$or": [{"lockedUntil": {"$exists": False}}, {"lockedUntil": {"$lte": now}}]
+            },
+            {"$set": {"lockedUntil": now + DIGEST_LEASE}},
+            sort=[("dueAt", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _send_due_digests(self):
+        """Claim and send due digests until none are left"""
+        while True:
+            digest = await self._claim()
+            if not digest:
+                break
+            try:
+                await self._send(digest)
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Failed to send message digest {digest['_id']}: {str(e)}")
+                await self.collection.update_one(
+                    {"_id": digest["_id"]},
+                    {"$set": {"dueAt": datetime.now(timezone.utc) + DIGEST_RETRY},
+                     "$unset": {"lockedUntil": ""}}
+                )
+                continue
+            await self._finish(digest)
+
+    async def _finish(self, digest: dict):
+        # Nothing arrived while sending: the digest is done
+        result = await self.collection.delete_one({"_id": digest["_id"], "lastMessageAt": digest["lastMessageAt"]})
+        if result.deleted_count:
+            return
+        # Newer messages go into the next digest, one window from now
+        await self.collection.update_one(
+            {"_id": digest["_id"]},
+            {"$set": {"since": digest["lastMessageAt"] + timedelta(milliseconds=1),
+                      "dueAt": datetime.now(timezone.utc) + self.window},
+             "$unset": {"lockedUntil": ""}}
+        )
+
+    async def _send(self, digest: dict):
+        query = {
+            "senderId": digest["clientId"],
+            "receiverId": digest["providerId"],
+            "read": False,
+            "timestamp": {"$gte": digest["since"], "$lte": digest["lastMessageAt"]}
+        }
+        count = await messages_collection.count_documents(query)
+        if not count:
+            # Read in the app before the window closed
+            self.skipped += 1
+            return
+
+        client, provider = await load_users([digest["clientId"], digest["providerId"]])
+        if not provider or not provider.get("email"):
+            self.skipped += 1
+            return
+
+        latest = await messages_collection.find(query, {"message": 1}).sort(
+            "timestamp", -1
+        ).limit(MESSAGE_DIGEST_MAX_PREVIEWS).to_list(MESSAGE_DIGEST_MAX_PREVIEWS)
+        previews = [m.get("message", "") for m in reversed(latest)]
+
+        client_name = client.get("name", "A client") if client else "A client"
+        locale = await practice_locale(digest["providerId"])
+        # The key keeps a digest re-claimed after a lost lease from being queued twice
+        dedupe_key = f"message_digest:{digest['_id']}:{_utc(digest['since']).isoformat()}"
+
+        if count == 1:
+            await send_new_message_notification(
+                provider_email=provider["email"],
+                provider_name=provider.get("name", "Provider"),
+                client_name=client_name,
+                message_preview=previews[0],
+                locale=locale,
+                dedupe_key=dedupe_key
+            )
+        else:
+            await send_message_digest_notification(
+                provider_email=provider["email"],
+                provider_name=provider.get("name", "Provider"),
+                client_name=client_name,
+                message_count=count,
+                message_previews=previews,
+                locale=locale,
+                dedupe_key=dedupe_key
+            )
+            self.coalesced += count - 1
+        self.sent += 1
+        logger.info(f"Message notification ({count} messages) queued for provider {provider['email']}")
+
+
+message_digest = MessageDigestNotifier(message_digests_collection)
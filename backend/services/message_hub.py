@@ -0,0 +1,223 @@
+"""
+In-process pub/sub hub for real-time messaging.
+
+WebSocket connections subscribe under their user id. Routes publish an
+event (a new message, a read receipt) to the ids of the participants; the
+event is serialized once and pushed to every connection of those users
+in this process, so clients no longer poll GET /messages.
+
+How events reach the other uvicorn workers is up to the backend
+(MESSAGE_HUB_BACKEND):
+  memory  - single process only (default)
+  mongo   - every event is also written to a capped collection that each
+            worker tails, so a client connected to any worker gets it
+
+Publishing runs in a background task, so the request that triggered it
+never waits on socket I/O. A connection that does not take an event within
+MESSAGE_HUB_SEND_TIMEOUT is closed, so one stalled client cannot hold up
+delivery to the rest.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Set
+from fastapi.encoders import jsonable_encoder
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid
+from database import db
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_HUB_BACKEND = os.environ.get("MESSAGE_HUB_BACKEND", "memory").lower()
+MESSAGE_HUB_SEND_TIMEOUT = float(os.environ.get("MESSAGE_HUB_SEND_TIMEOUT", "5"))
+
+# Capped collection the mongo backend shares events through
+MESSAGE_EVENTS_COLLECTION = "message_events"
+MESSAGE_EVENTS_SIZE = int(os.environ.get("MESSAGE_EVENTS_SIZE_MB", "16")) * 1024 * 1024
+
+
+class MemoryBackend:
+    """Delivers events to this process's connections only"""
+
+    name = "memory"
+
+    def __init__(self, hub: "MessageHub"):
+        self.hub = hub
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def publish(self, user_ids: list, payload: str):
+        await self.hub.deliver(user_ids, payload)
+
+
+class MongoBackend:
+    """Shares events between workers through a tailed capped collection"""
+
+    name = "mongo"
+
+    def __init__(self, hub: "MessageHub"):
+        self.hub = hub
+        self.origin = uuid.uuid4().hex
+        self.collection = db[MESSAGE_EVENTS_COLLECTION]
+        self._task = None
+
+    async def start(self):
+        try:
+            await db.create_collection(MESSAGE_EVENTS_COLLECTION, capped=True, size=MESSAGE_EVENTS_SIZE)
+        except CollectionInvalid:
+            pass  # Created by another worker
+        # Only events published from now on
+        latest = await self.collection.find_one({}, {"_id": 1}, sort=[("$natural", -1)])
+        self._task = asyncio.create_task(self._tail(latest["_id"] if latest else None))
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def publish(self, user_ids: list, payload: str):
+        # Local connections get it right away; other workers through the tail
+        await self.hub.deliver(user_ids, payload)
+        await self.collection.insert_one({
+            "origin": self.origin,
+            "userIds": user_ids,
+            "payload": payload,
+            "createdAt": datetime.now(timezone.utc)
+        })
+
+    async def _tail(self, last_id):
+        while True:
+            try:
+                query = {"_id": {"$gt": last_id}} if last_id else {}
+                cursor = self.collection.find(query, cursor_type=CursorType.TAILABLE_AWAIT)
+                while cursor.alive:
+                    async for event in cursor:
+                        last_id = event["_id"]
+                        if event.get("origin") != self.origin:
+                            await self.hub.deliver(event["userIds"], event["payload"])
+                    await asyncio.sleep(0.1)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Message event tail failed: {str(e)}")
+            # The cursor dies when the collection is empty or wraps; reopen it
+            await asyncio.sleep(1)
+
+
+HUB_BACKENDS = {"memory": MemoryBackend, "mongo": MongoBackend}
+
+
+class MessageHub:
+    """Pushes JSON events to the WebSocket connections of given users"""
+
+    def __init__(self, backend: str = MESSAGE_HUB_BACKEND, send_timeout: float = MESSAGE_HUB_SEND_TIMEOUT):
+        if backend not in HUB_BACKENDS:
+            logger.warning(f"Message hub backend '{backend}' is not available, falling back to memory")
+            backend = "memory"
+        self.backend = HUB_BACKENDS[backend](self)
+        self.send_timeout = send_timeout
+        self._connections: Dict[str, Set] = {}
+        # Publishes in flight; referenced so they are not garbage collected
+        self._pending: Set[asyncio.Task] = set()
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    async def start(self):
+        await self.backend.start()
+        logger.info(f"Message hub started ({self.backend.name} backend)")
+
+    async def stop(self):
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+        await self.backend.stop()
+        for connections in list(self._connections.values()):
+            for connection in list(connections):
+                await self._close(connection)
+        self._connections.clear()
+
+    @property
+    def connection_count(self) -> int:
+        return sum(len(connections) for connections in self._connections.values())
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend.name,
+            "users": len(self._connections),
+            "connections": self.connection_count,
+            "published": self.published,
+            "pending": len(self._pending),
+            "delivered": self.delivered,
+            "dropped": self.dropped
+        }
+
+    def subscribe(self, user_id: str, connection):
+        self._connections.setdefault(user_id, set()).add(connection)
+
+    def unsubscribe(self, user_id: str, connection):
+        connections = self._connections.get(user_id)
+        if connections is None:
+            return
+        connections.discard(connection)
+        if not connections:
+            del self._connections[user_id]
+
+    def publish(self, user_ids: Iterable[str], event: dict) -> asyncio.Task:
+        """Send an event to every connection of the given users, on any worker, in the background"""
+        payload = json.dumps(jsonable_encoder(event))
+        self.published += 1
+        task = asyncio.create_task(self._publish(list(dict.fromkeys(user_ids)), event.get("type"), payload))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+        return task
+
+    async def _publish(self, user_ids: list, event_type: str, payload: str):
+        try:
+            await self.backend.publish(user_ids, payload)
+        except Exception as e:
+            # Push is best effort; the write that triggered it already succeeded
+            logger.error(f"Failed to publish {event_type} event: {str(e)}")
+
+    async def deliver(self, user_ids: Iterable[str], payload: str):
+        """Send an already serialized event to this process's connections of the users"""
+        targets = [
+            (user_id, connection)
+            for user_id in user_ids
+            for connection in list(self._connections.get(user_id, ()))
+        ]
+        if not targets:
+            return
+        results = await asyncio.gather(
+            *(asyncio.wait_for(connection.send_text(payload), self.send_timeout) for _, connection in targets),
+            return_exceptions=True
+        )
+        for (user_id, connection), result in zip(targets, results):
+            if isinstance(result, BaseException):
+                # Gone or too slow: drop it, the client reconnects and resyncs
+                self.dropped += 1
+                self.unsubscribe(user_id, connection)
+                await self._close(connection)
+            else:
+                self.delivered += 1
+
+    @staticmethod
+    async def _close(connection):
+        try:
+            await connection.close()
+        except Exception:
+            pass
+
+
+message_hub = MessageHub()
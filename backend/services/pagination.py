@@ -0,0 +1,114 @@
+"""
+Keyset (cursor) pagination for list endpoints.
+
+Pages are ordered by (sort field, _id) and the opaque cursor encodes the
+last row's key, so each page is an index range scan instead of a skip over
+every previous row. The _id tie-breaker keeps ordering stable when several
+documents share the same date or timestamp.
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Optional
+from bson import ObjectId
+from fastapi import HTTPException
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+    if isinstance(value, ObjectId):
+        return {"$oid": str(value)}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if "$dt" in value:
+            return datetime.fromisoformat(value["$dt"])
+        if "$oid" in value:
+            return ObjectId(value["$oid"])
+    return value
+
+
+def encode_cursor(sort_value, doc_id) -> str:
+    """Encode the key of the last row of a page as an opaque cursor"""
+    payload = json.dumps([_encode_value(sort_value), _encode_value(doc_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    """Decode a cursor into its (sort value, _id) pair"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, doc_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return _decode_value(sort_value), _decode_value(doc_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+
+def keyset_filter(sort_field: str, direction: int, cursor: str) -> dict:
+    """Build the filter that selects the rows strictly after the cursor"""
+    sort_value, doc_id = decode_cursor(cursor)
+    op = "$gt" if direction > 0 else "$lt"
+
+    if sort_field == "_id":
+        return {"_id": {op: doc_id}}
+
+    after = [
+        {sort_field: {op: sort_value}},
+        {sort_field: sort_value, "_id": {op: doc_id}}
+    ]
+    # Missing/null sort values order before every other value, so they
+    # come last in descending pages and first in ascending ones
+    if direction < 0 and sort_value is not None:
+        after.append({sort_field: None})
+    elif direction > 0 and sort_value is None:
+        after.append({sort_field: {"$ne": None}})
+    return {"$or": after}
+
+
+async def paginate(
+    collection,
+    query: dict,
+    projection: dict,
+    sort_field: str,
+    direction: int,
+    limit: int,
+    after: Optional[str] = None
+) -> dict:
+    """
+    Return one page of documents ordered by (sort_field, _id).
+
+    The projection is applied to the returned items exactly as for the
+    unpaginated endpoint; _id is fetched internally to build the cursor.
+    """
+    if after:
+        query = {"$and": [query, keyset_filter(sort_field, direction, after)]}
+
+    strip_id = projection.get("_id") == 0
+    fetch_projection = {k: v for k, v in projection.items() if k != "_id"} or None
+    if fetch_projection and any(fetch_projection.values()):
+        # Inclusion projection: the sort key is needed for the cursor
+        fetch_projection[sort_field] = 1
+
+    sort = [("_id", direction)] if sort_field == "_id" else [(sort_field, direction), ("_id", direction)]
+    docs = await collection.find(query, fetch_projection).sort(sort).limit(limit + 1).to_list(limit + 1)
+
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+
+    next_cursor = None
+    if has_more and docs:
+        last = docs[-1]
+        next_cursor = encode_cursor(last.get(sort_field) if sort_field != "_id" else None, last["_id"])
+
+    if strip_id:
+        for doc in docs:
+            doc.pop("_id", None)
+
+    return {"items": docs, "nextCursor": next_cursor, "hasMore": has_more}
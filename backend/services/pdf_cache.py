@@ -0,0 +1,152 @@
+"""
+Content-addressed disk cache for rendered invoice PDFs.
+
+A PDF is stored under the SHA-256 of everything that ends up in the
+document: the invoice fields, the provider settings printed on it or
+styling it (including the logo), the provider and client fields printed on
+it, and RENDER_VERSION. Settings that never reach the PDF, like the
+invoiceNextNumber counter, are left out so issuing an invoice does not
+change the key of every other PDF of the provider. Editing
+any of these produces a new key, so stale PDFs are never served and no
+explicit invalidation is needed. The key doubles as the HTTP ETag.
+
+Least recently written files are pruned once the cache grows past
+PDF_CACHE_MAX_MB. The size is tracked as files are written; the directory
+is only scanned when the limit is hit, and every PRUNE_RESCAN_WRITES writes
+to pick up files written by other worker processes.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+ROOT_DIR = Path(__file__).parent.parent
+
+PDF_CACHE_ENABLED = os.environ.get("PDF_CACHE_ENABLED", "true").lower() == "true"
+PDF_CACHE_DIR = Path(os.environ.get("PDF_CACHE_DIR", str(ROOT_DIR / "pdf_cache")))
+PDF_CACHE_MAX_MB = float(os.environ.get("PDF_CACHE_MAX_MB", "512"))
+
+# Bump when the invoice layout changes so previously cached PDFs are not reused
+RENDER_VERSION = "2"
+
+PROVIDER_FIELDS = ("name", "email", "phone")
+SETTINGS_FIELDS = (
+    "businessName", "businessAddress", "city", "postalCode", "country",
+    "taxNumber", "vatNumber", "registrationNumber",
+    "bankName", "iban", "bic", "defaultPaymentTermDays", "vatRate",
+    "logoUrl", "logoHash", "invoiceLanguage", "invoiceColor",
+    "businessEmail", "businessPhone", "website"
+)
+CLIENT_FIELDS = ("name", "email", "address")
+
+PRUNE_RESCAN_WRITES = 256
+# Pruning goes down to this share of the limit, so a full cache is not
+# rescanned on every write
+PRUNE_TARGET_RATIO = 0.9
+
+# Estimated bytes in the cache directory; None until the first scan
+_cache_size = None
+_writes_since_scan = 0
+_size_lock = threading.Lock()
+
+
+def _pick(user: Optional[dict], fields) -> Optional[dict]:
+    if not user:
+        return None
+    return {field: user.get(field) for field in fields}
+
+
+def pdf_cache_key(invoice: dict, provider: dict, client: dict, provider_settings: dict) -> str:
+    """Hash of every input that affects the rendered PDF"""
+    inputs = {
+        "version": RENDER_VERSION,
+        "invoice": invoice,
+        "settings": _pick(provider_settings or {}, SETTINGS_FIELDS),
+        "provider": _pick(provider, PROVIDER_FIELDS),
+        "client": _pick(client, CLIENT_FIELDS)
+    }
+    payload = json.dumps(inputs, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _path(key: str) -> Path:
+    return PDF_CACHE_DIR / key[:2] / f"{key}.pdf"
+
+
+def _read(key: str) -> Optional[bytes]:
+    try:
+        return _path(key).read_bytes()
+    except FileNotFoundError:
+        return None
+
+
+def _write(key: str, content: bytes):
+    path = _path(key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Written by a concurrent render of the same inputs
+    replaced = path.stat().st_size if path.exists() else 0
+    # Write to a temp file and rename so readers never see a partial PDF
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+    _track(len(content) - replaced)
+
+
+def _track(delta: int):
+    """Add a write to the size estimate; prune when it passes the limit"""
+    global _cache_size, _writes_since_scan
+    with _size_lock:
+        _writes_since_scan += 1
+        if _cache_size is not None and _writes_since_scan < PRUNE_RESCAN_WRITES:
+            _cache_size += delta
+            if _cache_size <= PDF_CACHE_MAX_MB * 1024 * 1024:
+                return
+        _cache_size = _prune()
+        _writes_since_scan = 0
+
+
+def _prune() -> int:
+    """Delete the oldest files once the cache is over its limit; returns its size"""
+    files = [(p.stat(), p) for p in PDF_CACHE_DIR.glob("*/*.pdf")]
+    total = sum(st.st_size for st, _ in files)
+    limit = PDF_CACHE_MAX_MB * 1024 * 1024
+    if total <= limit:
+        return total
+    target = limit * PRUNE_TARGET_RATIO
+    for st, path in sorted(files, key=lambda item: item[0].st_mtime):
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+        total -= st.st_size
+        if total <= target:
+            break
+    return total
+
+
+async def get_cached_pdf(key: str) -> Optional[bytes]:
+    if not PDF_CACHE_ENABLED:
+        return None
+    return await asyncio.to_thread(_read, key)
+
+
+async def store_pdf(key: str, content: bytes):
+    if not PDF_CACHE_ENABLED:
+        return
+    try:
+        await asyncio.to_thread(_write, key, content)
+    except OSError as e:
+        logger.error(f"Failed to cache invoice PDF {key}: {str(e)}")
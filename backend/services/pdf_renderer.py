@@ -0,0 +1,113 @@
+"""
+Invoice PDF rendering service.
+
+ReportLab layout is CPU-bound and holds the GIL, so even from a worker
+thread a few concurrent downloads slow every other request. Rendering runs
+in a process pool of PDF_RENDER_WORKERS processes instead. Handlers pass a
+plain-dict snapshot of the invoice and await the PDF bytes.
+
+At most PDF_RENDER_WORKERS renders run at once; further requests wait in
+line. The number waiting is reported as queueDepth under /api/metrics.
+PDF_RENDER_WORKERS=0 renders in a thread of the API process instead.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from services.invoice_pdf import render_invoice_pdf
+
+logger = logging.getLogger(__name__)
+
+PDF_RENDER_WORKERS = int(os.environ.get("PDF_RENDER_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+
+class PdfRenderer:
+    """Bounded process pool for render_invoice_pdf with queue statistics"""
+
+    def __init__(self, workers: int = PDF_RENDER_WORKERS):
+        self.workers = workers
+        self._pool = None
+        self._slots = None
+        self.queued = 0
+        self.in_flight = 0
+        self.rendered = 0
+        self.failed = 0
+        self.render_ms_total = 0.0
+
+    def _get_pool(self):
+        if self._pool is None:
+            # spawn: forking a process that runs an event loop and thread
+            # pools can copy locks held by other threads
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    async def _run(self, *args) -> bytes:
+        if self.workers <= 0:
+            return await asyncio.to_thread(render_invoice_pdf, *args)
+
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._get_pool(), render_invoice_pdf, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed); start a fresh pool and retry once
+            logger.error("PDF render pool broke, restarting it")
+            self._pool = None
+            return await loop.run_in_executor(self._get_pool(), render_invoice_pdf, *args)
+
+    async def render(self, invoice: dict, provider: dict, client: dict, provider_settings: dict,
+                     logo: bytes = None) -> bytes:
+        """Render an invoice to PDF bytes in the worker pool"""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(max(self.workers, 1))
+
+        # Plain-dict snapshots: they are pickled to the worker process
+        snapshot = (
+            dict(invoice), dict(provider or {}), dict(client) if client else None,
+            dict(provider_settings or {}), logo
+        )
+
+        self.queued += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.queued -= 1
+
+        self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            content = await self._run(*snapshot)
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+
+        self.rendered += 1
+        self.render_ms_total += (time.perf_counter() - start) * 1000
+        return content
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queueDepth": self.queued,
+            "inFlight": self.in_flight,
+            "rendered": self.rendered,
+            "failed": self.failed,
+            "avgRenderMs": round(self.render_ms_total / self.rendered, 1) if self.rendered else 0.0
+        }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+pdf_renderer = PdfRenderer()
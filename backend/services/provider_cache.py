@@ -0,0 +1,55 @@
+"""
+Cached reads of rarely-changing per-provider documents.
+
+provider_settings and working_hours are read on every invoice PDF, invoice
+preview and slot query but only change when the provider edits them. Reads
+go through a process-wide TTL/LRU cache; the write endpoints invalidate the
+provider's entry.
+"""
+
+import os
+from typing import Optional
+from database import provider_settings_collection, working_hours_collection
+from services.cache import TTLCache
+
+CACHE_TTL_SECONDS = float(os.environ.get("PROVIDER_CACHE_TTL_SECONDS", "300"))
+CACHE_MAX_ENTRIES = int(os.environ.get("PROVIDER_CACHE_MAX_ENTRIES", "1024"))
+
+provider_settings_cache = TTLCache("provider_settings", CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS)
+working_hours_cache = TTLCache("working_hours", CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS)
+
+
+async def get_provider_settings(provider_id: str) -> Optional[dict]:
+    """Get a provider's business settings (without _id/providerId), or None"""
+    hit, settings = provider_settings_cache.get(provider_id)
+    if hit:
+        return settings
+
+    settings = await provider_settings_collection.find_one(
+        {"providerId": provider_id},
+        {"_id": 0, "providerId": 0}
+    )
+    provider_settings_cache.set(provider_id, settings)
+    return settings
+
+
+async def get_working_hours(provider_id: str) -> Optional[dict]:
+    """Get a provider's working hours schedule (without _id), or None"""
+    hit, schedule = working_hours_cache.get(provider_id)
+    if hit:
+        return schedule
+
+    schedule = await working_hours_collection.find_one(
+        {"providerId": provider_id},
+        {"_id": 0}
+    )
+    working_hours_cache.set(provider_id, schedule)
+    return schedule
+
+
+def invalidate_provider_settings(provider_id: str):
+    provider_settings_cache.invalidate(provider_id)
+
+
+def invalidate_working_hours(provider_id: str):
+    working_hours_cache.invalidate(provider_id)
@@ -0,0 +1,335 @@
+"""
+Materialized dashboard counters.
+
+Each provider has one provider_stats document and each client one
+client_stats document holding their dashboard statistics. Write paths keep
+them current with $inc, so dashboards read a single document instead of
+recomputing counts. A reconciliation job rebuilds the counters from the
+source collections and reports any drift.
+
+Counter documents are created on first read (or by the reconciler); the
+incremental updates never upsert, so a missing document is never replaced
+by a partial one.
+"""
+
+import asyncio
+import logging
+import os
+from datetime import date, datetime, timezone, timedelta
+from database import (
+    provider_stats_collection, client_stats_collection,
+    clinical_notes_collection, users_collection
+)
+from services.dashboard_stats import compute_provider_counters, compute_client_counters
+
+logger = logging.getLogger(__name__)
+
+RECONCILE_INTERVAL_HOURS = float(os.environ.get("STATS_RECONCILE_INTERVAL_HOURS", "24"))
+
+UPCOMING_STATUSES = ("confirmed", "pending")
+UNPAID_INVOICE_STATUSES = ("pending", "overdue")
+
+PROVIDER_COUNTERS = ("activeClients", "messagesUnread", "upcomingAppointments", "pendingNotes", "totalIncome")
+CLIENT_COUNTERS = ("upcomingAppointments", "pendingPayments", "unreadMessages", "completedSessions")
+
+
+# ==================== Deltas ====================
+
+def _merge(target: dict, source: dict, sign: int):
+    for key, value in source.items():
+        target[key] = target.get(key, 0) + sign * value
+
+
+def _nonzero(inc: dict) -> dict:
+    return {k: v for k, v in inc.items() if v}
+
+
+def _appointment_contribution(appointment: dict, has_note: bool):
+    """What a single appointment adds to its provider's and client's counters"""
+    if not appointment:
+        return {}, {}
+
+    provider, client = {}, {}
+    status = appointment.get("status")
+
+    if status != "cancelled" and appointment.get("date"):
+        provider[f"appointmentsByDate.{appointment['date']}"] = 1
+    if status in UPCOMING_STATUSES:
+        provider["upcomingAppointments"] = 1
+        client["upcomingAppointments"] = 1
+    if status == "completed":
+        client["completedSessions"] = 1
+        if not has_note:
+            provider["pendingNotes"] = 1
+
+    return provider, client
+
+
+def _invoice_contribution(invoice: dict):
+    """What a single invoice adds to its provider's and client's counters"""
+    if not invoice:
+        return {}, {}
+
+    provider, client = {}, {}
+    status = invoice.get("status")
+
+    if status == "paid":
+        amount = float(invoice.get("amount", 0))
+        provider["totalIncome"] = amount
+        invoice_month = str(invoice.get("invoiceDate") or "")[:7]
+        if invoice_month:
+            provider[f"incomeByMonth.{invoice_month}"] = amount
+    if status in UNPAID_INVOICE_STATUSES:
+        client["pendingPayments"] = 1
+
+    return provider, client
+
+
+def appointment_stat_deltas(before: dict, after: dict, has_note: bool = False):
+    """Return the (provider, client) $inc documents for an appointment change"""
+    provider, client = {}, {}
+    for doc, sign in ((before, -1), (after, 1)):
+        p, c = _appointment_contribution(doc, has_note)
+        _merge(provider, p, sign)
+        _merge(client, c, sign)
+    return _nonzero(provider), _nonzero(client)
+
+
+def invoice_stat_deltas(before: dict, after: dict):
+    """Return the (provider, client) $inc documents for an invoice change"""
+    provider, client = {}, {}
+    for doc, sign in ((before, -1), (after, 1)):
+        p, c = _invoice_contribution(doc)
+        _merge(provider, p, sign)
+        _merge(client, c, sign)
+    return _nonzero(provider), _nonzero(client)
+
+
+async def _apply(provider_id: str, provider_inc: dict, client_id: str = None, client_inc: dict = None):
+    now = datetime.now(timezone.utc)
+    if provider_id and provider_inc:
+        await provider_stats_collection.update_one(
+            {"providerId": provider_id},
+            {"$inc": provider_inc, "$set": {"updatedAt": now}}
+        )
+    if client_id and client_inc:
+        await client_stats_collection.update_one(
+            {"clientId": client_id},
+            {"$inc": client_inc, "$set": {"updatedAt": now}}
+        )
+
+
+# ==================== Write paths ====================
+
+async def record_appointment_change(before: dict = None, after: dict = None):
+    """Update counters after an appointment was created (before=None) or modified"""
+    appointment = after or before
+    if not appointment:
+        return
+
+    has_note = False
+    if "completed" in ((before or {}).get("status"), (after or {}).get("status")):
+        has_note = await clinical_notes_collection.find_one(
+            {"appointmentId": appointment["_id"]},
+            {"_id": 1}
+        ) is not None
+
+    provider_inc, client_inc = appointment_stat_deltas(before, after, has_note)
+    await _apply(appointment.get("providerId"), provider_inc, appointment.get("clientId"), client_inc)
+
+
+async def record_invoice_change(before: dict = None, after: dict = None):
+    """Update counters after an invoice was created (before=None) or modified"""
+    invoice = after or before
+    if not invoice:
+        return
+
+    provider_inc, client_inc = invoice_stat_deltas(before, after)
+    await _apply(invoice.get("providerId"), provider_inc, invoice.get("clientId"), client_inc)
+
+
+async def _record_unread(message: dict, delta: int):
+    # Messages only flow between a provider and a client
+    if message.get("senderType") == "client":
+        await _apply(message["receiverId"], {"messagesUnread": delta})
+    else:
+        await _apply(None, None, message["receiverId"], {"unreadMessages": delta})
+
+
+async def record_message_sent(message: dict):
+    """Count a new unread message for its receiver"""
+    await _record_unread(message, 1)
+
+
+async def record_message_read(message: dict):
+    """Remove a message from its receiver's unread count"""
+    await _record_unread(message, -1)
+
+
+async def record_clinical_note_created(appointment: dict):
+    """A note on a completed appointment clears one pending note"""
+    if appointment.get("status") == "completed":
+        await _apply(appointment["providerId"], {"pendingNotes": -1})
+
+
+async def record_client_joined(provider_id: str):
+    """Count a newly registered client for their provider"""
+    await _apply(provider_id, {"activeClients": 1})
+
+
+# ==================== Read paths ====================
+
+async def get_provider_dashboard_stats(provider_id: str, today: date = None) -> dict:
+    """Read the provider dashboard statistics from the materialized counters"""
+    today = today or date.today()
+    week_start = today - timedelta(days=today.weekday())
+    week_dates = [(week_start + timedelta(days=i)).isoformat() for i in range(7)]
+    current_month = today.strftime("%Y-%m")
+
+    projection = {"_id": 0, f"incomeByMonth.{current_month}": 1}
+    projection.update({counter: 1 for counter in PROVIDER_COUNTERS})
+    projection.update({f"appointmentsByDate.{d}": 1 for d in week_dates})
+
+    stats = await provider_stats_collection.find_one({"providerId": provider_id}, projection)
+    if stats is None:
+        await reconcile_provider(provider_id)
+        stats = await provider_stats_collection.find_one({"providerId": provider_id}, projection) or {}
+
+    by_date = stats.get("appointmentsByDate", {})
+
+    return {
+        "totalIncome": float(stats.get("totalIncome", 0)),
+        "monthlyIncome": float(stats.get("incomeByMonth", {}).get(current_month, 0)),
+        "appointmentsToday": by_date.get(today.isoformat(), 0),
+        "appointmentsWeek": sum(by_date.get(d, 0) for d in week_dates),
+        "pendingNotes": stats.get("pendingNotes", 0),
+        "activeClients": stats.get("activeClients", 0),
+        "messagesUnread": stats.get("messagesUnread", 0),
+        "upcomingAppointments": stats.get("upcomingAppointments", 0)
+    }
+
+
+async def get_client_dashboard_stats(client_id: str) -> dict:
+    """Read the client dashboard statistics from the materialized counters"""
+    projection = {"_id": 0}
+    projection.update({counter: 1 for counter in CLIENT_COUNTERS})
+
+    stats = await client_stats_collection.find_one({"clientId": client_id}, projection)
+    if stats is None:
+        await reconcile_client(client_id)
+        stats = await client_stats_collection.find_one({"clientId": client_id}, projection) or {}
+
+    return {counter: stats.get(counter, 0) for counter in CLIENT_COUNTERS}
+
+
+# ==================== Reconciliation ====================
+
+def _flatten(counters: dict) -> dict:
+    flat = {}
+    for key, value in counters.items():
+        if isinstance(value, dict):
+            for sub_key, sub_value in value.items():
+                flat[f"{key}.{sub_key}"] = sub_value
+        else:
+            flat[key] = value
+    return flat
+
+
+def _diff(user_id: str, stored: dict, actual: dict) -> list:
+    """List the counters whose stored value differs from the source of truth"""
+    stored_flat, actual_flat = _flatten(stored), _flatten(actual)
+    drift = []
+    for key in sorted(set(stored_flat) | set(actual_flat)):
+        stored_value = stored_flat.get(key, 0)
+        actual_value = actual_flat.get(key, 0)
+        if abs(stored_value - actual_value) > 0.005:
+            drift.append({"userId": user_id, "counter": key, "stored": stored_value, "actual": actual_value})
+    return drift
+
+
+async def _reconcile(collection, key_field: str, user_id: str, actual: dict, counters) -> list:
+    projection = {"_id": 0}
+    projection.update({counter: 1 for counter in counters})
+    stored = await collection.find_one({key_field: user_id}, projection)
+
+    now = datetime.now(timezone.utc)
+    await collection.update_one(
+        {key_field: user_id},
+        {"$set": {**actual, "reconciledAt": now, "updatedAt": now}},
+        upsert=True
+    )
+
+    # A first build is not drift
+    if stored is None:
+        return []
+
+    drift = _diff(user_id, stored, actual)
+    for entry in drift:
+        logger.warning(
+            f"Dashboard counter drift for {user_id}: {entry['counter']} "
+            f"stored={entry['stored']} actual={entry['actual']}"
+        )
+    return drift
+
+
+async def reconcile_provider(provider_id: str) -> list:
+    """Rebuild one provider's counters and return any drift found"""
+    actual = await compute_provider_counters(provider_id)
+    return await _reconcile(
+        provider_stats_collection, "providerId", provider_id, actual,
+        PROVIDER_COUNTERS + ("incomeByMonth", "appointmentsByDate")
+    )
+
+
+async def reconcile_client(client_id: str) -> list:
+    """Rebuild one client's counters and return any drift found"""
+    actual = await compute_client_counters(client_id)
+    return await _reconcile(client_stats_collection, "clientId", client_id, actual, CLIENT_COUNTERS)
+
+
+async def reconcile_all() -> dict:
+    """Rebuild every provider and client counter document and report drift"""
+    drift = []
+    providers = clients = 0
+
+    async for user in users_collection.find({"userType": "provider"}, {"_id": 0, "user_id": 1}):
+        drift.extend(await reconcile_provider(user["user_id"]))
+        providers += 1
+
+    async for user in users_collection.find({"userType": "client"}, {"_id": 0, "user_id": 1}):
+        drift.extend(await reconcile_client(user["user_id"]))
+        clients += 1
+
+    logger.info(f"Dashboard counters reconciled: {providers} providers, {clients} clients, {len(drift)} drifted counters")
+
+    return {"providersChecked": providers, "clientsChecked": clients, "drift": drift}
+
+
+async def stats_reconciler():
+    """Background task that periodically reconciles the dashboard counters"""
+    logger.info("Dashboard counter reconciler started")
+
+    while True:
+        await asyncio.sleep(RECONCILE_INTERVAL_HOURS * 3600)
+        try:
+            await reconcile_all()
+        except Exception as e:
+            logger.error(f"Dashboard counter reconciliation error: {str(e)}")
+
+
+def start_stats_reconciler():
+    """
+    Start the counter reconciler as a background task.
+    Call this from server startup.
+    """
+    asyncio.create_task(stats_reconciler())
+    logger.info("Dashboard counter reconciler task created")
+
+
+if __name__ == "__main__":
+    # Manual run: python -m services.provider_stats
+    logging.basicConfig(level=logging.INFO)
+    report = asyncio.run(reconcile_all())
+    for entry in report["drift"]:
+        print(f"{entry['userId']}: {entry['counter']} stored={entry['stored']} actual={entry['actual']}")
+    print(f"{report['providersChecked']} providers, {report['clientsChecked']} clients, {len(report['drift'])} drifted counters")
@@ -1,109 +1,310 @@
 """
-Background task scheduler for appointment reminders.
-Runs every hour to check for appointments happening in ~24 hours.
+Appointment reminders as persistent scheduled jobs.
+
+Creating or rescheduling an appointment upserts one job per appointment in
+the scheduled_jobs collection, due REMINDER_LEAD_HOURS before its
+startsAt. The worker sleeps until the earliest due job (or until a job is
+scheduled in this process), then claims due jobs one at a time with
+find_one_and_update, so several workers never send the same reminder.
+
+Job state lives in MongoDB: a reminder marked done stays done across
+restarts, a worker that dies mid-send leaves a lease that expires and the
+job is picked up again, and failed sends are retried with backoff. There
+is no cap on how many reminders are due at once.
 """
 
 import asyncio
 import logging
+import os
 from datetime import datetime, timezone, timedelta
-from database import appointments_collection, users_collection
-from services.email_service import send_appointment_reminder
+from typing import Optional
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+from database import appointments_collection, scheduled_jobs_collection, user_loader_scope, load_users
+from services.email_service import send_appointment_reminder, practice_locale
 
 logger = logging.getLogger(__name__)
 
-# Track sent reminders to avoid duplicates (in-memory, resets on restart)
-sent_reminders = set()
+REMINDER_LEAD_HOURS = float(os.environ.get("REMINDER_LEAD_HOURS", "24"))
+REMINDER_CONCURRENCY = int(os.environ.get("REMINDER_CONCURRENCY", "8"))
+REMINDER_MAX_ATTEMPTS = int(os.environ.get("REMINDER_MAX_ATTEMPTS", "5"))
 
+# Longest sleep when nothing is due; bounds how late a job scheduled by
+# another worker process is noticed
+IDLE_POLL_SECONDS = 60.0
+# A claimed job whose worker disappeared becomes claimable again after this
+JOB_LEASE = timedelta(minutes=5)
 
-async def check_and_send_reminders():
-    """
-    Check for appointments happening in approximately 24 hours
-    and send reminder emails.
-    """
-    try:
-        now = datetime.now(timezone.utc)
-        
-        # Look for appointments between 23-25 hours from now
-        target_date = (now + timedelta(hours=24)).strftime("%Y-%m-%d")
-        
-        logger.info(f"Checking for appointments on {target_date} to send reminders...")
-        
-        # Find confirmed appointments for tomorrow
-        appointments = await appointments_collection.find({
-            "date": target_date,
-            "status": {"$in": ["confirmed", "pending"]}
-        }).to_list(100)
-        
-        reminders_sent = 0
-        
-        for apt in appointments:
-            apt_id = str(apt.get("_id", ""))
-            
-            # Skip if reminder already sent
-            if apt_id in sent_reminders:
-                continue
-            
+JOB_TYPE = "appointment_reminder"
+REMINDER_STATUSES = ("confirmed", "pending")
+# Jobs that already ran; only a new start time schedules them again
+FINISHED_JOB_STATUSES = ("done", "skipped", "failed")
+
+
+def reminder_job_id(appointment_id: str) -> str:
+    return f"{JOB_TYPE}:{appointment_id}"
+
+
+def _utc(value: datetime) -> datetime:
+    # Datetimes read back from MongoDB are naive UTC
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+class ReminderScheduler:
+    """Runs due reminder jobs from the scheduled_jobs collection"""
+
+    def __init__(self, collection, concurrency: int = REMINDER_CONCURRENCY):
+        self.collection = collection
+        self.concurrency = concurrency
+        self._task = None
+        self._wakeup = None
+        self.sent = 0
+        self.skipped = 0
+        self.failed = 0
+        self.next_due = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        if self.running:
+            return
+        self._wakeup = asyncio.Event()
+        await schedule_missing_reminders()
+        self._task = asyncio.create_task(self._run())
+        logger.info("Reminder scheduler started")
+
+    async def stop(self):
+        if not self.running:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logger.info(f"Reminder scheduler stopped ({self.sent} sent)")
+
+    def wake(self):
+        """Re-check the earliest due job (a job was scheduled or moved)"""
+        if self._wakeup:
+            self._wakeup.set()
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "sent": self.sent,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "nextDue": self.next_due.isoformat() if self.next_due else None
+        }
+
+    async def _run(self):
+        while True:
             try:
-                # Get client info
-                client = await users_collection.find_one(
-                    {"user_id": apt["clientId"]},
-                    {"_id": 0, "password": 0}
-                )
-                
-                # Get provider info
-                provider = await users_collection.find_one(
-                    {"user_id": apt["providerId"]},
-                    {"_id": 0, "password": 0}
-                )
-                
-                if client and client.get("email"):
-                    await send_appointment_reminder(
-                        client_email=client["email"],
-                        client_name=client.get("name", "Patient"),
-                        provider_name=provider.get("name", "Provider") if provider else "Provider",
-                        appointment_type=apt.get("type", "Appointment"),
-                        appointment_date=apt.get("date", ""),
-                        appointment_time=apt.get("time", ""),
-                        video_link=apt.get("videoLink")
-                    )
-                    
-                    sent_reminders.add(apt_id)
-                    reminders_sent += 1
-                    logger.info(f"Reminder sent for appointment {apt_id} to {client['email']}")
-                    
+                await self._run_due_jobs()
+                delay = await self._seconds_until_next_job()
             except Exception as e:
-                logger.error(f"Failed to send reminder for appointment {apt_id}: {str(e)}")
-        
-        if reminders_sent > 0:
-            logger.info(f"Sent {reminders_sent} appointment reminders")
-        else:
-            logger.debug("No reminders to send this cycle")
-            
-    except Exception as e:
-        logger.error(f"Error in reminder check: {str(e)}")
-
-
-async def reminder_scheduler():
-    """
-    Background task that runs every hour to check for appointments
-    and send reminders.
-    """
-    logger.info("Appointment reminder scheduler started")
-    
-    while True:
+                logger.error(f"Reminder scheduler error: {str(e)}")
+                delay = IDLE_POLL_SECONDS
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _seconds_until_next_job(self) -> float:
+        pending = await self.collection.find_one(
+            {"type": JOB_TYPE, "status": "pending"}, {"dueAt": 1}, sort=[("dueAt", 1)]
+        )
+        # Claimed jobs come back when their lease runs out
+        stale = await self.collection.find_one(
+            {"type": JOB_TYPE, "status": "running"}, {"lockedUntil": 1}, sort=[("lockedUntil", 1)]
+        )
+        due_times = [_utc(pending["dueAt"])] if pending else []
+        if stale:
+            due_times.append(_utc(stale["lockedUntil"]))
+        if not due_times:
+            self.next_due = None
+            return IDLE_POLL_SECONDS
+
+        self.next_due = min(due_times)
+        delay = (self.next_due - datetime.now(timezone.utc)).total_seconds()
+        return min(max(delay, 0.0), IDLE_POLL_SECONDS)
+
+    async def _claim(self) -> Optional[dict]:
+        now = datetime.now(timezone.utc)
+        return await self.collection.find_one_and_update(
+            {
+                "type": JOB_TYPE,
+                "$or": [
+                    {"status": "pending", "dueAt": {"$lte": now}},
+                    {"status": "running", "lockedUntil": {"$lte": now}}
+                ]
+            },
+            {
+                "$set": {"status": "running", "lockedUntil": now + JOB_LEASE, "updatedAt": now},
+                "$inc": {"attempts": 1}
+            },
+            sort=[("dueAt", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _run_due_jobs(self):
+        """Claim and run due jobs until none are left"""
+        running = set()
+        # Jobs of one cycle share a batched user loader
+        with user_loader_scope():
+            while True:
+                job = await self._claim()
+                if not job:
+                    break
+                running.add(asyncio.create_task(self._run_job(job)))
+                if len(running) >= self.concurrency:
+                    _, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            if running:
+                await asyncio.wait(running)
+
+    async def _finish(self, job: dict, status: str, error: str = None):
+        update = {"status": status, "updatedAt": datetime.now(timezone.utc)}
+        if error:
+            update["lastError"] = error
+        # Only if the job wasn't rescheduled meanwhile
+        await self.collection.update_one(
+            {"_id": job["_id"], "status": "running", "dueAt": job["dueAt"]},
+            {"$set": update, "$unset": {"lockedUntil": ""}}
+        )
+
+    async def _run_job(self, job: dict):
         try:
-            await check_and_send_reminders()
+            sent = await send_reminder(job["appointmentId"], job["startsAt"])
         except Exception as e:
-            logger.error(f"Reminder scheduler error: {str(e)}")
-        
-        # Wait 1 hour before next check
-        await asyncio.sleep(3600)
-
-
-def start_reminder_scheduler():
-    """
-    Start the reminder scheduler as a background task.
-    Call this from server startup.
-    """
-    asyncio.create_task(reminder_scheduler())
-    logger.info("Reminder scheduler task created")
+            logger.error(f"Failed to send reminder for appointment {job['appointmentId']}: {str(e)}")
+            if job.get("attempts", 1) >= REMINDER_MAX_ATTEMPTS:
+                self.failed += 1
+                await self._finish(job, "failed", str(e))
+            else:
+                # Retry with exponential backoff
+                retry_at = datetime.now(timezone.utc) + timedelta(minutes=2 ** job.get("attempts", 1))
+                await self.collection.update_one(
+                    {"_id": job["_id"], "status": "running", "dueAt": job["dueAt"]},
+                    {"$set": {"status": "pending", "dueAt": retry_at, "lastError": str(e)},
+                     "$unset": {"lockedUntil": ""}}
+                )
+            return
+
+        if sent:
+            self.sent += 1
+            logger.info(f"Reminder sent for appointment {job['appointmentId']}")
+        else:
+            self.skipped += 1
+        await self._finish(job, "done" if sent else "skipped")
+
+
+async def send_reminder(appointment_id: str, starts_at: datetime) -> bool:
+    """Send the reminder if the appointment is still on at that time; returns whether it was sent"""
+    appointment = await appointments_collection.find_one({"_id": appointment_id})
+    if (
+        not appointment
+        or appointment.get("status") not in REMINDER_STATUSES
+        or not appointment.get("startsAt")
+        or _utc(appointment["startsAt"]) != _utc(starts_at)
+        or _utc(appointment["startsAt"]) <= datetime.now(timezone.utc)
+    ):
+        return False
+
+    client, provider = await load_users([appointment["clientId"], appointment["providerId"]])
+    if not client or not client.get("email"):
+        return False
+
+    # Queued in the email outbox; the key keeps a re-run job from queueing it twice
+    await send_appointment_reminder(
+        client_email=client["email"],
+        client_name=client.get("name", "Patient"),
+        provider_name=provider.get("name", "Provider") if provider else "Provider",
+        appointment_type=appointment.get("type", "Appointment"),
+        appointment_date=appointment.get("date", ""),
+        appointment_time=appointment.get("time", ""),
+        video_link=appointment.get("videoLink"),
+        dedupe_key=f"{reminder_job_id(appointment_id)}:{_utc(appointment['startsAt']).isoformat()}",
+        locale=await practice_locale(appointment["providerId"])
+    )
+    return True
+
+
+def _reminder_job(appointment: dict, now: datetime) -> dict:
+    starts_at = _utc(appointment["startsAt"])
+    return {
+        "type": JOB_TYPE,
+        "appointmentId": appointment["_id"],
+        "startsAt": starts_at,
+        "dueAt": starts_at - timedelta(hours=REMINDER_LEAD_HOURS),
+        "status": "pending",
+        "attempts": 0,
+        "updatedAt": now
+    }
+
+
+async def schedule_appointment_reminder(appointment: dict):
+    """Create or move the reminder job of a new or rescheduled appointment"""
+    if not appointment.get("startsAt"):
+        return
+    if appointment.get("status") not in REMINDER_STATUSES:
+        await cancel_appointment_reminder(appointment["_id"])
+        return
+
+    now = datetime.now(timezone.utc)
+    job = _reminder_job(appointment, now)
+    try:
+        await scheduled_jobs_collection.update_one(
+            {
+                "_id": reminder_job_id(appointment["_id"]),
+                "$or": [{"status": {"$nin": list(FINISHED_JOB_STATUSES)}}, {"startsAt": {"$ne": job["startsAt"]}}]
+            },
+            {"$set": job, "$setOnInsert": {"createdAt": now},
+             "$unset": {"lockedUntil": "", "lastError": ""}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        return  # The reminder for this start time already ran
+    reminder_scheduler.wake()
+
+
+async def cancel_appointment_reminder(appointment_id: str):
+    """Drop the pending reminder of a cancelled appointment"""
+    await scheduled_jobs_collection.update_one(
+        {"_id": reminder_job_id(appointment_id), "status": {"$in": ["pending", "running"]}},
+        {"$set": {"status": "cancelled", "updatedAt": datetime.now(timezone.utc)},
+         "$unset": {"lockedUntil": ""}}
+    )
+
+
+async def schedule_missing_reminders(batch_size: int = 500) -> int:
+    """Create jobs for upcoming appointments that have none (e.g. booked before jobs existed)"""
+    now = datetime.now(timezone.utc)
+    scheduled = 0
+    batch = []
+    async for appointment in appointments_collection.find(
+        {"startsAt": {"$gt": now}, "status": {"$in": list(REMINDER_STATUSES)}},
+        {"startsAt": 1, "status": 1}
+    ):
+        # $setOnInsert only: never resets a job that already ran
+        batch.append(UpdateOne(
+            {"_id": reminder_job_id(appointment["_id"])},
+            {"$setOnInsert": {**_reminder_job(appointment, now), "createdAt": now}},
+            upsert=True
+        ))
+        if len(batch) >= batch_size:
+            scheduled += (await scheduled_jobs_collection.bulk_write(batch, ordered=False)).upserted_count
+            batch = []
+    if batch:
+        scheduled += (await scheduled_jobs_collection.bulk_write(batch, ordered=False)).upserted_count
+
+    if scheduled:
+        logger.info(f"Scheduled reminders for {scheduled} upcoming appointments")
+    return scheduled
+
+
+reminder_scheduler = ReminderScheduler(scheduled_jobs_collection)
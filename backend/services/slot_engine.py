@@ -0,0 +1,243 @@
+"""
+Vectorized slot generation.
+
+A provider's availability over a date range is computed in one pass over a
+(days x 1440) minute grid with NumPy instead of walking each day slot by
+slot. Outside working hours, breaks and booked appointments are added to
+the grid as [start, end) minute intervals through a difference array; a
+prefix sum over the resulting busy mask then tells, for every candidate
+slot of every day at once, whether any minute inside it is taken.
+
+Bookings for the whole range are read with a single appointments query
+into the provider's interval index (services.appointment_index), the same
+structure that rejects overlapping bookings.
+
+Computed days are cached per (providerId, date), so browsing the booking
+calendar is served from memory. Booking writes invalidate the days an
+appointment covers and working hours updates invalidate the provider.
+"""
+
+import os
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+import numpy as np
+from models import WorkingHours
+from services.appointment_index import (
+    MINUTES_PER_DAY, absolute_minute, appointment_interval, load_provider_index, parse_minutes
+)
+from services.cache import TTLCache
+from services.interval_tree import IntervalTree
+from services.provider_cache import get_working_hours
+
+# Longest range a single request may ask for
+MAX_RANGE_DAYS = 62
+
+AVAILABILITY_CACHE_TTL_SECONDS = float(os.environ.get("AVAILABILITY_CACHE_TTL_SECONDS", "300"))
+AVAILABILITY_CACHE_MAX_ENTRIES = int(os.environ.get("AVAILABILITY_CACHE_MAX_ENTRIES", "20000"))
+
+# (providerId, "YYYY-MM-DD") -> {"enabled", "slotDuration", "slots"}, where
+# slots are free start minutes not yet filtered by the current time
+availability_cache = TTLCache("availability", AVAILABILITY_CACHE_MAX_ENTRIES, AVAILABILITY_CACHE_TTL_SECONDS)
+
+# Bumped on every invalidation of a provider's days
+_generations: Dict[str, int] = {}
+
+DAY_NAMES = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+
+# "09:30 AM" / "09:30" labels for every minute of the day
+_midnight = datetime(2000, 1, 1)
+TIME_LABELS = [(_midnight + timedelta(minutes=m)).strftime("%I:%M %p") for m in range(MINUTES_PER_DAY)]
+TIME_LABELS_24H = [(_midnight + timedelta(minutes=m)).strftime("%H:%M") for m in range(MINUTES_PER_DAY)]
+
+
+def date_range(start: date, end: date) -> List[date]:
+    return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+
+def compute_free_slots(schedule: dict, days: List[date], bookings: IntervalTree,
+                       now: Optional[datetime] = None) -> List[List[int]]:
+    """
+    Free slot start minutes for each day in days (consecutive dates).
+
+    schedule is a WorkingHours document, bookings the provider's appointment
+    index (see services.appointment_index). If now is given, slots that
+    already started by then are left out.
+    """
+    slot_duration = int(schedule.get('slotDuration') or 60)
+    n_days = len(days)
+    if n_days == 0:
+        return []
+
+    # Per-day working hours; disabled days get an empty window
+    work_start = np.zeros(n_days, dtype=np.int32)
+    work_end = np.zeros(n_days, dtype=np.int32)
+    intervals = []  # (day index, start minute, end minute) of busy time
+
+    for i, day in enumerate(days):
+        day_schedule = schedule.get(DAY_NAMES[day.weekday()]) or {}
+        start = parse_minutes(day_schedule.get('startTime'))
+        end = parse_minutes(day_schedule.get('endTime'))
+        if not day_schedule.get('enabled', False) or start is None or end is None:
+            continue
+        work_start[i], work_end[i] = start, end
+
+        break_start = parse_minutes(day_schedule.get('breakStart'))
+        break_end = parse_minutes(day_schedule.get('breakEnd'))
+        if break_start is not None and break_end is not None:
+            intervals.append((i, break_start, break_end))
+
+    # Booked time, split at midnight into the rows of the days it covers
+    range_start = absolute_minute(days[0], 0)
+    range_end = absolute_minute(days[-1], MINUTES_PER_DAY)
+    for start, end, _ in bookings.overlapping(range_start, range_end):
+        start = max(start, range_start) - range_start
+        end = min(end, range_end) - range_start
+        for i in range(start // MINUTES_PER_DAY, (end - 1) // MINUTES_PER_DAY + 1):
+            day_offset = i * MINUTES_PER_DAY
+            intervals.append((i, max(start - day_offset, 0), min(end - day_offset, MINUTES_PER_DAY)))
+
+    # Difference array of busy intervals -> busy minute mask
+    diff = np.zeros((n_days, MINUTES_PER_DAY + 1), dtype=np.int32)
+    if intervals:
+        rows, starts, ends = (np.array(column, dtype=np.int32) for column in zip(*intervals))
+        starts = np.clip(starts, 0, MINUTES_PER_DAY)
+        ends = np.clip(ends, 0, MINUTES_PER_DAY)
+        keep = ends > starts
+        np.add.at(diff, (rows[keep], starts[keep]), 1)
+        np.add.at(diff, (rows[keep], ends[keep]), -1)
+    busy = np.cumsum(diff[:, :MINUTES_PER_DAY], axis=1) > 0
+
+    # busy_before[d, m] = number of busy minutes of day d before minute m
+    busy_before = np.zeros((n_days, MINUTES_PER_DAY + 1), dtype=np.int32)
+    np.cumsum(busy, axis=1, out=busy_before[:, 1:])
+
+    # Candidate slots: every slot_duration from the start of working hours
+    steps = np.arange(MINUTES_PER_DAY // slot_duration + 1, dtype=np.int32)
+    slot_starts = work_start[:, None] + steps[None, :] * slot_duration
+    slot_ends = slot_starts + slot_duration
+    candidate = slot_ends <= work_end[:, None]
+
+    rows = np.arange(n_days)[:, None]
+    starts_idx = np.minimum(slot_starts, MINUTES_PER_DAY)
+    ends_idx = np.minimum(slot_ends, MINUTES_PER_DAY)
+    free = candidate & (busy_before[rows, ends_idx] == busy_before[rows, starts_idx])
+
+    minutes = [slot_starts[i][free[i]].tolist() for i in range(n_days)]
+    if now is None:
+        return minutes
+    return [upcoming_slots(day, day_minutes, now) for day, day_minutes in zip(days, minutes)]
+
+
+def upcoming_slots(day: date, minutes: List[int], now: datetime) -> List[int]:
+    """The slots of day that have not started by now"""
+    today = now.date()
+    if day < today:
+        return []
+    if day == today:
+        current = now.hour * 60 + now.minute
+        return [m for m in minutes if m > current]
+    return minutes
+
+
+def format_slots(minutes: List[int]) -> List[dict]:
+    return [
+        {"time": TIME_LABELS[m], "time24h": TIME_LABELS_24H[m], "available": True}
+        for m in minutes
+    ]
+
+
+async def _load_schedule(provider_id: str) -> dict:
+    schedule = await get_working_hours(provider_id)
+    return schedule or WorkingHours().model_dump()
+
+
+def _day_enabled(schedule: dict, day: date) -> bool:
+    return (schedule.get(DAY_NAMES[day.weekday()]) or {}).get('enabled', False)
+
+
+def invalidate_provider_availability(provider_id: str):
+    """Drop every cached day of a provider (working hours changed)"""
+    _generations[provider_id] = _generations.get(provider_id, 0) + 1
+    availability_cache.invalidate_where(lambda key: key[0] == provider_id)
+
+
+def invalidate_appointment_availability(*appointments: Optional[dict]):
+    """Drop the cached days covered by appointments (their state before and after a change)"""
+    for appointment in appointments:
+        interval = appointment_interval(appointment) if appointment else None
+        if not interval:
+            continue
+        provider_id = appointment.get("providerId")
+        _generations[provider_id] = _generations.get(provider_id, 0) + 1
+        for ordinal in range(interval[0] // MINUTES_PER_DAY, (interval[1] - 1) // MINUTES_PER_DAY + 1):
+            availability_cache.invalidate((provider_id, date.fromordinal(ordinal).isoformat()))
+
+
+async def _get_days(provider_id: str, days: List[date]) -> List[dict]:
+    """Cached availability entries for days, computing the missing ones"""
+    entries = {}
+    missing = []
+    for day in days:
+        hit, entry = availability_cache.get((provider_id, day.isoformat()))
+        if hit:
+            entries[day] = entry
+        else:
+            missing.append(day)
+
+    if missing:
+        # An invalidation while computing means the result may be stale:
+        # serve it, but don't cache it
+        generation = _generations.get(provider_id, 0)
+        schedule = await _load_schedule(provider_id)
+        span = date_range(missing[0], missing[-1])
+        bookings = await load_provider_index(provider_id, span[0], span[-1])
+        free = compute_free_slots(schedule, span, bookings)
+
+        cacheable = _generations.get(provider_id, 0) == generation
+        for day, minutes in zip(span, free):
+            entry = {
+                "enabled": _day_enabled(schedule, day),
+                "slotDuration": schedule.get('slotDuration', 60),
+                "slots": minutes
+            }
+            entries[day] = entry
+            if cacheable:
+                availability_cache.set((provider_id, day.isoformat()), entry)
+
+    return [entries[day] for day in days]
+
+
+async def get_available_slots(provider_id: str, start: date, end: date) -> Dict:
+    """Free slots of a provider for every day from start to end (inclusive)"""
+    if end < start:
+        raise ValueError("'to' must not be before 'from'")
+    if (end - start).days + 1 > MAX_RANGE_DAYS:
+        raise ValueError(f"Date range is limited to {MAX_RANGE_DAYS} days")
+
+    days = date_range(start, end)
+    entries = await _get_days(provider_id, days)
+    now = datetime.now()
+    return {
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "slotDuration": entries[0]["slotDuration"],
+        "days": [
+            {"date": day.isoformat(), "slots": format_slots(upcoming_slots(day, entry["slots"], now))}
+            for day, entry in zip(days, entries)
+        ]
+    }
+
+
+async def get_day_slots(provider_id: str, target_date: date) -> Dict:
+    """Free slots of a provider on a single date"""
+    # Don't allow booking in the past
+    if target_date < date.today():
+        return {"slots": [], "message": "Cannot book appointments in the past"}
+
+    entry = (await _get_days(provider_id, [target_date]))[0]
+    if not entry["enabled"]:
+        day_name = DAY_NAMES[target_date.weekday()]
+        return {"slots": [], "message": f"Provider is not available on {day_name.capitalize()}"}
+
+    slots = upcoming_slots(target_date, entry["slots"], datetime.now())
+    return {"slots": format_slots(slots), "slotDuration": entry["slotDuration"]}
@@ -0,0 +1,126 @@
+"""
+Unit tests for the audit log writer's spill-and-replay durability path
+Tests: services.audit_writer.AuditLogWriter (_write, _take_spill, _replay_spill)
+"""
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+
+from bson import ObjectId, json_util
+from pymongo.errors import BulkWriteError
+
+from services.audit_writer import AuditLogWriter
+
+
+class StubCollection:
+    """insert_many that stores by _id, rejects duplicates like MongoDB and can be made to fail"""
+
+    def __init__(self):
+        self.docs = {}
+        self.calls = 0
+        self.fail_calls = set()
+
+    async def insert_many(self, entries, ordered=False):
+        self.calls += 1
+        if self.calls in self.fail_calls:
+            raise ConnectionError("MongoDB unavailable")
+        errors = []
+        for entry in entries:
+            if entry["_id"] in self.docs:
+                errors.append({"code": 11000, "errmsg": "duplicate key"})
+            else:
+                self.docs[entry["_id"]] = dict(entry)
+        if errors:
+            raise BulkWriteError({"writeErrors": errors})
+
+
+def make_entries(count):
+    return [{"_id": ObjectId(), "userId": "user_1", "action": "view", "n": i} for i in range(count)]
+
+
+def read_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        return [json_util.loads(line) for line in f if line.strip()]
+
+
+def make_writer(tmp_path, collection, batch_size=2):
+    return AuditLogWriter(collection, batch_size=batch_size, spill_path=tmp_path / "audit_spill.jsonl")
+
+
+class TestAuditSpill:
+    """Entries that can't be written are spilled to disk and replayed later"""
+
+    def test_failed_batch_is_spilled(self, tmp_path):
+        collection = StubCollection()
+        collection.fail_calls = {1}
+        writer = make_writer(tmp_path, collection)
+        entries = make_entries(3)
+
+        asyncio.run(writer._write(entries))
+
+        assert collection.docs == {}
+        assert writer.spilled == 3
+        assert [e["_id"] for e in read_jsonl(writer.spill_path)] == [e["_id"] for e in entries]
+
+    def test_spill_is_replayed_after_next_successful_write(self, tmp_path):
+        collection = StubCollection()
+        collection.fail_calls = {1}
+        writer = make_writer(tmp_path, collection)
+        spilled, fresh = make_entries(3), make_entries(1)
+
+        async def scenario():
+            await writer._write(spilled)
+            await writer._write(fresh)
+        asyncio.run(scenario())
+
+        assert set(collection.docs) == {e["_id"] for e in spilled + fresh}
+        assert writer.replayed == 3
+        assert not writer.spill_path.exists()
+        assert not writer._replay_path.exists()
+
+    def test_leftover_replay_is_merged_with_new_spill(self, tmp_path):
+        writer = make_writer(tmp_path, StubCollection())
+        leftover, spilled = make_entries(2), make_entries(2)
+        writer._replay_path.write_text("".join(json_util.dumps(e) + "\n" for e in leftover), encoding="utf-8")
+        writer._append_spill(spilled)
+
+        entries = writer._take_spill()
+
+        assert [e["_id"] for e in entries] == [e["_id"] for e in leftover + spilled]
+        assert not writer.spill_path.exists()
+        # Kept until the entries are back in MongoDB
+        assert writer._replay_path.exists()
+
+    def test_failed_replay_keeps_the_file(self, tmp_path):
+        collection = StubCollection()
+        writer = make_writer(tmp_path, collection)
+        entries = make_entries(5)
+        writer._append_spill(entries)
+        # First batch goes in, the second fails
+        collection.fail_calls = {2}
+
+        asyncio.run(writer._replay_spill())
+
+        assert len(collection.docs) == 2
+        assert writer.replayed == 0
+        assert [e["_id"] for e in read_jsonl(writer._replay_path)] == [e["_id"] for e in entries]
+
+    def test_partially_inserted_replay_is_deduplicated(self, tmp_path):
+        collection = StubCollection()
+        writer = make_writer(tmp_path, collection)
+        entries = make_entries(5)
+        writer._append_spill(entries)
+        collection.fail_calls = {2}
+
+        async def scenario():
+            await writer._replay_spill()
+            await writer._replay_spill()
+        asyncio.run(scenario())
+
+        assert set(collection.docs) == {e["_id"] for e in entries}
+        assert writer.replayed == 5
+        assert not writer._replay_path.exists()
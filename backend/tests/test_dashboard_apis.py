@@ -5,6 +5,7 @@ Tests all dashboard-related APIs for both client and provider portals
 import pytest
 import requests
 import os
+import json
 
 BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
 
@@ -121,6 +122,32 @@ class TestProviderDashboard:
         assert isinstance(data, list)
         print(f"✓ Provider clients: {len(data)} clients")
 
+    def test_audit_export_ndjson(self):
+        """Test audit export streams one JSON object per line"""
+        response = requests.get(
+            f"{BASE_URL}/api/audit/export",
+            params={"userId": self.user_id},
+            headers=self.headers
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [line for line in response.text.splitlines() if line]
+        for line in lines:
+            entry = json.loads(line)
+            assert entry["userId"] == self.user_id
+        print(f"✓ Audit export: {len(lines)} entries")
+
+    def test_audit_export_csv(self):
+        """Test audit export as CSV starts with a header row"""
+        response = requests.get(
+            f"{BASE_URL}/api/audit/export",
+            params={"format": "csv", "action": "view"},
+            headers=self.headers
+        )
+        assert response.status_code == 200
+        assert response.text.splitlines()[0] == "timestamp,userId,action,resourceType,resourceId,ipAddress,details"
+        print("✓ Audit CSV export header")
+
 
 class TestMessagesAPI:
     """Messages API tests"""
@@ -145,6 +172,81 @@ class TestMessagesAPI:
         data = response.json()
         assert isinstance(data, list)
         print(f"✓ Messages: {len(data)} messages")
+    
+    def test_get_messages_paginated(self):
+        """Test cursor pagination returns pages that add up to the full list"""
+        full = requests.get(f"{BASE_URL}/api/messages", headers=self.headers).json()
+        
+        collected = []
+        params = {"limit": 2}
+        while True:
+            response = requests.get(f"{BASE_URL}/api/messages", headers=self.headers, params=params)
+            assert response.status_code == 200
+            page = response.json()
+            assert "items" in page
+            assert "nextCursor" in page
+            assert len(page["items"]) <= 2
+            collected.extend(page["items"])
+            if not page["hasMore"]:
+                break
+            params = {"limit": 2, "after": page["nextCursor"]}
+        
+        assert len(collected) == len(full)
+        print(f"✓ Paginated messages: {len(collected)} messages")
+    
+    def test_invalid_cursor_rejected(self):
+        """Test a malformed cursor returns 400"""
+        response = requests.get(f"{BASE_URL}/api/messages", headers=self.headers, params={"after": "not-a-cursor"})
+        assert response.status_code == 400
+        print("✓ Invalid cursor rejected")
+
+    def test_sync_messages(self):
+        """Test since/before sync returns exactly the newer/older messages"""
+        full = requests.get(f"{BASE_URL}/api/messages", headers=self.headers).json()
+        if not full:
+            pytest.skip("No messages to sync")
+
+        first, last = full[0], full[-1]
+
+        newer = []
+        params = {"since": first["timestamp"], "sinceId": first["_id"], "limit": 2}
+        while True:
+            response = requests.get(f"{BASE_URL}/api/messages", headers=self.headers, params=params)
+            assert response.status_code == 200
+            page = response.json()
+            newer.extend(page["items"])
+            if not page["hasMore"]:
+                break
+            params.update(since=page["items"][-1]["timestamp"], sinceId=page["items"][-1]["_id"])
+        assert [m["_id"] for m in newer] == [m["_id"] for m in full[1:]]
+
+        response = requests.get(f"{BASE_URL}/api/messages", headers=self.headers,
+                                params={"before": last["timestamp"], "beforeId": last["_id"], "limit": 2})
+        assert response.status_code == 200
+        older = response.json()["items"]
+        assert [m["_id"] for m in older] == [m["_id"] for m in full[:-1][-2:]]
+
+        response = requests.get(f"{BASE_URL}/api/messages", headers=self.headers, params={"since": "yesterday"})
+        assert response.status_code == 400
+        print(f"✓ Message sync: {len(newer)} newer, {len(older)} older")
+
+    def test_read_receipts(self):
+        """Test read receipts since a time list only messages read after it"""
+        response = requests.get(f"{BASE_URL}/api/messages/read-receipts", headers=self.headers,
+                                params={"since": "2000-01-01T00:00:00+00:00"})
+        assert response.status_code == 200
+        ids = response.json()["ids"]
+        assert isinstance(ids, list)
+
+        response = requests.get(f"{BASE_URL}/api/messages/read-receipts", headers=self.headers,
+                                params={"since": "2999-01-01T00:00:00+00:00"})
+        assert response.status_code == 200
+        assert response.json()["ids"] == []
+
+        response = requests.get(f"{BASE_URL}/api/messages/read-receipts", headers=self.headers,
+                                params={"since": "yesterday"})
+        assert response.status_code == 400
+        print(f"✓ Read receipts: {len(ids)} messages with a read time")
 
 
 class TestBillingAPI:
@@ -232,6 +334,42 @@ class TestAppointmentBooking:
         assert data["status"] == "pending"
         print(f"✓ Appointment created: {data['id']}")
         print(f"  Video link: {data['videoLink']}")
+        
+        # Free the slot again so the test can be re-run
+        requests.delete(f"{BASE_URL}/api/appointments/{data['id']}", headers=self.headers)
+    
+    def test_overlapping_appointment_rejected(self):
+        """Test bookings that overlap an existing appointment are rejected"""
+        providers_response = requests.get(f"{BASE_URL}/api/auth/users/providers", headers=self.headers)
+        provider_id = providers_response.json()[0]["user_id"]
+        
+        def book(time, duration):
+            return requests.post(f"{BASE_URL}/api/appointments", json={
+                "clientId": self.user_id,
+                "providerId": provider_id,
+                "date": "2026-03-02",
+                "time": time,
+                "duration": duration,
+                "type": "Follow-up Session",
+                "amount": 150
+            }, headers=self.headers)
+        
+        first = book("10:00 AM", 45)
+        assert first.status_code == 200, first.text
+        created = [first.json()["id"]]
+        try:
+            # Starts inside the 45 minute booking
+            overlapping = book("10:30 AM", 60)
+            assert overlapping.status_code == 409
+            
+            # Starts right after it ends
+            adjacent = book("10:45 AM", 30)
+            assert adjacent.status_code == 200, adjacent.text
+            created.append(adjacent.json()["id"])
+            print("✓ Overlapping booking rejected, adjacent booking accepted")
+        finally:
+            for appointment_id in created:
+                requests.delete(f"{BASE_URL}/api/appointments/{appointment_id}", headers=self.headers)
 
 
 if __name__ == "__main__":
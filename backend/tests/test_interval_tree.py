@@ -0,0 +1,98 @@
+"""
+Unit tests for the appointment interval index
+Tests: services.interval_tree.IntervalTree, services.appointment_index helpers,
+       services.slot_engine.compute_free_slots
+"""
+import os
+import random
+import sys
+from datetime import date, datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+
+from services.interval_tree import IntervalTree
+from services.appointment_index import appointment_interval, absolute_minute, parse_minutes
+from services.slot_engine import compute_free_slots
+from models import WorkingHours
+
+
+def brute_force(intervals, start, end):
+    return sorted(iv for iv in intervals if iv[0] < end and iv[1] > start)
+
+
+class TestIntervalTree:
+    """IntervalTree overlap queries"""
+    
+    def test_touching_intervals_do_not_overlap(self):
+        tree = IntervalTree([(600, 660, "a")])
+        assert not tree.overlaps(660, 720)
+        assert not tree.overlaps(540, 600)
+        assert tree.overlaps(659, 700)
+        assert tree.overlapping(630, 645) == [(600, 660, "a")]
+    
+    def test_empty_intervals_are_ignored(self):
+        tree = IntervalTree([(600, 600, "a")])
+        tree.add(700, 650, "b")
+        assert len(tree) == 0
+        assert not tree.overlaps(0, 2000)
+    
+    def test_matches_brute_force(self):
+        rng = random.Random(42)
+        intervals = []
+        for i in range(2000):
+            start = rng.randint(0, 100000)
+            intervals.append((start, start + rng.randint(1, 240), i))
+        # Half built in bulk, half inserted one by one
+        tree = IntervalTree(intervals[:1000])
+        for start, end, data in intervals[1000:]:
+            tree.add(start, end, data)
+        
+        assert len(tree) == 2000
+        assert [iv[0] for iv in tree] == sorted(iv[0] for iv in intervals)
+        for _ in range(500):
+            start = rng.randint(0, 100000)
+            end = start + rng.randint(1, 300)
+            expected = brute_force(intervals, start, end)
+            assert sorted(tree.overlapping(start, end)) == expected
+            assert tree.overlaps(start, end) == bool(expected)
+
+
+class TestAppointmentIntervals:
+    """Appointment to interval conversion"""
+    
+    def test_parse_minutes(self):
+        assert parse_minutes("09:30 AM") == 570
+        assert parse_minutes("12:15 PM") == 735
+        assert parse_minutes("17:45") == 1065
+        assert parse_minutes("25:00") is None
+        assert parse_minutes(None) is None
+    
+    def test_interval_uses_duration(self):
+        start, end = appointment_interval({"date": "2030-01-07", "time": "10:00 AM", "duration": 45})
+        assert start == absolute_minute(date(2030, 1, 7), 600)
+        assert end - start == 45
+    
+    def test_late_booking_runs_into_next_day(self):
+        late = appointment_interval({"date": "2030-01-07", "time": "11:30 PM", "duration": 60})
+        tree = IntervalTree([(*late, "late")])
+        next_day = absolute_minute(date(2030, 1, 8), 0)
+        assert tree.overlaps(next_day, next_day + 30)
+        assert not tree.overlaps(next_day + 30, next_day + 60)
+
+
+class TestSlotAvailability:
+    """Slot engine blocks every slot a booking overlaps"""
+    
+    def test_non_standard_duration_blocks_overlapped_slots(self):
+        schedule = WorkingHours().model_dump()
+        monday = date(2030, 1, 7)
+        booking = appointment_interval({"date": "2030-01-07", "time": "10:30 AM", "duration": 45})
+        tree = IntervalTree([(*booking, "apt")])
+        
+        free = compute_free_slots(schedule, [monday], tree, now=datetime(2030, 1, 1))[0]
+        # 10:30-11:15 blocks the 10:00 and 11:00 slots of a 60 minute grid
+        assert 600 not in free
+        assert 660 not in free
+        assert free == [540, 720, 780, 840, 900, 960]
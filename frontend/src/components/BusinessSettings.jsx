@@ -270,7 +270,7 @@ const BusinessSettings = ({ showHeader = true }) => {
             {settings.logoUrl ? (
               <div className="relative">
                 <img 
-                  src={settings.logoUrl} 
+                  src={settings.logoUrl.startsWith('/') ? `${process.env.REACT_APP_BACKEND_URL}${settings.logoUrl}` : settings.logoUrl} 
                   alt="Business Logo" 
                   className="h-24 w-auto max-w-48 object-contain border rounded-lg"
                 />
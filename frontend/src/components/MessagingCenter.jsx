@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { Send, ArrowLeft, Search } from 'lucide-react';
 import { Card, CardContent, CardHeader, CardTitle } from './ui/card';
@@ -12,6 +12,9 @@ import { messagesApi, providerApi, clientApi } from '../services/api';
 import { toast } from '../hooks/use-toast';
 import ThemeToggle from './ThemeToggle';
 
+// Timestamps read back from the API without an offset are UTC
+const toTime = (timestamp) => Date.parse(/(Z|[+-]\d\d:\d\d)$/.test(timestamp) ? timestamp : `${timestamp}Z`);
+
 const MessagingCenter = ({ userType, userId, onBack }) => {
   const navigate = useNavigate();
   const { user } = useAuth();
@@ -23,10 +26,105 @@ const MessagingCenter = ({ userType, userId, onBack }) => {
   const [loading, setLoading] = useState(true);
   const [sending, setSending] = useState(false);
 
+  const socketRef = useRef(null);
+  const messagesRef = useRef([]);
+
+  useEffect(() => {
+    messagesRef.current = messages;
+  }, [messages]);
+
   useEffect(() => {
     fetchData();
   }, []);
 
+  // New messages and read receipts are pushed over a WebSocket instead of polling
+  useEffect(() => {
+    let closed = false;
+    let retryDelay = 1000;
+    let retryTimer = null;
+    let pingTimer = null;
+    // serverTime of the last ready event: receipts after it were pushed
+    let connectedAt = null;
+
+    const connect = () => {
+      const socket = new WebSocket(messagesApi.socketUrl());
+      socketRef.current = socket;
+
+      socket.onopen = () => {
+        retryDelay = 1000;
+        pingTimer = setInterval(() => socket.send('ping'), 30000);
+      };
+
+      socket.onmessage = (event) => {
+        const data = JSON.parse(event.data);
+        if (data.type === 'ready') {
+          const previous = connectedAt;
+          connectedAt = data.serverTime;
+          if (previous) {
+            syncReadReceipts(previous).catch(err => console.error('Error syncing read receipts:', err));
+          }
+        } else if (data.type === 'message') {
+          setMessages(prev => prev.some(m => m._id === data.message._id) ? prev : [...prev, data.message]);
+        } else if (data.type === 'read') {
+          setMessages(prev => prev.map(m => m._id === data.id ? { ...m, read: true } : m));
+        }
+      };
+
+      socket.onclose = () => {
+        clearInterval(pingTimer);
+        if (closed) return;
+        // Reconnect with backoff and fetch whatever was missed meanwhile
+        retryTimer = setTimeout(() => {
+          connect();
+          syncMissed().catch(err => console.error('Error syncing messages:', err));
+        }, retryDelay);
+        retryDelay = Math.min(retryDelay * 2, 30000);
+      };
+    };
+
+    // Only the messages newer than the newest one already loaded
+    const syncMissed = async () => {
+      const newest = messagesRef.current.reduce(
+        (latest, msg) => (!latest || toTime(msg.timestamp) > toTime(latest.timestamp) ? msg : latest),
+        null
+      );
+      if (!newest) {
+        const res = await messagesApi.getAll();
+        setMessages(res.data || []);
+        return;
+      }
+
+      let params = { since: newest.timestamp, sinceId: newest._id };
+      let hasMore = true;
+      while (hasMore) {
+        const { data } = await messagesApi.sync(params);
+        setMessages(prev => {
+          const known = new Set(prev.map(m => m._id));
+          return [...prev, ...data.items.filter(m => !known.has(m._id))];
+        });
+        const last = data.items[data.items.length - 1];
+        hasMore = data.hasMore && !!last;
+        if (last) params = { since: last.timestamp, sinceId: last._id };
+      }
+    };
+
+    // Messages read while the socket was down
+    const syncReadReceipts = async (since) => {
+      const { data } = await messagesApi.readReceipts(since);
+      const read = new Set(data.ids);
+      if (read.size === 0) return;
+      setMessages(prev => prev.map(m => (read.has(m._id) && !m.read ? { ...m, read: true } : m)));
+    };
+
+    connect();
+    return () => {
+      closed = true;
+      clearTimeout(retryTimer);
+      clearInterval(pingTimer);
+      socketRef.current?.close();
+    };
+  }, []);
+
   const fetchData = async () => {
     try {
       setLoading(true);
@@ -124,7 +222,8 @@ const MessagingCenter = ({ userType, userId, onBack }) => {
         read: false
       };
       
-      setMessages([...messages, newMessage]);
+      // The pushed copy of the message may already have arrived
+      setMessages(prev => prev.some(m => m._id === newMessage._id) ? prev : [...prev, newMessage]);
       setMessageText('');
       
       toast({
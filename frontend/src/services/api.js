@@ -47,7 +47,8 @@ export const providerApi = {
   getClinicalNote: (appointmentId) => api.get(`/provider/clinical-notes/${appointmentId}`),
   getWorkingHours: () => api.get('/provider/working-hours'),
   updateWorkingHours: (hours) => api.put('/provider/working-hours', hours),
-  getAvailableSlots: (date) => api.get(`/provider/available-slots/${date}`)
+  getAvailableSlots: (date) => api.get(`/provider/available-slots/${date}`),
+  getAvailableSlotsRange: (from, to) => api.get('/provider/available-slots', { params: { from, to } })
 };
 
 // Client API
@@ -59,7 +60,8 @@ export const clientApi = {
     if (status) params.status = status;
     return api.get('/client/appointments', { params });
   },
-  getAvailableSlots: (date) => api.get(`/client/provider/available-slots/${date}`)
+  getAvailableSlots: (date) => api.get(`/client/provider/available-slots/${date}`),
+  getAvailableSlotsRange: (from, to) => api.get('/client/provider/available-slots', { params: { from, to } })
 };
 
 // Appointments API
@@ -79,7 +81,13 @@ export const messagesApi = {
     return api.get('/messages', { params });
   },
   send: (message) => api.post('/messages', message),
-  markAsRead: (id) => api.patch(`/messages/${id}/read`)
+  // Messages newer ({ since, sinceId }) or older ({ before, beforeId }) than a message
+  sync: (params) => api.get('/messages', { params }),
+  markAsRead: (id) => api.patch(`/messages/${id}/read`),
+  // Ids of messages read since a ready event's serverTime
+  readReceipts: (since) => api.get('/messages/read-receipts', { params: { since } }),
+  // WebSocket that pushes new messages and read receipts
+  socketUrl: () => `${API.replace(/^http/, 'ws')}/messages/ws?token=${encodeURIComponent(localStorage.getItem('token') || '')}`
 };
 
 // Billing API